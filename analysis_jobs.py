@@ -0,0 +1,171 @@
+"""
+Analysis Job Queue
+In-process job queue with a bounded pool of dedicated worker threads for the
+long-running symptom analysis pipeline (LLM + PubMed). Web requests submit a job
+and return its id immediately; clients poll or subscribe for the result, so web
+workers stay free for cheap requests while analysis runs in the background.
+"""
+
+import queue
+import secrets
+import threading
+import time
+
+
+class JobQueueFull(Exception):
+    """Raised when the pending-job queue is at capacity"""
+
+
+class _Job:
+    """A submitted job and its outcome"""
+
+    def __init__(self, job_id, fn, args, kwargs, owner):
+        self.id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.owner = owner
+        self.status = AnalysisJobQueue.QUEUED
+        self.result = None
+        self.error = None
+        self.retry_after = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+
+class AnalysisJobQueue:
+    """Bounded worker pool with per-job status tracking"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, workers=4, max_pending=50, result_ttl_seconds=600):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl_seconds = result_ttl_seconds
+        self._lock = threading.Lock()
+        self._queue = None
+        self._threads = []
+        self._jobs = {}
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+
+    def configure(self, workers=None, max_pending=None, result_ttl_seconds=None):
+        """Update pool settings; takes effect before the workers are started"""
+        with self._lock:
+            if workers is not None:
+                self.workers = workers
+            if max_pending is not None:
+                self.max_pending = max_pending
+            if result_ttl_seconds is not None:
+                self.result_ttl_seconds = result_ttl_seconds
+
+    def _ensure_started(self):
+        """Start worker threads on first use (lock held)"""
+        if self._queue is not None:
+            return
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'analysis-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            job.status = self.RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = job.fn(*job.args, **job.kwargs)
+                job.status = self.DONE
+                with self._lock:
+                    self._stats['completed'] += 1
+            except Exception as e:
+                job.error = str(e)
+                # Overload errors (e.g. a saturated dependency) carry a Retry-After hint
+                job.retry_after = getattr(e, 'retry_after', None)
+                job.status = self.FAILED
+                with self._lock:
+                    self._stats['failed'] += 1
+            finally:
+                job.finished_at = time.time()
+                job.fn = job.args = job.kwargs = None
+                job.done.set()
+                self._queue.task_done()
+
+    def _expire_finished(self):
+        """Drop finished jobs older than the result TTL (lock held)"""
+        cutoff = time.time() - self.result_ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, fn, *args, owner=None, **kwargs):
+        """Queue fn(*args, **kwargs); returns the job id or raises JobQueueFull"""
+        job = _Job(secrets.token_urlsafe(16), fn, args, kwargs, owner)
+        with self._lock:
+            self._ensure_started()
+            self._expire_finished()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._stats['rejected'] += 1
+                raise JobQueueFull(f'Analysis queue is full ({self.max_pending} pending jobs)')
+            self._jobs[job.id] = job
+            self._stats['submitted'] += 1
+        return job.id
+
+    def _find(self, job_id, owner=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        # Jobs are only visible to the session that submitted them
+        if job is None or (job.owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def get(self, job_id, owner=None):
+        """Get a job snapshot (status, result, error, timings) or None if unknown"""
+        job = self._find(job_id, owner)
+        if job is None:
+            return None
+        with self._lock:
+            position = None
+            if job.status == self.QUEUED:
+                position = sum(1 for other in self._jobs.values()
+                               if other.status == self.QUEUED and other.created_at <= job.created_at)
+        return {
+            'job_id': job.id,
+            'status': job.status,
+            'queue_position': position,
+            'result': job.result,
+            'error': job.error,
+            'retry_after': job.retry_after,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at
+        }
+
+    def wait(self, job_id, timeout=None, owner=None):
+        """Block until the job finishes or timeout expires; returns True if finished"""
+        job = self._find(job_id, owner)
+        if job is None:
+            return False
+        return job.done.wait(timeout)
+
+    def get_stats(self):
+        """Get queue depth, running jobs and completion counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['workers'] = self.workers
+            stats['max_pending'] = self.max_pending
+            stats['queued'] = sum(1 for job in self._jobs.values() if job.status == self.QUEUED)
+            stats['running'] = sum(1 for job in self._jobs.values() if job.status == self.RUNNING)
+        return stats
+
+
+# Global instance
+analysis_jobs = AnalysisJobQueue()
@@ -8,7 +8,7 @@ if sys.version_info >= (3, 12):
     print("Please use Python 3.8 - 3.11 to run this service.")
     sys.exit(1)
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, make_response
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, make_response, copy_current_request_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from translations import get_translation, get_available_languages, TRANSLATIONS
 import pandas as pd
@@ -25,6 +25,7 @@ from pathlib import Path
 from dotenv import load_dotenv, set_key
 import os
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 import re
 import threading
 import pyotp
@@ -42,6 +43,47 @@ from multi_device_2fa import (
     get_user_2fa_devices_list, is_user_multi_device_enabled
 )
 
+# Circuit breakers for AI providers and PubMed
+from circuit_breaker import circuit_breakers
+
+# Single-flight coalescing for identical in-flight LLM and PubMed calls
+from single_flight import single_flight, make_fingerprint, SingleFlightTimeout
+
+# Provider usage parsing and prefix-cache token accounting
+from llm_usage import extract_usage, prompt_cache_stats, llm_call_metrics
+
+# Persistent Chinese -> English medical translation memory
+from translation_memory import translation_memory, contains_chinese
+
+# Cross-request micro-batching of AI translation prompts
+from micro_batcher import MicroBatcher
+from specialty_heuristic import specialty_heuristic, progressive_match_stats
+from triage_model import triage_predictor
+from symptom_canonicalizer import symptom_canonicalizer, CanonicalResultCache
+from provider_benchmark import ProviderBenchmark
+from speculative_prefetch import symptom_prefetcher
+from rate_limiter import pubmed_rate_limiter
+from pubmed_cache import pubmed_cache, config_hash
+from prompt_budget import estimate_tokens, compact_evidence, parse_model_limits, prompt_token_limit, prompt_budget_stats
+
+# Per-request end-to-end deadline with per-stage budgets
+from request_deadline import Deadline, deadline_scope, deadline_stage, current_deadline, request_timeout, deadline_exhausted
+
+# Local rule-based symptom validation fast path
+from symptom_validator import LocalSymptomValidator, load_chp_topic_titles, is_condition_topic, is_specialty_name
+
+# Background job queue for the symptom analysis pipeline
+from analysis_jobs import analysis_jobs, AnalysisJobQueue, JobQueueFull
+
+# Per-dependency admission control (AI providers, PubMed)
+from bulkhead import bulkheads, BulkheadFull
+
+# Structured JSON output mode for diagnosis responses
+from structured_diagnosis import (
+    DIAGNOSIS_RESPONSE_SCHEMA, COMBINED_DIAGNOSIS_RESPONSE_SCHEMA, build_response_format,
+    parse_structured_diagnosis, render_diagnosis_text
+)
+
 # Set up logging with custom handler for console capture
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -200,6 +242,8 @@ def get_medical_evidence():
             'search_terms': search_terms
         })
         
+    except BulkheadFull:
+        raise  # handled by the BulkheadFull error handler (503 + Retry-After)
     except Exception as e:
         logger.error(f"Medical evidence API error: {e}")
         return jsonify({'error': 'Failed to fetch medical evidence'}), 500
@@ -266,7 +310,7 @@ def extract_diagnoses_from_ai_analysis(ai_analysis):
         return []
 
 def translate_medical_terms_with_ai(chinese_terms):
-    """Use AI to translate Chinese medical terms to English"""
+    """Translate Chinese medical terms to English - translation memory first, one batched AI call for the rest"""
     try:
         if not chinese_terms or not isinstance(chinese_terms, list):
             return []
@@ -280,105 +324,141 @@ def translate_medical_terms_with_ai(chinese_terms):
         if not valid_terms:
             return []
         
-        # Create a prompt for medical translation
-        terms_text = ', '.join(str(term) for term in valid_terms)
-        prompt = f"""請將以下中文醫學術語翻譯成英文醫學術語，只返回英文術語，用逗號分隔：
-
-中文醫學術語：{terms_text}
-
-請提供準確的醫學英文翻譯："""
-
-        logger.info(f"Translating medical terms: {terms_text}")
+        # Term-level lookups first; English terms pass through unchanged
+        translations = translation_memory.lookup_many(valid_terms)
+        for term in valid_terms:
+            if term not in translations and not contains_chinese(term):
+                translations[term] = term
         
-        # Use the same AI service as diagnosis
-        ai_response = call_ai_api(prompt)
+        unknown_terms = list(dict.fromkeys(term for term in valid_terms if term not in translations))
+        logger.info(f"Translation memory resolved {len(valid_terms) - len(unknown_terms)}/{len(valid_terms)} terms")
         
-        if ai_response and not ai_response.startswith("AI分析服務暫時不可用"):
-            english_terms = ai_response.strip()
-            # Split by comma and clean up
-            translated_terms = [term.strip() for term in english_terms.split(',') if term.strip()]
-            logger.info(f"AI translated terms: {translated_terms}")
-            return translated_terms
-        else:
-            logger.warning("AI translation failed, using fallback")
-            return chinese_terms
+        if unknown_terms:
+            # Concurrent requests within the batching window share one AI translation call
+            if TRANSLATION_BATCH_CONFIG['enabled']:
+                learned = translation_batcher.submit(unknown_terms, wait_timeout=request_timeout(translation_batcher.wait_timeout_seconds))
+            else:
+                learned = translate_unknown_terms_with_ai(unknown_terms)
+            translations.update(learned)
+        
+        # Terms the AI could not translate fall back to the original text
+        translated_terms = [translations.get(term, term) for term in valid_terms]
+        logger.info(f"Translated terms: {translated_terms}")
+        return translated_terms
             
     except Exception as e:
         logger.error(f"Error translating medical terms: {e}")
         return chinese_terms
 
+def translate_unknown_terms_with_ai(unknown_terms):
+    """Translate terms missing from the translation memory in one indexed AI call and learn the results"""
+    numbered_terms = "\n".join(f"{i}. {term}" for i, term in enumerate(unknown_terms, 1))
+    prompt = f"""請將以下中文醫學術語逐項翻譯成英文醫學術語。
+每項一行，格式為「編號. 英文術語」，編號與原文相同，不要添加任何其他說明：
+
+{numbered_terms}"""
+
+    logger.info(f"Translating unknown medical terms with AI: {unknown_terms}")
+    ai_response = call_ai_api(prompt, call_type='translate')
+    
+    if not ai_response or ai_response.startswith("AI分析服務暫時不可用"):
+        logger.warning("AI translation failed, using fallback")
+        return {}
+    
+    translations = {}
+    for line in ai_response.strip().splitlines():
+        match = re.match(r'^\s*(\d+)\s*[\.\)、:：]\s*(.+?)\s*$', line)
+        if match:
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(unknown_terms):
+                translations[unknown_terms[index]] = match.group(2)
+    
+    # Fall back to a comma-separated answer of the right length
+    if not translations:
+        parts = [part.strip() for part in ai_response.strip().split(',') if part.strip()]
+        if len(parts) == len(unknown_terms):
+            translations = dict(zip(unknown_terms, parts))
+    
+    translations = {zh: en for zh, en in translations.items() if en and not contains_chinese(en)}
+    learned_count = translation_memory.learn(translations)
+    logger.info(f"AI translated {len(translations)}/{len(unknown_terms)} terms, learned {learned_count}")
+    return translations
+
+# Global instance - window and size are set from TRANSLATION_BATCH_CONFIG below
+translation_batcher = MicroBatcher(translate_unknown_terms_with_ai)
+
+# Comprehensive symptom mapping to medical terms - also seeds the translation memory
+SYMPTOM_TERM_MAPPING = {
+    # Cardiovascular
+    '胸痛': 'chest pain',
+    '胸悶': 'chest tightness',
+    '心悸': 'palpitations',
+    '心跳快': 'tachycardia',
+    '心律不整': 'arrhythmia',
+    
+    # Respiratory
+    '呼吸困難': 'dyspnea',
+    '氣喘': 'asthma',
+    '咳嗽': 'cough',
+    '咳血': 'hemoptysis',
+    '喘息': 'wheezing',
+    
+    # Neurological
+    '頭痛': 'headache',
+    '頭暈': 'dizziness',
+    '暈眩': 'vertigo',
+    '偏頭痛': 'migraine',
+    '失眠': 'insomnia',
+    '癲癇': 'seizure',
+    
+    # Gastrointestinal
+    '腹痛': 'abdominal pain',
+    '噁心': 'nausea',
+    '嘔吐': 'vomiting',
+    '腹瀉': 'diarrhea',
+    '便秘': 'constipation',
+    '胃痛': 'stomach pain',
+    
+    # General symptoms
+    '疲勞': 'fatigue',
+    '發燒': 'fever',
+    '發熱': 'fever',
+    '體重減輕': 'weight loss',
+    '食慾不振': 'loss of appetite',
+    '盜汗': 'night sweats',
+    
+    # Mental health
+    '焦慮': 'anxiety',
+    '憂鬱': 'depression',
+    '壓力': 'stress',
+    '恐慌': 'panic',
+    
+    # Musculoskeletal
+    '關節痛': 'joint pain',
+    '肌肉痛': 'muscle pain',
+    '背痛': 'back pain',
+    '頸痛': 'neck pain',
+    
+    # Dermatological
+    '皮疹': 'rash',
+    '搔癢': 'itching',
+    '紅腫': 'swelling',
+    
+    # Specialties (for diagnosis parameter)
+    '普通科醫生': 'general practitioner',
+    '內科': 'internal medicine',
+    '外科': 'surgery',
+    '心臟科': 'cardiology',
+    '神經科': 'neurology',
+    '腸胃科': 'gastroenterology',
+    '呼吸科': 'pulmonology',
+    '精神科': 'psychiatry'
+}
+
 def generate_medical_search_terms(symptoms, diagnosis):
     """Generate appropriate search terms for medical databases"""
     search_terms = []
     
-    # Comprehensive symptom mapping to medical terms
-    symptom_mapping = {
-        # Cardiovascular
-        '胸痛': 'chest pain',
-        '胸悶': 'chest tightness',
-        '心悸': 'palpitations',
-        '心跳快': 'tachycardia',
-        '心律不整': 'arrhythmia',
-        
-        # Respiratory
-        '呼吸困難': 'dyspnea',
-        '氣喘': 'asthma',
-        '咳嗽': 'cough',
-        '咳血': 'hemoptysis',
-        '喘息': 'wheezing',
-        
-        # Neurological
-        '頭痛': 'headache',
-        '頭暈': 'dizziness',
-        '暈眩': 'vertigo',
-        '偏頭痛': 'migraine',
-        '失眠': 'insomnia',
-        '癲癇': 'seizure',
-        
-        # Gastrointestinal
-        '腹痛': 'abdominal pain',
-        '噁心': 'nausea',
-        '嘔吐': 'vomiting',
-        '腹瀉': 'diarrhea',
-        '便秘': 'constipation',
-        '胃痛': 'stomach pain',
-        
-        # General symptoms
-        '疲勞': 'fatigue',
-        '發燒': 'fever',
-        '發熱': 'fever',
-        '體重減輕': 'weight loss',
-        '食慾不振': 'loss of appetite',
-        '盜汗': 'night sweats',
-        
-        # Mental health
-        '焦慮': 'anxiety',
-        '憂鬱': 'depression',
-        '壓力': 'stress',
-        '恐慌': 'panic',
-        
-        # Musculoskeletal
-        '關節痛': 'joint pain',
-        '肌肉痛': 'muscle pain',
-        '背痛': 'back pain',
-        '頸痛': 'neck pain',
-        
-        # Dermatological
-        '皮疹': 'rash',
-        '搔癢': 'itching',
-        '紅腫': 'swelling',
-        
-        # Specialties (for diagnosis parameter)
-        '普通科醫生': 'general practitioner',
-        '內科': 'internal medicine',
-        '外科': 'surgery',
-        '心臟科': 'cardiology',
-        '神經科': 'neurology',
-        '腸胃科': 'gastroenterology',
-        '呼吸科': 'pulmonology',
-        '精神科': 'psychiatry'
-    }
-    
     # Process symptoms - handle both array and string formats
     symptoms_list = []
     if isinstance(symptoms, list):
@@ -395,16 +475,17 @@ def generate_medical_search_terms(symptoms, diagnosis):
     
     logger.info(f"Processed symptoms list: {symptoms_list}")
     
-    # Convert symptoms to English medical terms
+    # Convert symptoms to English medical terms via the translation memory
+    known_terms = translation_memory.lookup_many(symptoms_list)
     for symptom in symptoms_list:
-        english_term = symptom_mapping.get(symptom.strip(), symptom.strip())
+        english_term = known_terms.get(symptom, symptom.strip())
         search_terms.append(english_term)
         logger.info(f"Mapped '{symptom}' -> '{english_term}'")
     
     # Add diagnosis if provided and not already a symptom
     if diagnosis and diagnosis not in search_terms:
         # Try to translate diagnosis too
-        diagnosis_english = symptom_mapping.get(diagnosis.strip(), diagnosis.strip())
+        diagnosis_english = translation_memory.lookup(diagnosis) or diagnosis.strip()
         search_terms.append(diagnosis_english)
     
     logger.info(f"Final search terms: {search_terms}")
@@ -465,7 +546,185 @@ def update_medical_search_config(config_key, config_value):
         return False
 
 def fetch_pubmed_evidence(search_terms, original_terms=None):
-    """Fetch evidence from PubMed database with configurable parameters"""
+    """Fetch evidence from PubMed, sharing one in-flight search between identical concurrent requests"""
+    # 檢索詞次序不影響結果：排序後作為鍵，令不同輸入次序的相同症狀共用一次檢索
+    fingerprint = make_fingerprint('pubmed', sorted(search_terms or []), sorted(original_terms or []))
+    # Only the leader of a coalesced search takes a PubMed slot
+    return single_flight.do(fingerprint, bulkheads.get('pubmed').call, fetch_pubmed_evidence_direct, search_terms, original_terms)
+
+def pubmed_search_query(term: str) -> str:
+    """Construct improved search query to reduce irrelevant results"""
+    # Exclude rare disease and experimental studies
+    exclusions = "NOT (rare[Title/Abstract] OR case report[Publication Type] OR animal[MeSH Terms] OR in vitro[Title/Abstract])"
+    
+    # Focus on clinical relevance
+    clinical_focus = "(clinical[Title/Abstract] OR diagnosis[Title/Abstract] OR treatment[Title/Abstract] OR management[Title/Abstract] OR therapy[Title/Abstract])"
+    
+    return f"({term}[Title/Abstract] AND {clinical_focus}) {exclusions}"
+
+def record_breaker_error(breaker, error, call_timeout=None, configured_timeout=None):
+    """將調用異常記入斷路器；超時已按請求期限縮短時不計為失敗
+    
+    期限縮短後的逾時反映的是該請求剩餘時間不足，而非依賴本身變慢，只釋放半開探測名額
+    """
+    if (isinstance(error, requests.exceptions.Timeout) and call_timeout is not None
+            and configured_timeout is not None and call_timeout < configured_timeout):
+        breaker.record_ignored()
+    else:
+        breaker.record_failure(error)
+
+def pubmed_get(url: str, params: dict, breaker_name: str, timeout: float, configured_timeout: float = None):
+    """一次受速率限制及斷路器保護的 E-utilities 請求；未能發出時返回 None
+    
+    先取速率令牌再問斷路器：半開狀態的探測名額一經取得，必須以成功、失敗或忽略結束，否則斷路器會一直停在半開。
+    configured_timeout 為未按期限縮短的超時，用於判斷逾時是否計入斷路器
+    """
+    if not pubmed_rate_limiter.acquire(timeout):
+        logger.warning(f"PubMed rate limit: no request slot within {timeout:.1f}s, skipping {breaker_name}")
+        return None
+    breaker = circuit_breakers.get(breaker_name)
+    if not breaker.allow_request():
+        logger.warning(f"PubMed {breaker_name} circuit breaker open, skipping request")
+        return None
+    
+    start_time = time.time()
+    try:
+        response = requests.get(url, params=params, timeout=timeout)
+    except Exception as e:
+        record_breaker_error(breaker, e, timeout, configured_timeout)
+        raise
+    if response.status_code != 200:
+        breaker.record_failure(f"HTTP {response.status_code}")
+    else:
+        breaker.record_success(time.time() - start_time)
+    return response
+
+def revalidate_pubmed_search(term: str, original_term: str, config: dict, cache_key: str):
+    """在獨立的刷新線程中背景重新檢索已過期的快取；同一檢索同時只刷新一次
+    
+    刷新不屬於任何請求，使用配置的 search_timeout 而非觸發請求按剩餘期限計算的超時
+    """
+    if not pubmed_cache.begin_revalidation(cache_key):
+        return
+    
+    def refresh():
+        try:
+            search_pubmed_term(term, original_term, config, config.get('search_timeout', 10), refresh=True)
+        except Exception as e:
+            logger.error(f"PubMed cache revalidation failed for '{term}': {e}")
+        finally:
+            pubmed_cache.end_revalidation(cache_key)
+    
+    pubmed_refresh_pool.submit(refresh)
+
+def search_pubmed_term(term: str, original_term: str, config: dict, timeout: float, refresh: bool = False):
+    """單一症狀的 esearch + efetch，返回通過相關性門檻的文章；未能檢索時返回 None
+    
+    在檢索線程池中執行：請求期限不會傳入線程，timeout 須由調用方按剩餘時間計算。
+    啟用 PubMed 快取時先讀快取：PMID 列表及已解析文章命中即不發出請求；refresh=True 時略過檢索快取
+    """
+    articles_per_symptom = config.get('articles_per_symptom', 2)
+    retmax = config.get('pubmed_retmax', 3)  # Use configurable retmax
+    query = pubmed_search_query(term)
+    use_cache = PUBMED_CACHE_CONFIG['enabled']
+    
+    pmids = None
+    if use_cache and not refresh:
+        cached = pubmed_cache.get_search(query, retmax, PUBMED_SEARCH_CONFIG_HASH,
+                                         allow_stale=PUBMED_CACHE_CONFIG['stale_while_revalidate'])
+        if cached is not None:
+            pmids, stale = cached
+            if stale:
+                revalidate_pubmed_search(term, original_term, config, f"{PUBMED_SEARCH_CONFIG_HASH}:{retmax}:{query}")
+    
+    if pmids is None:
+        # PubMed E-utilities API
+        search_params = {
+            'db': 'pubmed',
+            'term': query,
+            'retmax': retmax,
+            'sort': 'relevance',
+            'retmode': 'xml'
+        }
+        try:
+            search_response = pubmed_get(f"{PUBMED_EUTILS_BASE_URL}/esearch.fcgi", search_params, 'pubmed_esearch', timeout,
+                                         config.get('search_timeout', 10))
+        except Exception as e:
+            logger.error(f"PubMed esearch failed for '{term}': {e}")
+            return None
+        if search_response is None or search_response.status_code != 200:
+            return None
+        
+        # Parse XML response to get PMIDs
+        root = ET.fromstring(search_response.content)
+        pmids = [id_elem.text for id_elem in root.findall('.//Id')]
+        if use_cache:
+            pubmed_cache.put_search(query, retmax, PUBMED_SEARCH_CONFIG_HASH, pmids)
+    if not pmids:
+        return None
+    pmids = pmids[:articles_per_symptom]  # Use configurable articles per symptom
+    
+    # Article details: cached records first, efetch only the PMIDs not yet cached
+    records = pubmed_cache.get_articles(pmids) if use_cache else {}
+    missing = [pmid for pmid in pmids if pmid not in records]
+    if missing:
+        fetch_params = {
+            'db': 'pubmed',
+            'id': ','.join(missing),
+            'retmode': 'xml'
+        }
+        try:
+            fetch_response = pubmed_get(f"{PUBMED_EUTILS_BASE_URL}/efetch.fcgi", fetch_params, 'pubmed_efetch', timeout,
+                                        config.get('search_timeout', 10))
+        except Exception as e:
+            logger.error(f"PubMed efetch failed for '{term}': {e}")
+            fetch_response = None
+        if fetch_response is None or fetch_response.status_code != 200:
+            if not records:
+                return None
+        else:
+            fetched = [score_pubmed_record(record, term) for record in parse_pubmed_records(fetch_response.content)]
+            if use_cache:
+                pubmed_cache.put_articles(fetched)
+            records.update((record['pmid'], record) for record in fetched)
+    
+    articles = []
+    for pmid in pmids:
+        if pmid not in records:
+            continue
+        try:
+            article = build_pubmed_article(records[pmid], term, original_term)
+        except Exception as e:
+            logger.error(f"Error building PubMed article {pmid}: {e}")
+            continue
+        if article:
+            articles.append(article)
+    if not articles:
+        logger.warning(f"No articles found for symptom: {original_term}")
+        return []
+    
+    # Filter articles by relevance score
+    min_relevance = config.get('relevance_threshold', 2.0)
+    filtered_articles = []
+    for article in articles:
+        score = article.get('relevance_score', 0)
+        if score >= min_relevance:
+            filtered_articles.append(article)
+            logger.info(f"Article accepted: '{article['title'][:50]}...' (score: {score:.1f})")
+        else:
+            logger.info(f"Article filtered out: '{article['title'][:50]}...' (score: {score:.1f}, threshold: {min_relevance})")
+    
+    if filtered_articles:
+        logger.info(f"Found {len(filtered_articles)}/{len(articles)} relevant articles for symptom: {original_term}")
+    else:
+        logger.warning(f"No relevant articles found for symptom: {original_term} (all filtered out)")
+    return filtered_articles
+
+def fetch_pubmed_evidence_direct(search_terms, original_terms=None):
+    """Fetch evidence from PubMed database with configurable parameters
+    
+    各症狀的檢索在共用線程池中並行執行（受 NCBI 速率限制），結果按症狀次序合併
+    """
     try:
         # Load configuration
         config = get_medical_search_config()
@@ -477,85 +736,50 @@ def fetch_pubmed_evidence(search_terms, original_terms=None):
         if original_terms is None:
             original_terms = search_terms
         
+        # Skip if primary API is not PubMed
+        if config.get('primary_search_api', 'pubmed') != 'pubmed':
+            logger.info(f"Skipping PubMed search, primary API is: {config.get('primary_search_api')}")
+            return []
+        
         max_symptoms = config.get('max_symptoms_processed', 4)
-        articles_per_symptom = config.get('articles_per_symptom', 2)
         timeout = config.get('search_timeout', 10)
-        retmax = config.get('pubmed_retmax', 3)
+        terms = [(term, original_terms[i] if i < len(original_terms) else term)
+                 for i, term in enumerate(search_terms[:max_symptoms])]  # Use configurable limit
+        
+        if PUBMED_PARALLEL_CONFIG['enabled'] and len(terms) > 1:
+            # 期限不會傳入線程池：先按剩餘時間計算每次請求及整體等待的上限
+            call_timeout = request_timeout(timeout)
+            futures = [pubmed_search_pool.submit(search_pubmed_term, term, original_term, config, call_timeout)
+                       for term, original_term in terms]
+            done, not_done = wait_futures(futures, timeout=request_timeout(2 * timeout))
+            if not_done:
+                logger.warning(f"Evidence time budget exhausted, dropping {len(not_done)} unfinished PubMed searches")
+                for future in not_done:
+                    future.cancel()
+            results = []
+            for (term, _), future in zip(terms, futures):
+                if future not in done:
+                    results.append(None)
+                elif future.exception() is not None:
+                    logger.error(f"PubMed search failed for '{term}': {future.exception()}")
+                    results.append(None)
+                else:
+                    results.append(future.result())
+        else:
+            results = []
+            for i, (term, original_term) in enumerate(terms):
+                # Stop searching once the evidence stage of the request deadline is used up
+                if deadline_exhausted():
+                    logger.warning(f"Evidence time budget exhausted, skipping remaining {len(terms) - i} PubMed searches")
+                    break
+                results.append(search_pubmed_term(term, original_term, config, request_timeout(timeout)))
         
-        for i, term in enumerate(search_terms[:max_symptoms]):  # Use configurable limit
-            original_term = original_terms[i] if i < len(original_terms) else term
-            
-            # Skip if primary API is not PubMed
-            if config.get('primary_search_api', 'pubmed') != 'pubmed':
-                logger.info(f"Skipping PubMed search, primary API is: {config.get('primary_search_api')}")
-                break
-                
-            # Construct improved search query to reduce irrelevant results
-            # Exclude rare disease and experimental studies
-            exclusions = "NOT (rare[Title/Abstract] OR case report[Publication Type] OR animal[MeSH Terms] OR in vitro[Title/Abstract])"
-            
-            # Focus on clinical relevance
-            clinical_focus = "(clinical[Title/Abstract] OR diagnosis[Title/Abstract] OR treatment[Title/Abstract] OR management[Title/Abstract] OR therapy[Title/Abstract])"
-            
-            # Prefer recent publications and systematic reviews
-            quality_boost = "(systematic review[Publication Type] OR meta-analysis[Publication Type] OR randomized controlled trial[Publication Type] OR guideline[Publication Type])"
-            
-            search_query = f"({term}[Title/Abstract] AND {clinical_focus}) {exclusions}"
-            
-            # PubMed E-utilities API
-            search_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-            search_params = {
-                'db': 'pubmed',
-                'term': search_query,
-                'retmax': retmax,  # Use configurable retmax
-                'sort': 'relevance',
-                'retmode': 'xml'
-            }
-            
-            search_response = requests.get(search_url, params=search_params, timeout=timeout)
-            
-            if search_response.status_code == 200:
-                # Parse XML response to get PMIDs
-                root = ET.fromstring(search_response.content)
-                pmids = [id_elem.text for id_elem in root.findall('.//Id')]
-                
-                if pmids:
-                    # Fetch article details
-                    fetch_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-                    fetch_params = {
-                        'db': 'pubmed',
-                        'id': ','.join(pmids[:articles_per_symptom]),  # Use configurable articles per symptom
-                        'retmode': 'xml'
-                    }
-                    
-                    fetch_response = requests.get(fetch_url, params=fetch_params, timeout=10)
-                    
-                    if fetch_response.status_code == 200:
-                        articles = parse_pubmed_articles(fetch_response.content, term, original_term)
-                        if articles:
-                            # Filter articles by relevance score
-                            config = get_medical_search_config()
-                            min_relevance = config.get('relevance_threshold', 2.0)
-                            
-                            filtered_articles = []
-                            for article in articles:
-                                score = article.get('relevance_score', 0)
-                                if score >= min_relevance:
-                                    filtered_articles.append(article)
-                                    logger.info(f"Article accepted: '{article['title'][:50]}...' (score: {score:.1f})")
-                                else:
-                                    logger.info(f"Article filtered out: '{article['title'][:50]}...' (score: {score:.1f}, threshold: {min_relevance})")
-                            
-                            if filtered_articles:
-                                evidence.extend(filtered_articles)
-                                symptom_coverage[original_term] = len(filtered_articles)
-                                logger.info(f"Found {len(filtered_articles)}/{len(articles)} relevant articles for symptom: {original_term}")
-                            else:
-                                logger.warning(f"No relevant articles found for symptom: {original_term} (all filtered out)")
-                                symptom_coverage[original_term] = 0
-                        else:
-                            logger.warning(f"No articles found for symptom: {original_term}")
-                            symptom_coverage[original_term] = 0
+        # Merge in symptom order so the result does not depend on which search finished first
+        for (term, original_term), articles in zip(terms, results):
+            if articles is None:
+                continue
+            evidence.extend(articles)
+            symptom_coverage[original_term] = len(articles)
         
         # Remove duplicate articles based on title
         seen_titles = set()
@@ -808,10 +1032,10 @@ def generate_relevance_explanation(display_term, title, abstract, search_term=No
         logger.error(f"Error generating relevance explanation: {e}")
         return f"此研究針對{display_term}提供實證醫學參考，有助於了解您的症狀。"
 
-def parse_pubmed_articles(xml_content, search_term, original_term=None):
-    """Parse PubMed XML response to extract article information"""
+def parse_pubmed_records(xml_content):
+    """Parse PubMed efetch XML into term-independent records (pmid, title, journal, year, abstract)"""
     try:
-        articles = []
+        records = []
         root = ET.fromstring(xml_content)
         
         for article in root.findall('.//PubmedArticle'):
@@ -827,45 +1051,72 @@ def parse_pubmed_articles(xml_content, search_term, original_term=None):
                 year_elem = article.find('.//PubDate/Year')
                 year = year_elem.text if year_elem is not None else "Unknown Year"
                 
-                # Extract abstract and find most relevant excerpt
                 abstract_elem = article.find('.//Abstract/AbstractText')
-                abstract = ""
-                if abstract_elem is not None:
-                    abstract_text = abstract_elem.text or ""
-                    # Find the most relevant excerpt based on search term
-                    abstract = extract_relevant_excerpt(abstract_text, search_term)
+                abstract_text = (abstract_elem.text or "") if abstract_elem is not None else ""
                 
                 # Extract PMID for URL
                 pmid_elem = article.find('.//PMID')
                 pmid = pmid_elem.text if pmid_elem is not None else ""
                 
-                if title and abstract:
-                    # Use original term for display, search term for analysis
-                    display_term = original_term if original_term else search_term
-                    
-                    # Calculate clinical relevance score
-                    relevance_score = calculate_clinical_relevance_score(title, abstract, search_term)
-                    
-                    articles.append({
-                        'title': title,
-                        'source': f"{journal}, {year}",
-                        'excerpt': abstract,
-                        'relevance': generate_relevance_explanation(display_term, title, abstract, search_term),
-                        'relevance_score': relevance_score,
-                        'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else "",
-                        'type': 'pubmed'
-                    })
+                records.append({
+                    'pmid': pmid,
+                    'title': title,
+                    'journal': journal,
+                    'year': year,
+                    'abstract': abstract_text
+                })
                     
             except Exception as e:
                 logger.error(f"Error parsing individual article: {e}")
                 continue
         
-        return articles
+        return records
         
     except Exception as e:
         logger.error(f"Error parsing PubMed XML: {e}")
         return []
 
+def score_pubmed_record(record, search_term):
+    """為記錄計算針對檢索詞的摘錄及臨床相關分數（寫入快取，同一檢索詞再用時毋須重算）"""
+    # Find the most relevant excerpt based on search term
+    excerpt = extract_relevant_excerpt(record['abstract'], search_term) if record.get('abstract') else ""
+    relevance_score = calculate_clinical_relevance_score(record['title'], excerpt, search_term) if record.get('title') and excerpt else 0
+    return dict(record, search_term=search_term, excerpt=excerpt, relevance_score=relevance_score)
+
+def build_pubmed_article(record, search_term, original_term=None):
+    """Evidence dict for a parsed record; None when it has no title or abstract"""
+    if record.get('search_term') != search_term or 'excerpt' not in record:
+        record = score_pubmed_record(record, search_term)
+    title, abstract = record['title'], record['excerpt']
+    if not (title and abstract):
+        return None
+    
+    # Use original term for display, search term for analysis
+    display_term = original_term if original_term else search_term
+    pmid = record.get('pmid', '')
+    return {
+        'title': title,
+        'source': f"{record['journal']}, {record['year']}",
+        'excerpt': abstract,
+        'relevance': generate_relevance_explanation(display_term, title, abstract, search_term),
+        'relevance_score': record['relevance_score'],
+        'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else "",
+        'type': 'pubmed'
+    }
+
+def parse_pubmed_articles(xml_content, search_term, original_term=None):
+    """Parse PubMed XML response to extract article information"""
+    articles = []
+    for record in parse_pubmed_records(xml_content):
+        try:
+            article = build_pubmed_article(record, search_term, original_term)
+        except Exception as e:
+            logger.error(f"Error parsing individual article: {e}")
+            continue
+        if article:
+            articles.append(article)
+    return articles
+
 def fetch_additional_medical_sources(search_terms):
     """Fetch evidence from additional medical sources when PubMed results are limited"""
     try:
@@ -945,13 +1196,13 @@ AI_CONFIG = {
     'provider': os.getenv('AI_PROVIDER', 'ollama'),  # 'ollama', 'openrouter', or 'openai'
     'openrouter': {
         'api_key': os.getenv('OPENROUTER_API_KEY', ''),
-        'base_url': 'https://openrouter.ai/api/v1/chat/completions',
+        'base_url': os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1/chat/completions'),
         'model': os.getenv('OPENROUTER_MODEL', 'anthropic/claude-3.5-sonnet'),
         'max_tokens': int(os.getenv('OPENROUTER_MAX_TOKENS', '4000'))
     },
     'openai': {
         'api_key': os.getenv('OPENAI_API_KEY', ''),
-        'base_url': 'https://api.openai.com/v1/chat/completions',
+        'base_url': os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1/chat/completions'),
         'model': os.getenv('OPENAI_MODEL', 'gpt-4'),
         'max_tokens': int(os.getenv('OPENAI_MAX_TOKENS', '4000'))
     },
@@ -962,9 +1213,245 @@ AI_CONFIG = {
         'max_tokens': int(os.getenv('VOLCENGINE_MAX_TOKENS', '4000'))
     },
     'ollama': {
-        'base_url': 'http://localhost:11434/api/generate',
-        'model': os.getenv('OLLAMA_MODEL', 'llama3.1:8b')
+        'base_url': os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434/api/generate'),
+        'model': os.getenv('OLLAMA_MODEL', 'llama3.1:8b'),
+        'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '30m'),  # 模型閒置後保留在記憶體的時間
+        'num_ctx': int(os.getenv('OLLAMA_NUM_CTX', '0')),  # 0 = 使用模型預設值
+        'num_thread': int(os.getenv('OLLAMA_NUM_THREAD', '0'))
+    }
+}
+
+AI_PROVIDERS = ('openrouter', 'openai', 'volcengine', 'ollama')
+
+def ai_route_from_env(call_type: str, provider: str = '', model: str = '', max_tokens: int = 0, timeout: int = 0) -> dict:
+    """從環境變數 AI_ROUTE_<TYPE>_* 讀取一條路由（空白/0 = 沿用主提供商設定）"""
+    prefix = f"AI_ROUTE_{call_type.upper()}_"
+    return {
+        'provider': os.getenv(prefix + 'PROVIDER', provider),
+        'model': os.getenv(prefix + 'MODEL', model),
+        'max_tokens': int(os.getenv(prefix + 'MAX_TOKENS', str(max_tokens))),
+        'timeout': int(os.getenv(prefix + 'TIMEOUT', str(timeout)))
+    }
+
+# AI調用路由配置 - Provider/model/max_tokens/timeout per call type: fast cheap models for translation,
+# validation and health checks, the premium model for diagnosis. Saved in system_config ('ai_routing')
+AI_ROUTING_CONFIG = {
+    'diagnose': ai_route_from_env('diagnose'),
+    'validate': ai_route_from_env('validate', 'openai', 'gpt-3.5-turbo', 500, 15),
+    'translate': ai_route_from_env('translate', max_tokens=1000, timeout=15),
+    'health': ai_route_from_env('health', max_tokens=50, timeout=15)
+}
+
+def sanitize_ai_route(route: dict) -> dict:
+    """清理一條路由設定：未知提供商視為沿用主提供商，數值不可為負"""
+    provider = str(route.get('provider') or '').strip().lower()
+    def non_negative(value):
+        try:
+            return max(0, int(value or 0))
+        except (TypeError, ValueError):
+            return 0
+    return {
+        'provider': provider if provider in AI_PROVIDERS else '',
+        'model': str(route.get('model') or '').strip(),
+        'max_tokens': non_negative(route.get('max_tokens')),
+        'timeout': non_negative(route.get('timeout'))
     }
+
+# PubMed E-utilities base URL (point at mock_ai_server.py for offline load testing)
+PUBMED_EUTILS_BASE_URL = os.getenv('PUBMED_BASE_URL', 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils').rstrip('/')
+
+# 斷路器配置 - Circuit breaker configuration for AI provider models (one breaker per provider:model) and PubMed
+CIRCUIT_BREAKER_CONFIG = {
+    'failure_rate_threshold': float(os.getenv('CIRCUIT_BREAKER_FAILURE_RATE', '0.5')),
+    'slow_call_threshold_ms': int(os.getenv('CIRCUIT_BREAKER_SLOW_CALL_MS', '20000')),
+    'window_size': int(os.getenv('CIRCUIT_BREAKER_WINDOW_SIZE', '20')),
+    'min_calls': int(os.getenv('CIRCUIT_BREAKER_MIN_CALLS', '5')),
+    'open_seconds': int(os.getenv('CIRCUIT_BREAKER_OPEN_SECONDS', '30'))
+}
+circuit_breakers.configure(**CIRCUIT_BREAKER_CONFIG)
+
+# 併發隔離配置 - Bulkhead limits per AI provider, with a tighter limit for PubMed (NCBI allows ~3 req/s without an API key)
+BULKHEAD_CONFIG = {
+    'max_concurrent': int(os.getenv('BULKHEAD_AI_MAX_CONCURRENT', '8')),
+    'max_queue': int(os.getenv('BULKHEAD_MAX_QUEUE', '16')),
+    'max_wait_seconds': float(os.getenv('BULKHEAD_MAX_WAIT_SECONDS', '5')),
+    'retry_after_seconds': int(os.getenv('BULKHEAD_RETRY_AFTER', '10'))
+}
+bulkheads.configure(**BULKHEAD_CONFIG)
+bulkheads.configure_dependency('pubmed', max_concurrent=int(os.getenv('BULKHEAD_PUBMED_MAX_CONCURRENT', '3')))
+
+# PubMed並行檢索配置 - Per-term esearch/efetch run concurrently on one shared pool, paced by NCBI's rate limit
+PUBMED_PARALLEL_CONFIG = {
+    'enabled': os.getenv('PUBMED_PARALLEL_ENABLED', 'true').lower() == 'true',
+    'max_workers': int(os.getenv('PUBMED_PARALLEL_WORKERS', '4')),
+    # NCBI E-utilities: 3 requests/second without an API key, 10 with one
+    'rate_per_second': float(os.getenv('PUBMED_RATE_LIMIT_PER_SECOND', '3'))
+}
+pubmed_rate_limiter.configure(PUBMED_PARALLEL_CONFIG['rate_per_second'])
+pubmed_search_pool = ThreadPoolExecutor(max_workers=PUBMED_PARALLEL_CONFIG['max_workers'], thread_name_prefix='pubmed-search')
+
+# PubMed持久快取配置 - esearch PMID lists (short TTL) and parsed articles (long TTL) kept in SQLite
+PUBMED_CACHE_CONFIG = {
+    'enabled': os.getenv('PUBMED_CACHE_ENABLED', 'true').lower() == 'true',
+    'db_path': os.getenv('PUBMED_CACHE_DB', 'pubmed_cache.db'),
+    'search_ttl_seconds': int(os.getenv('PUBMED_CACHE_SEARCH_TTL_SECONDS', str(24 * 3600))),
+    'article_ttl_seconds': int(os.getenv('PUBMED_CACHE_ARTICLE_TTL_SECONDS', str(30 * 24 * 3600))),
+    # 過期檢索在此時限內仍先返回舊結果，同時在背景重新檢索
+    'stale_while_revalidate': os.getenv('PUBMED_CACHE_STALE_WHILE_REVALIDATE', 'true').lower() == 'true',
+    'stale_seconds': int(os.getenv('PUBMED_CACHE_STALE_SECONDS', str(7 * 24 * 3600))),
+    # 背景刷新使用獨立線程，不佔用實時檢索的線程池
+    'refresh_workers': int(os.getenv('PUBMED_CACHE_REFRESH_WORKERS', '1'))
+}
+pubmed_cache.configure(
+    db_path=PUBMED_CACHE_CONFIG['db_path'],
+    search_ttl_seconds=PUBMED_CACHE_CONFIG['search_ttl_seconds'],
+    article_ttl_seconds=PUBMED_CACHE_CONFIG['article_ttl_seconds'],
+    stale_seconds=PUBMED_CACHE_CONFIG['stale_seconds']
+)
+pubmed_refresh_pool = ThreadPoolExecutor(max_workers=max(1, PUBMED_CACHE_CONFIG['refresh_workers']), thread_name_prefix='pubmed-refresh')
+# Settings that change what esearch returns for the same query; a change starts a fresh set of cached searches
+PUBMED_SEARCH_CONFIG_HASH = config_hash('pubmed', 'relevance', PUBMED_EUTILS_BASE_URL)
+
+# 分析任務隊列配置 - Dedicated worker pool for /find_doctor analysis jobs
+ANALYSIS_JOB_CONFIG = {
+    'enabled': os.getenv('ANALYSIS_JOBS_ENABLED', 'true').lower() == 'true',
+    'workers': int(os.getenv('ANALYSIS_JOB_WORKERS', '4')),
+    'max_pending': int(os.getenv('ANALYSIS_JOB_MAX_PENDING', '50')),
+    'result_ttl_seconds': int(os.getenv('ANALYSIS_JOB_RESULT_TTL', '600')),
+    'retry_after_seconds': int(os.getenv('ANALYSIS_JOB_RETRY_AFTER', '10'))
+}
+analysis_jobs.configure(
+    workers=ANALYSIS_JOB_CONFIG['workers'],
+    max_pending=ANALYSIS_JOB_CONFIG['max_pending'],
+    result_ttl_seconds=ANALYSIS_JOB_CONFIG['result_ttl_seconds']
+)
+
+# 翻譯微批次配置 - Untranslated terms from concurrent requests are merged into one indexed prompt
+TRANSLATION_BATCH_CONFIG = {
+    'enabled': os.getenv('TRANSLATION_BATCH_ENABLED', 'true').lower() == 'true',
+    'window_ms': int(os.getenv('TRANSLATION_BATCH_WINDOW_MS', '50')),
+    'max_batch_size': int(os.getenv('TRANSLATION_BATCH_MAX_TERMS', '40'))
+}
+translation_batcher.configure(
+    window_ms=TRANSLATION_BATCH_CONFIG['window_ms'],
+    max_batch_size=TRANSLATION_BATCH_CONFIG['max_batch_size']
+)
+
+# 請求期限配置 - End-to-end SLA for /find_doctor; each stage is capped by its budget and by the time left
+DEADLINE_CONFIG = {
+    'enabled': os.getenv('REQUEST_DEADLINE_ENABLED', 'true').lower() == 'true',
+    'total_seconds': float(os.getenv('REQUEST_DEADLINE_SECONDS', '20')),
+    'stage_budgets': {
+        'validation': float(os.getenv('DEADLINE_VALIDATION_SECONDS', '4')),
+        'translation': float(os.getenv('DEADLINE_TRANSLATION_SECONDS', '4')),
+        'evidence': float(os.getenv('DEADLINE_EVIDENCE_SECONDS', '6')),
+        'diagnosis': float(os.getenv('DEADLINE_DIAGNOSIS_SECONDS', '18'))
+    },
+    # Time kept back for the diagnosis call while optional stages run
+    'diagnosis_reserve_seconds': float(os.getenv('DEADLINE_DIAGNOSIS_RESERVE_SECONDS', '8')),
+    'evidence_min_seconds': float(os.getenv('DEADLINE_EVIDENCE_MIN_SECONDS', '2')),
+    'min_timeout_seconds': float(os.getenv('DEADLINE_MIN_TIMEOUT_SECONDS', '1'))
+}
+
+# 緊急快速通道配置 - Severe symptom matches get emergency guidance and doctors before the full analysis finishes
+EMERGENCY_FAST_PATH_CONFIG = {
+    'enabled': os.getenv('EMERGENCY_FAST_PATH_ENABLED', 'true').lower() == 'true'
+}
+
+# 漸進式配對配置 - Doctors for a keyword-predicted specialty first, LLM analysis and re-ranked doctors later
+PROGRESSIVE_MATCH_CONFIG = {
+    'enabled': os.getenv('PROGRESSIVE_MATCH_ENABLED', 'true').lower() == 'true'
+}
+
+# 本地分流模型配置 - Model trained offline by triage_model.py; used for progressive responses and AI outages
+TRIAGE_MODEL_CONFIG = {
+    'enabled': os.getenv('TRIAGE_MODEL_ENABLED', 'true').lower() == 'true',
+    'model_path': os.getenv('TRIAGE_MODEL_PATH', 'triage_model.npz'),
+    'min_confidence': float(os.getenv('TRIAGE_MODEL_MIN_CONFIDENCE', '0.5'))
+}
+triage_predictor.configure(TRIAGE_MODEL_CONFIG['model_path'], TRIAGE_MODEL_CONFIG['min_confidence'])
+
+# 症狀標準化配置 - Diagnoses are cached under a canonical key (folded script, synonyms, sorted terms, age/gender bands)
+SYMPTOM_CANONICAL_CONFIG = {
+    'enabled': os.getenv('SYMPTOM_CANONICAL_CACHE_ENABLED', 'true').lower() == 'true',
+    'diagnosis_cache_ttl_seconds': int(os.getenv('DIAGNOSIS_CACHE_TTL_SECONDS', '3600')),
+    'diagnosis_cache_size': int(os.getenv('DIAGNOSIS_CACHE_SIZE', '500'))
+}
+diagnosis_cache = CanonicalResultCache(SYMPTOM_CANONICAL_CONFIG['diagnosis_cache_ttl_seconds'],
+                                       SYMPTOM_CANONICAL_CONFIG['diagnosis_cache_size'])
+
+# 推測式預取配置 - /check_severe_symptoms starts translation, PubMed evidence and the local specialty
+# prediction in the background so /find_doctor usually finds them done; new work is dropped when busy
+SPECULATIVE_PREFETCH_CONFIG = {
+    'enabled': os.getenv('SPECULATIVE_PREFETCH_ENABLED', 'true').lower() == 'true',
+    'workers': int(os.getenv('SPECULATIVE_PREFETCH_WORKERS', '2')),
+    'max_pending': int(os.getenv('SPECULATIVE_PREFETCH_MAX_PENDING', '16')),
+    'ttl_seconds': int(os.getenv('SPECULATIVE_PREFETCH_TTL_SECONDS', '600')),
+    # Longest /find_doctor waits for a prefetch that is still running (also capped by the evidence budget)
+    'wait_seconds': float(os.getenv('SPECULATIVE_PREFETCH_WAIT_SECONDS', '3'))
+}
+
+def speculative_prefetch_overloaded() -> bool:
+    """分析任務隊列有積壓，或預取要用的 PubMed / 翻譯供應商併發已滿時不再推測，把資源留給已提交的請求"""
+    if analysis_jobs.get_stats().get('queued', 0) > 0:
+        return True
+    if DIAGNOSIS_OUTPUT_CONFIG['combined_validation']:
+        return False  # 合併模式只預取本地專科推斷，不佔用外部依賴
+    dependencies = ('pubmed', resolve_ai_route('translate')['provider'])
+    return any(bulkheads.get(name).is_saturated() for name in dependencies)
+
+symptom_prefetcher.configure(
+    workers=SPECULATIVE_PREFETCH_CONFIG['workers'],
+    max_pending=SPECULATIVE_PREFETCH_CONFIG['max_pending'],
+    ttl_seconds=SPECULATIVE_PREFETCH_CONFIG['ttl_seconds'],
+    overloaded_fn=speculative_prefetch_overloaded
+)
+
+# Ollama預熱配置 - Load the local model at startup and ping it when idle so the first request does not pay load time
+OLLAMA_WARMUP_CONFIG = {
+    'enabled': os.getenv('OLLAMA_WARMUP_ENABLED', 'true').lower() == 'true',
+    'check_interval_seconds': int(os.getenv('OLLAMA_KEEP_WARM_CHECK_SECONDS', '60')),
+    'idle_seconds': int(os.getenv('OLLAMA_KEEP_WARM_IDLE_SECONDS', '900')),  # 應短於 keep_alive
+    'timeout_seconds': int(os.getenv('OLLAMA_WARMUP_TIMEOUT', '120'))
+}
+
+# AI提供商基準測試配置 - Admin benchmark of all configured providers/models on the health-check diagnosis cases
+BENCHMARK_CONFIG = {
+    'max_workers': int(os.getenv('AI_BENCHMARK_MAX_WORKERS', '8')),
+    'max_repeats': int(os.getenv('AI_BENCHMARK_MAX_REPEATS', '10')),
+    'timeout_seconds': int(os.getenv('AI_BENCHMARK_TIMEOUT', '60')),
+    # 每個提供商同時最多幾個基準測試調用；每次調用另須取得該提供商的併發隔離名額，與實時流量共用上限
+    'max_per_provider': int(os.getenv('AI_BENCHMARK_MAX_PER_PROVIDER', '2')),
+    'result_ttl_seconds': int(os.getenv('AI_BENCHMARK_RESULT_TTL', '3600'))
+}
+
+# 健康探測配置 - /health returns the latest background probe result instead of calling the AI provider per request
+HEALTH_PROBE_CONFIG = {
+    'enabled': os.getenv('HEALTH_PROBE_ENABLED', 'true').lower() == 'true',
+    'interval_seconds': int(os.getenv('HEALTH_PROBE_INTERVAL', '60'))
+}
+
+# 診斷輸出配置 - 結構化JSON輸出，解析失敗時回退至正則表達式解析
+# 合併模式：症狀驗證、檢索詞翻譯和診斷共用同一次LLM調用 (需要結構化輸出)
+DIAGNOSIS_OUTPUT_CONFIG = {
+    'structured_output': os.getenv('AI_STRUCTURED_OUTPUT', 'true').lower() == 'true',
+    'combined_validation': os.getenv('AI_COMBINED_VALIDATION', 'true').lower() == 'true'
+}
+
+# 提示詞預算配置 - Evidence is cut to key sentences (no URLs) and dropped article by article
+# until the diagnosis prompt fits the model's token cap; PROMPT_MAX_TOKENS_BY_MODEL="llama3.1=3000,gpt-4=6000"
+PROMPT_BUDGET_CONFIG = {
+    'enabled': os.getenv('PROMPT_BUDGET_ENABLED', 'true').lower() == 'true',
+    'default_max_tokens': int(os.getenv('PROMPT_MAX_TOKENS', '6000')),
+    'model_max_tokens': parse_model_limits(os.getenv('PROMPT_MAX_TOKENS_BY_MODEL', '')),
+    # Ollama: cap = num_ctx - tokens kept for the answer
+    'output_reserve_tokens': int(os.getenv('PROMPT_OUTPUT_RESERVE_TOKENS', '1024')),
+    # Context window Ollama uses when num_ctx is not set (4096 in current releases, 2048 before 0.6);
+    # longer prompts are truncated silently, so the budget must assume it
+    'ollama_default_context': int(os.getenv('OLLAMA_DEFAULT_NUM_CTX', '4096')),
+    'evidence_max_articles': int(os.getenv('PROMPT_EVIDENCE_MAX_ARTICLES', '3')),
+    'evidence_max_sentences': int(os.getenv('PROMPT_EVIDENCE_MAX_SENTENCES', '2')),
+    'evidence_max_chars': int(os.getenv('PROMPT_EVIDENCE_MAX_CHARS', '400'))
 }
 
 # 嚴重症狀和病史配置 - Severe Symptoms and Conditions Configuration
@@ -1049,6 +1536,20 @@ SEVERE_SYMPTOMS_CONFIG = {
     ]
 }
 
+# 本地症狀驗證詞庫 - Lexicon for the local symptom validator
+# 衞生防護中心主題只有疾病類（登革熱、水痘…）計入詞庫；吸煙、飲食與營養等健康主題只作 topic，不足以判定為症狀
+CHP_TOPIC_TITLES = load_chp_topic_titles(os.path.join('assets', 'content.json'))
+# 專科名稱（外科、心臟科…）及其英文名不是症狀：只作主題詞，單獨輸入時交由LLM判斷
+SPECIALTY_NAME_TERMS = [term for zh, en in SYMPTOM_TERM_MAPPING.items() if is_specialty_name(zh) for term in (zh, en)]
+local_symptom_validator = LocalSymptomValidator(
+    [term for term in list(SYMPTOM_TERM_MAPPING.keys()) + list(SYMPTOM_TERM_MAPPING.values())
+     if term not in SPECIALTY_NAME_TERMS] +
+    SEVERE_SYMPTOMS_CONFIG['severe_symptoms'] +
+    SEVERE_SYMPTOMS_CONFIG['severe_conditions'] +
+    [title for title in CHP_TOPIC_TITLES if is_condition_topic(title) and not is_specialty_name(title)],
+    topic_terms=[title for title in CHP_TOPIC_TITLES if not is_condition_topic(title)] + SPECIALTY_NAME_TERMS
+)
+
 # 載入醫生資料
 def load_doctors_data():
     """載入醫生資料 - 從SQLite數據庫"""
@@ -1207,6 +1708,16 @@ def load_ai_config_from_db():
             AI_CONFIG.update(saved_config)
             print("Loaded AI config from database")
         
+        # Load per-call-type routing
+        cursor.execute('SELECT config_value FROM system_config WHERE config_key = ?', ('ai_routing',))
+        result = cursor.fetchone()
+        
+        if result:
+            for call_type, route in json.loads(result[0]).items():
+                if call_type in AI_ROUTING_CONFIG and isinstance(route, dict):
+                    AI_ROUTING_CONFIG[call_type] = sanitize_ai_route(route)
+            print("Loaded AI routing from database")
+        
         conn.close()
     except Exception as e:
         print(f"Error loading AI config from database: {e}")
@@ -1270,6 +1781,13 @@ def init_db():
             )
         ''')
         
+        # Emergency flag is stored with each query so reports don't re-parse the analysis text
+        try:
+            cursor.execute('ALTER TABLE user_queries ADD COLUMN emergency_needed INTEGER')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        
         # Doctor clicks table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS doctor_clicks (
@@ -1362,6 +1880,8 @@ print("=== LOADING AI CONFIG FROM DATABASE ===")
 load_ai_config_from_db()
 print("=== LOADING WHATSAPP CONFIG FROM DATABASE ===")
 load_whatsapp_config_from_db()
+print("=== SEEDING MEDICAL TRANSLATION MEMORY ===")
+translation_memory.seed(SYMPTOM_TERM_MAPPING)
 print("=== APP STARTUP COMPLETE ===")
 
 # WhatsApp客戶端實例
@@ -2148,11 +2668,65 @@ def generate_user_summary(age: int, gender: str, symptoms: str, chronic_conditio
     
     return '\n'.join(summary_parts)
 
-def call_openrouter_api(prompt: str) -> str:
+def build_chat_messages(prompt: str, system_prompt: str = None, cache_control: bool = False) -> list:
+    """構建對話訊息 - 靜態系統前綴在前，動態內容在後，以便提供商進行前綴快取"""
+    messages = []
+    if system_prompt:
+        if cache_control:
+            # Anthropic models (via OpenRouter) only cache prefixes marked with a breakpoint
+            messages.append({
+                "role": "system",
+                "content": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+            })
+        else:
+            messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+def apply_response_format(data: dict, provider: str, response_schema: dict = None) -> None:
+    """為支援結構化輸出的提供商加入 response_format / format 欄位"""
+    if not response_schema:
+        return
+    response_format = build_response_format(provider, data.get('model') or AI_CONFIG[provider].get('model'), response_schema)
+    if response_format:
+        field, value = response_format
+        data[field] = value
+
+def record_llm_call(provider: str, model: str, call_type: str, start_time: float = None,
+                    outcome: str = 'success', result: dict = None) -> None:
+    """記錄一次LLM調用的延遲、token用量與結果（start_time為None表示請求未發出）"""
+    usage = extract_usage(result)
+    latency_ms = (time.time() - start_time) * 1000 if start_time is not None else None
+    if outcome == 'success':
+        prompt_cache_stats.record(provider, model, usage)
+    llm_call_metrics.record(provider, model, call_type, latency_ms, outcome, usage)
+
+def llm_error_outcome(error: Exception) -> str:
+    """將調用異常歸類為 timeout / error"""
+    return 'timeout' if isinstance(error, requests.exceptions.Timeout) else 'error'
+
+def ai_circuit_breaker(provider: str, model: str):
+    """每個 (提供商, 模型) 一個斷路器：路由把不同質素的模型放在同一提供商上，廉價模型失敗不應令診斷模型快速失敗"""
+    return circuit_breakers.get(f"{provider}:{model}")
+
+def call_openrouter_api(prompt: str, system_prompt: str = None, response_schema: dict = None,
+                        call_type: str = 'diagnose', model: str = None,
+                        max_tokens: int = None, timeout: float = None) -> str:
     """調用OpenRouter API進行AI分析"""
+    model = model or AI_CONFIG['openrouter']['model']
+    max_tokens = max_tokens or AI_CONFIG['openrouter']['max_tokens']
+    breaker = ai_circuit_breaker('openrouter', model)
+    start_time = None
+    call_timeout = None
     try:
         if not AI_CONFIG['openrouter']['api_key']:
+            record_llm_call('openrouter', model, call_type, outcome='not_configured')
             return "AI服務配置不完整，請聯繫系統管理員"
+        
+        if not breaker.allow_request():
+            logger.warning(f"OpenRouter circuit breaker open for {model}, failing fast")
+            record_llm_call('openrouter', model, call_type, outcome='circuit_open')
+            return "AI分析服務暫時不可用，請稍後再試"
             
         headers = {
             "Authorization": f"Bearer {AI_CONFIG['openrouter']['api_key']}",
@@ -2162,36 +2736,60 @@ def call_openrouter_api(prompt: str) -> str:
         }
         
         data = {
-            "model": AI_CONFIG['openrouter']['model'],
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": AI_CONFIG['openrouter']['max_tokens'],
+            "model": model,
+            "messages": build_chat_messages(
+                prompt, system_prompt,
+                cache_control=model.startswith('anthropic/')
+            ),
+            "max_tokens": max_tokens,
             "temperature": 0.3,
             "top_p": 0.9
         }
+        apply_response_format(data, 'openrouter', response_schema)
         
+        call_timeout = request_timeout(timeout or 60)
+        start_time = time.time()
         response = requests.post(
             AI_CONFIG['openrouter']['base_url'], 
             headers=headers, 
             json=data, 
-            timeout=60
+            timeout=call_timeout
         )
         
         if response.status_code == 200:
             result = response.json()
-            return result['choices'][0]['message']['content']
+            content = result['choices'][0]['message']['content']
+            breaker.record_success(time.time() - start_time)
+            record_llm_call('openrouter', model, call_type, start_time, result=result)
+            return content
         else:
+            breaker.record_failure(f"HTTP {response.status_code}")
+            record_llm_call('openrouter', model, call_type, start_time, f"http_{response.status_code}")
             return "AI分析服務暫時不可用，請稍後再試"
             
     except Exception as e:
+        record_breaker_error(breaker, e, call_timeout, timeout or 60)
+        record_llm_call('openrouter', model, call_type, start_time, llm_error_outcome(e))
         return "AI分析服務暫時不可用，請稍後再試"
 
-def call_openai_api(prompt: str) -> str:
+def call_openai_api(prompt: str, system_prompt: str = None, response_schema: dict = None,
+                    call_type: str = 'diagnose', model: str = None,
+                    max_tokens: int = None, timeout: float = None) -> str:
     """調用OpenAI API進行AI分析"""
+    model = model or AI_CONFIG['openai']['model']
+    max_tokens = max_tokens or AI_CONFIG['openai']['max_tokens']
+    breaker = ai_circuit_breaker('openai', model)
+    start_time = None
+    call_timeout = None
     try:
         if not AI_CONFIG['openai']['api_key']:
+            record_llm_call('openai', model, call_type, outcome='not_configured')
             return "AI服務配置不完整，請聯繫系統管理員"
+        
+        if not breaker.allow_request():
+            logger.warning(f"OpenAI circuit breaker open for {model}, failing fast")
+            record_llm_call('openai', model, call_type, outcome='circuit_open')
+            return "AI分析服務暫時不可用，請稍後再試"
             
         headers = {
             "Authorization": f"Bearer {AI_CONFIG['openai']['api_key']}",
@@ -2199,51 +2797,211 @@ def call_openai_api(prompt: str) -> str:
         }
         
         data = {
-            "model": AI_CONFIG['openai']['model'],
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": AI_CONFIG['openai']['max_tokens'],
+            "model": model,
+            "messages": build_chat_messages(prompt, system_prompt),
+            "max_tokens": max_tokens,
             "temperature": 0.3,
             "top_p": 0.9
         }
+        apply_response_format(data, 'openai', response_schema)
         
+        call_timeout = request_timeout(timeout or 60)
+        start_time = time.time()
         response = requests.post(
             AI_CONFIG['openai']['base_url'], 
             headers=headers, 
             json=data, 
-            timeout=60
+            timeout=call_timeout
         )
         
         if response.status_code == 200:
             result = response.json()
-            return result['choices'][0]['message']['content']
+            content = result['choices'][0]['message']['content']
+            breaker.record_success(time.time() - start_time)
+            record_llm_call('openai', model, call_type, start_time, result=result)
+            return content
         else:
+            breaker.record_failure(f"HTTP {response.status_code}")
+            record_llm_call('openai', model, call_type, start_time, f"http_{response.status_code}")
             return "AI分析服務暫時不可用，請稍後再試"
             
     except Exception as e:
+        record_breaker_error(breaker, e, call_timeout, timeout or 60)
+        record_llm_call('openai', model, call_type, start_time, llm_error_outcome(e))
         return "AI分析服務暫時不可用，請稍後再試"
 
-def call_ollama_api(prompt: str) -> str:
+def call_ollama_api(prompt: str, system_prompt: str = None, response_schema: dict = None,
+                    call_type: str = 'diagnose', model: str = None,
+                    max_tokens: int = None, timeout: float = None) -> str:
     """調用Ollama API進行AI分析"""
+    model = model or AI_CONFIG['ollama']['model']
+    breaker = ai_circuit_breaker('ollama', model)
+    start_time = None
+    call_timeout = None
     try:
+        if not breaker.allow_request():
+            logger.warning(f"Ollama circuit breaker open for {model}, failing fast")
+            record_llm_call('ollama', model, call_type, outcome='circuit_open')
+            return "AI分析服務暫時不可用，請稍後再試"
+        
         data = {
-            "model": AI_CONFIG['ollama']['model'],
+            "model": model,
             "prompt": prompt,
             "stream": False
         }
-        
-        response = requests.post(AI_CONFIG['ollama']['base_url'], json=data, timeout=30)
+        data.update(ollama_residency_options())
+        if max_tokens:
+            data.setdefault('options', {})['num_predict'] = max_tokens
+        if system_prompt:
+            data["system"] = system_prompt
+        apply_response_format(data, 'ollama', response_schema)
+        
+        call_timeout = request_timeout(timeout or 30)
+        start_time = time.time()
+        response = requests.post(AI_CONFIG['ollama']['base_url'], json=data, timeout=call_timeout)
         if response.status_code == 200:
             result = response.json()
+            ollama_model_state(model)['last_used_at'] = time.time()
+            breaker.record_success(time.time() - start_time)
+            record_llm_call('ollama', model, call_type, start_time, result=result)
             return result.get('response', 'AI分析服務暫時不可用，請稍後再試')
         else:
+            breaker.record_failure(f"HTTP {response.status_code}")
+            record_llm_call('ollama', model, call_type, start_time, f"http_{response.status_code}")
             return "AI分析服務暫時不可用，請稍後再試"
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.ConnectionError as e:
+        record_breaker_error(breaker, e, call_timeout, timeout or 30)
+        record_llm_call('ollama', model, call_type, start_time, llm_error_outcome(e))
         return "AI分析服務暫時不可用，請稍後再試"
     except Exception as e:
+        record_breaker_error(breaker, e, call_timeout, timeout or 30)
+        record_llm_call('ollama', model, call_type, start_time, llm_error_outcome(e))
         return "AI分析服務暫時不可用，請稍後再試"
 
+# Ollama模型駐留狀態：每個模型的預熱結果及最近使用時間
+OLLAMA_RESIDENCY = {}
+_ollama_keep_warm_thread = None
+_ollama_keep_warm_lock = threading.Lock()
+_ollama_keep_warm_wake = threading.Event()
+
+def ollama_model_state(model: str) -> dict:
+    """取得（或建立）單一Ollama模型的駐留狀態"""
+    return OLLAMA_RESIDENCY.setdefault(model, {
+        'last_used_at': None,
+        'last_warmup_at': None,
+        'last_warmup_ms': None,
+        'last_warmup_reason': None,
+        'last_error': None,
+        'warmups': 0
+    })
+
+def ollama_residency_options() -> dict:
+    """Ollama請求的 keep_alive 及 options（num_ctx / num_thread 為0時使用模型預設值）"""
+    config = AI_CONFIG['ollama']
+    fields = {}
+    keep_alive = str(config.get('keep_alive') or '').strip()
+    if keep_alive:
+        # 純數字為秒數（-1 = 永久駐留），其餘為時長字串如 "30m"
+        fields['keep_alive'] = int(keep_alive) if keep_alive.lstrip('-').isdigit() else keep_alive
+    options = {key: int(config[key]) for key in ('num_ctx', 'num_thread') if config.get(key)}
+    if options:
+        fields['options'] = options
+    return fields
+
+def ollama_warm_targets() -> list:
+    """需要保持駐留的Ollama模型：所有解析到Ollama的調用路由（含主提供商的診斷模型）"""
+    models = []
+    for call_type in dict.fromkeys(('diagnose',) + tuple(AI_ROUTING_CONFIG)):
+        route = resolve_ai_route(call_type)
+        if route['provider'] == 'ollama' and route['model'] and route['model'] not in models:
+            models.append(route['model'])
+    return models
+
+def warm_ollama_model(model: str = None, reason: str = 'startup') -> bool:
+    """以空白prompt載入Ollama模型（不生成內容），並以 keep_alive 保持駐留"""
+    model = model or AI_CONFIG['ollama']['model']
+    data = {"model": model, "prompt": "", "stream": False}
+    data.update(ollama_residency_options())
+    start_time = time.time()
+    try:
+        response = requests.post(AI_CONFIG['ollama']['base_url'], json=data,
+                                 timeout=OLLAMA_WARMUP_CONFIG['timeout_seconds'])
+        error = None if response.status_code == 200 else f"HTTP {response.status_code}"
+        record_llm_call('ollama', model, 'warmup', start_time, 'success' if error is None else f"http_{response.status_code}")
+    except Exception as e:
+        error = str(e)
+        record_llm_call('ollama', model, 'warmup', start_time, llm_error_outcome(e))
+    
+    elapsed_ms = int((time.time() - start_time) * 1000)
+    state = ollama_model_state(model)
+    state.update({
+        'last_warmup_at': time.time(),
+        'last_warmup_ms': elapsed_ms,
+        'last_warmup_reason': reason,
+        'last_error': error
+    })
+    if error is None:
+        state['warmups'] += 1
+        state['last_used_at'] = time.time()
+        logger.info(f"Ollama model {model} warmed up ({reason}) in {elapsed_ms}ms")
+    else:
+        logger.warning(f"Ollama warm-up of {model} ({reason}) failed: {error}")
+    return error is None
+
+def ollama_needs_warmup(model: str) -> bool:
+    """模型未曾預熱（或配置更改後需重新載入）、上次預熱失敗，或閒置過久"""
+    state = OLLAMA_RESIDENCY.get(model)
+    if state is None or state['last_used_at'] is None:
+        return True
+    return time.time() - state['last_used_at'] >= OLLAMA_WARMUP_CONFIG['idle_seconds']
+
+def request_ollama_rewarm(reload: bool = True):
+    """Ollama配置或路由已更改：立即喚醒背景線程預熱；reload=True 時（新 num_ctx 等）所有模型都重新載入"""
+    if reload:
+        OLLAMA_RESIDENCY.clear()
+    start_ollama_keep_warm()
+    _ollama_keep_warm_wake.set()
+
+def start_ollama_keep_warm():
+    """啟動背景預熱線程：啟動時立即預熱，之後在閒置時定期ping（每個進程只啟動一次）"""
+    global _ollama_keep_warm_thread
+    if not OLLAMA_WARMUP_CONFIG['enabled']:
+        return
+    with _ollama_keep_warm_lock:
+        if _ollama_keep_warm_thread is not None:
+            return
+        
+        def keep_warm():
+            reason = 'startup'
+            while True:
+                try:
+                    for model in ollama_warm_targets():
+                        if ollama_needs_warmup(model):
+                            warm_ollama_model(model, reason)
+                except Exception as e:
+                    logger.error(f"Ollama keep-warm error: {e}")
+                # 配置更改時 request_ollama_rewarm() 提早喚醒
+                woken = _ollama_keep_warm_wake.wait(OLLAMA_WARMUP_CONFIG['check_interval_seconds'])
+                _ollama_keep_warm_wake.clear()
+                reason = 'config' if woken else 'idle'
+        
+        _ollama_keep_warm_thread = threading.Thread(target=keep_warm, name='ollama-keep-warm', daemon=True)
+        _ollama_keep_warm_thread.start()
+        logger.info(f"Ollama keep-warm started (idle after {OLLAMA_WARMUP_CONFIG['idle_seconds']}s)")
+
+def get_ollama_residency_status() -> dict:
+    """Ollama駐留狀態（供系統健康頁面顯示）"""
+    targets = ollama_warm_targets()
+    models = {}
+    for model, state in list(OLLAMA_RESIDENCY.items()):
+        models[model] = dict(state, idle_seconds=int(time.time() - state['last_used_at']) if state['last_used_at'] else None)
+    return {
+        'active': bool(targets),
+        'targets': targets,
+        'keep_alive': AI_CONFIG['ollama'].get('keep_alive'),
+        'models': models
+    }
+
 def get_openai_models(api_key: str = None) -> list:
     """獲取OpenAI可用模型列表"""
     try:
@@ -2283,11 +3041,24 @@ def get_openai_models(api_key: str = None) -> list:
         print(f"Error fetching OpenAI models: {e}")
         return ['gpt-4', 'gpt-4-turbo', 'gpt-3.5-turbo']  # fallback
 
-def call_volcengine_api(prompt: str) -> str:
+def call_volcengine_api(prompt: str, system_prompt: str = None, response_schema: dict = None,
+                        call_type: str = 'diagnose', model: str = None,
+                        max_tokens: int = None, timeout: float = None) -> str:
     """調用Volcano Engine (豆包) API進行AI分析"""
+    model = model or AI_CONFIG['volcengine']['model']
+    max_tokens = max_tokens or AI_CONFIG['volcengine']['max_tokens']
+    breaker = ai_circuit_breaker('volcengine', model)
+    start_time = None
+    call_timeout = None
     try:
         if not AI_CONFIG['volcengine']['api_key']:
+            record_llm_call('volcengine', model, call_type, outcome='not_configured')
             return "AI服務配置不完整，請聯繫系統管理員"
+        
+        if not breaker.allow_request():
+            logger.warning(f"Volcano Engine circuit breaker open for {model}, failing fast")
+            record_llm_call('volcengine', model, call_type, outcome='circuit_open')
+            return "AI分析服務暫時不可用，請稍後再試"
             
         headers = {
             "Authorization": f"Bearer {AI_CONFIG['volcengine']['api_key']}",
@@ -2295,45 +3066,96 @@ def call_volcengine_api(prompt: str) -> str:
         }
         
         data = {
-            "model": AI_CONFIG['volcengine']['model'],
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": AI_CONFIG['volcengine']['max_tokens'],
+            "model": model,
+            "messages": build_chat_messages(prompt, system_prompt),
+            "max_tokens": max_tokens,
             "temperature": 0.3,
             "top_p": 0.9
         }
+        apply_response_format(data, 'volcengine', response_schema)
         
+        call_timeout = request_timeout(timeout or 60)
+        start_time = time.time()
         response = requests.post(
             AI_CONFIG['volcengine']['base_url'], 
             headers=headers, 
             json=data, 
-            timeout=60
+            timeout=call_timeout
         )
         
         if response.status_code == 200:
             result = response.json()
-            return result['choices'][0]['message']['content']
+            content = result['choices'][0]['message']['content']
+            breaker.record_success(time.time() - start_time)
+            record_llm_call('volcengine', model, call_type, start_time, result=result)
+            return content
         else:
             logger.error(f"Volcano Engine API Error: {response.text}")
+            breaker.record_failure(f"HTTP {response.status_code}")
+            record_llm_call('volcengine', model, call_type, start_time, f"http_{response.status_code}")
             return "AI分析服務暫時不可用，請稍後再試"
             
     except Exception as e:
         logger.error(f"Volcano Engine connection error: {e}")
+        record_breaker_error(breaker, e, call_timeout, timeout or 60)
+        record_llm_call('volcengine', model, call_type, start_time, llm_error_outcome(e))
         return "AI分析服務暫時不可用，請稍後再試"
 
-def call_ai_api(prompt: str) -> str:
-    """根據配置調用相應的AI API"""
-    provider = AI_CONFIG['provider'].lower()
+def ai_provider_configured(provider: str) -> bool:
+    """提供商是否可用（Ollama無需API密鑰）"""
+    if provider == 'ollama':
+        return True
+    return isinstance(AI_CONFIG.get(provider), dict) and bool(AI_CONFIG[provider].get('api_key'))
+
+def resolve_ai_route(call_type: str) -> dict:
+    """調用類型 -> {provider, model, max_tokens, timeout}
     
+    路由未指定（或指定的提供商未配置）時沿用 AI_CONFIG 的主提供商及其模型；max_tokens / timeout 為 None 時使用提供商預設值
+    """
+    route = AI_ROUTING_CONFIG.get(call_type) or {}
+    provider = AI_CONFIG['provider'].lower()
+    model = None
+    routed_provider = (route.get('provider') or '').lower()
+    if routed_provider in AI_PROVIDERS and ai_provider_configured(routed_provider):
+        provider = routed_provider
+        model = route.get('model') or None
+    elif not routed_provider:
+        model = route.get('model') or None
+    if model is None and isinstance(AI_CONFIG.get(provider), dict):
+        model = AI_CONFIG[provider].get('model')
+    return {
+        'provider': provider,
+        'model': model,
+        'max_tokens': route.get('max_tokens') or None,
+        'timeout': route.get('timeout') or None
+    }
+
+def call_ai_api(prompt: str, system_prompt: str = None, response_schema: dict = None,
+                call_type: str = 'diagnose') -> str:
+    """根據調用類型的路由調用相應的AI API - 相同的並發請求共用同一次調用"""
+    route = resolve_ai_route(call_type)
+    provider = route['provider']
+    fingerprint = make_fingerprint('ai', provider, route['model'], call_type, system_prompt, prompt, response_schema)
+    try:
+        return single_flight.do(fingerprint, bulkheads.get(provider).call, call_ai_provider,
+                                provider, prompt, system_prompt, response_schema, call_type,
+                                route['model'], route['max_tokens'], route['timeout'])
+    except SingleFlightTimeout as e:
+        logger.warning(f"Gave up waiting for shared {call_type} call to {provider}: {e}")
+        return "AI分析服務暫時不可用，請稍後再試"
+
+def call_ai_provider(provider: str, prompt: str, system_prompt: str = None, response_schema: dict = None,
+                     call_type: str = 'diagnose', model: str = None, max_tokens: int = None,
+                     timeout: float = None) -> str:
+    """調用指定的AI提供商（model / max_tokens / timeout 為 None 時使用提供商配置）"""
     if provider == 'openrouter':
-        return call_openrouter_api(prompt)
+        return call_openrouter_api(prompt, system_prompt, response_schema, call_type, model, max_tokens, timeout)
     elif provider == 'openai':
-        return call_openai_api(prompt)
+        return call_openai_api(prompt, system_prompt, response_schema, call_type, model, max_tokens, timeout)
     elif provider == 'volcengine':
-        return call_volcengine_api(prompt)
+        return call_volcengine_api(prompt, system_prompt, response_schema, call_type, model, max_tokens, timeout)
     elif provider == 'ollama':
-        return call_ollama_api(prompt)
+        return call_ollama_api(prompt, system_prompt, response_schema, call_type, model, max_tokens, timeout)
     else:
         return f"不支援的AI提供商: {provider}"
 
@@ -2429,16 +3251,34 @@ def get_available_specialties() -> list:
         print(f"Error fetching specialties: {e}")
         return ['內科', '外科', '兒科', '婦產科', '骨科', '皮膚科', '眼科', '耳鼻喉科', '精神科', '神經科', '心臟科', '急診科', '普通科', '家庭醫學科']
 
+def validate_symptoms(symptoms: str, user_language: str = 'zh-TW', escalate: bool = True) -> dict:
+    """驗證症狀描述 - 先用本地規則判斷，只有模糊的輸入才交由LLM驗證
+    
+    escalate=False 時模糊輸入不單獨調用LLM，而是標記為 deferred，由合併模式的診斷調用給出判斷
+    """
+    local_result = local_symptom_validator.validate(symptoms)
+    stats = local_symptom_validator.get_stats()
+    logger.info(f"Local symptom validation: {local_result['verdict']} ({local_result['reason']}), "
+                f"LLM escalation rate {stats['escalation_rate']:.1%} over {stats['total']} checks")
+    
+    if local_result['verdict'] == LocalSymptomValidator.AMBIGUOUS:
+        if not escalate:
+            return {'valid': True, 'deferred': True, 'confidence': local_result['confidence'],
+                    'issues': [], 'suggestions': [], 'message': '症狀驗證將由診斷調用完成'}
+        return validate_symptoms_with_llm(symptoms, user_language)
+    
+    is_valid = local_result['verdict'] == LocalSymptomValidator.VALID
+    return {
+        'valid': is_valid,
+        'confidence': local_result['confidence'],
+        'issues': local_result['issues'],
+        'suggestions': [] if is_valid else ['請描述具體的身體不適症狀，例如頭痛、發燒、咳嗽等'],
+        'message': '症狀驗證完成（本地規則）'
+    }
+
 def validate_symptoms_with_llm(symptoms: str, user_language: str = 'zh-TW') -> dict:
-    """使用LLM驗證症狀描述是否有效"""
+    """使用LLM驗證症狀描述是否有效 - 模型由 AI_ROUTING_CONFIG['validate'] 決定"""
     try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            return {'valid': True, 'message': '症狀驗證服務不可用，將繼續處理'}
-        
-        # Get translations for the prompt
-        t = lambda key: get_translation(key, user_language)
-        
         prompt = f"""
 你是一個醫療症狀驗證專家。請分析以下症狀描述，判斷是否為有效的醫療症狀。
 
@@ -2464,120 +3304,292 @@ def validate_symptoms_with_llm(symptoms: str, user_language: str = 'zh-TW') -> d
 }}
 """
         
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'model': 'gpt-3.5-turbo',
-            'messages': [
-                {'role': 'system', 'content': '你是一個專業的醫療症狀驗證助手。請仔細分析症狀描述的有效性。'},
-                {'role': 'user', 'content': prompt}
-            ],
-            'max_tokens': 500,
-            'temperature': 0.3
-        }
-        
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            json=data,
-            timeout=15
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-            
-            try:
-                # Parse JSON response
-                validation_result = json.loads(content)
-                return {
-                    'valid': validation_result.get('valid', True),
-                    'confidence': validation_result.get('confidence', 0.5),
-                    'issues': validation_result.get('issues', []),
-                    'suggestions': validation_result.get('suggestions', []),
-                    'message': '症狀驗證完成'
-                }
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                is_valid = 'true' in content.lower() and 'valid' in content.lower()
-                return {
-                    'valid': is_valid,
-                    'confidence': 0.7,
-                    'issues': [],
-                    'suggestions': [],
-                    'message': '症狀驗證完成（簡化結果）'
-                }
-        else:
-            logger.error(f"Symptom validation API error: {response.status_code}")
+        try:
+            content = call_ai_api(prompt, '你是一個專業的醫療症狀驗證助手。請仔細分析症狀描述的有效性。', call_type='validate')
+        except BulkheadFull:
+            logger.warning("AI bulkhead saturated, skipping symptom validation")
+            return {'valid': True, 'message': '症狀驗證服務繁忙，將繼續處理'}
+        
+        # 未配置、斷路器打開或調用失敗時不阻擋用戶
+        if not content or content.startswith(('AI分析服務暫時不可用', 'AI服務配置不完整', '不支援的AI提供商')):
+            logger.warning("Symptom validation model unavailable, continuing without validation")
             return {'valid': True, 'message': '症狀驗證服務暫時不可用，將繼續處理'}
+        content = content.strip()
+        
+        try:
+            # Parse JSON response (smaller models may wrap it in a code fence)
+            json_match = re.search(r'\{.*\}', content, re.DOTALL)
+            validation_result = json.loads(json_match.group(0) if json_match else content)
+            return {
+                'valid': validation_result.get('valid', True),
+                'confidence': validation_result.get('confidence', 0.5),
+                'issues': validation_result.get('issues', []),
+                'suggestions': validation_result.get('suggestions', []),
+                'message': '症狀驗證完成'
+            }
+        except json.JSONDecodeError:
+            # Fallback if JSON parsing fails
+            is_valid = 'true' in content.lower() and 'valid' in content.lower()
+            return {
+                'valid': is_valid,
+                'confidence': 0.7,
+                'issues': [],
+                'suggestions': [],
+                'message': '症狀驗證完成（簡化結果）'
+            }
             
     except Exception as e:
         logger.error(f"Error validating symptoms: {e}")
         return {'valid': True, 'message': '症狀驗證過程中出現錯誤，將繼續處理'}
 
+def symptom_search_terms(symptoms: str, reserve_seconds: float = 0) -> tuple:
+    """症狀文本 -> (PubMed檢索詞, 顯示用原文)，中文症狀先翻譯；只取前3個症狀以集中檢索"""
+    # Extract key medical terms from symptoms for evidence search
+    symptom_terms = [s.strip() for s in symptoms.replace('、', ',').split(',') if s.strip()]
+    
+    # Translate terms if they're in Chinese
+    if any(any('\u4e00' <= c <= '\u9fff' for c in term) for term in symptom_terms):
+        with deadline_stage('translation', reserve_seconds):
+            translated_terms = translate_medical_terms_with_ai(symptom_terms)
+        search_terms = translated_terms if translated_terms else symptom_terms
+    else:
+        search_terms = symptom_terms
+    
+    # Use symptom-based search only to avoid infinite recursion
+    return search_terms[:3], symptom_terms[:3]
+
+def symptom_prefetch_key(symptoms: str) -> str:
+    """推測式預取的鍵 - 只取標準化症狀，不含年齡/性別等用戶資料"""
+    return symptom_canonicalizer.canonicalize(symptoms, track=False)['key']
+
+def prefetch_symptom_stages(symptoms: str) -> dict:
+    """與用戶無關、可快取的階段：檢索詞翻譯、PubMed文獻及本地專科推斷
+    
+    合併模式下 /find_doctor 不經 analyze_symptoms_with_evidence，檢索詞由診斷調用本身返回，
+    預取翻譯及文獻無人使用，故只預取本地專科推斷
+    """
+    if DIAGNOSIS_OUTPUT_CONFIG['combined_validation']:
+        return {'search_terms': [], 'evidence': [], 'specialty': predict_local_specialty(symptoms)}
+    search_terms, display_terms = symptom_search_terms(symptoms)
+    return {
+        'search_terms': search_terms,
+        'evidence': fetch_pubmed_evidence(search_terms, display_terms),
+        'specialty': predict_local_specialty(symptoms)
+    }
+
+def start_symptom_prefetch(symptoms: str) -> str:
+    """在背景預取症狀相關階段；返回 queued / duplicate / cached / dropped，未啟用時返回 None"""
+    if not SPECULATIVE_PREFETCH_CONFIG['enabled'] or not isinstance(symptoms, str) or not symptoms.strip():
+        return None
+    return symptom_prefetcher.submit(symptom_prefetch_key(symptoms), prefetch_symptom_stages, symptoms)
+
+def get_prefetched_stages(symptoms: str, wait_seconds: float = 0) -> dict:
+    """取得預取結果，預取仍在進行時最多等待 wait_seconds；沒有時返回 None"""
+    if not SPECULATIVE_PREFETCH_CONFIG['enabled']:
+        return None
+    return symptom_prefetcher.get(symptom_prefetch_key(symptoms), wait_seconds)
+
 def analyze_symptoms_with_evidence(age: int, gender: str, symptoms: str, chronic_conditions: str = '', detailed_health_info: dict = None, user_language: str = 'zh-TW') -> dict:
     """使用AI分析症狀並結合醫學文獻證據 - 優化版本避免重複AI調用"""
     
     # Extract medical evidence based on symptoms only (avoid double AI calls)
-    medical_evidence = ""
+    evidence_results = []
+    focused_search_terms = []
+    
+    # 文獻檢索為可選階段：剩餘時間不足以完成檢索並保留診斷時間時直接跳過
+    deadline = current_deadline()
+    reserve_seconds = DEADLINE_CONFIG['diagnosis_reserve_seconds']
+    if deadline is not None and not deadline.has_time_for(DEADLINE_CONFIG['evidence_min_seconds'], reserve_seconds):
+        deadline.skip('evidence')
+        logger.warning(f"Skipping medical evidence: {deadline.remaining():.1f}s left in request deadline")
+        return analyze_symptoms_with_context(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language)
     
     try:
-        # Extract key medical terms from symptoms for evidence search
-        symptom_terms = [s.strip() for s in symptoms.replace('、', ',').split(',') if s.strip()]
-        
-        # Translate terms if they're in Chinese
-        if any(any('\u4e00' <= c <= '\u9fff' for c in term) for term in symptom_terms):
-            translated_terms = translate_medical_terms_with_ai(symptom_terms)
-            search_terms = translated_terms if translated_terms else symptom_terms
+        # 推測式預取已完成（或即將完成）時直接使用其翻譯及文獻結果
+        with deadline_stage('evidence', reserve_seconds):
+            prefetched = get_prefetched_stages(symptoms, request_timeout(SPECULATIVE_PREFETCH_CONFIG['wait_seconds']))
+        
+        if prefetched and prefetched['evidence']:
+            focused_search_terms = prefetched['search_terms']
+            evidence_results = prefetched['evidence']
+            logger.info(f"Using prefetched medical evidence: {focused_search_terms}")
         else:
-            search_terms = symptom_terms
-        
-        # Use symptom-based search only to avoid infinite recursion
-        # Limit to top 3 symptoms for focused search
-        focused_search_terms = search_terms[:3]
-        focused_display_terms = symptom_terms[:3]
-        
-        logger.info(f"Symptom-based medical evidence search: {focused_search_terms}")
-        
-        # Fetch evidence from PubMed
-        evidence_results = fetch_pubmed_evidence(focused_search_terms, focused_display_terms)
+            focused_search_terms, focused_display_terms = symptom_search_terms(symptoms, reserve_seconds)
+            logger.info(f"Symptom-based medical evidence search: {focused_search_terms}")
+            
+            # Fetch evidence from PubMed
+            if deadline is not None and not deadline.has_time_for(DEADLINE_CONFIG['evidence_min_seconds'], reserve_seconds):
+                deadline.skip('evidence')
+                logger.warning(f"Skipping PubMed search after translation: {deadline.remaining():.1f}s left in request deadline")
+                evidence_results = []
+            else:
+                with deadline_stage('evidence', reserve_seconds):
+                    evidence_results = fetch_pubmed_evidence(focused_search_terms, focused_display_terms)
         
         if evidence_results:
-            medical_evidence = "\n\n**醫學文獻參考資料 (Medical Literature References):**\n"
-            medical_evidence += "以下文獻支持此診斷分析：\n\n"
-            
-            for i, evidence in enumerate(evidence_results[:3], 1):  # Use top 3 articles
-                medical_evidence += f"{i}. **{evidence['title']}**\n"
-                medical_evidence += f"   📚 來源: {evidence['source']}\n"
-                medical_evidence += f"   🔍 相關性: {evidence['relevance']}\n"
-                medical_evidence += f"   📄 摘要: {evidence['excerpt']}\n"
-                if evidence.get('url'):
-                    medical_evidence += f"   🔗 連結: {evidence['url']}\n"
-                medical_evidence += "\n"
-            
-            # Add instruction for AI to reference the evidence
-            medical_evidence += "**請在診斷分析中參考上述醫學文獻，並在相關部分引用這些研究支持您的診斷結論。**\n"
-            
-            logger.info(f"Added medical evidence to AI analysis: {len(evidence_results)} articles")
+            logger.info(f"Found medical evidence for AI analysis: {len(evidence_results)} articles")
         else:
             logger.info("No medical evidence found for AI cross-referencing")
             
     except Exception as e:
         logger.error(f"Error fetching medical evidence for AI analysis: {e}")
-        medical_evidence = ""
+        evidence_results = []
     
-    # Single AI call with medical evidence included
-    return analyze_symptoms_with_context(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language, medical_evidence)
+    # Single AI call with medical evidence included (compacted to the prompt budget)
+    return analyze_symptoms_with_context(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language,
+                                         evidence_results=evidence_results, evidence_keywords=focused_search_terms)
 
 def analyze_symptoms(age: int, gender: str, symptoms: str, chronic_conditions: str = '', detailed_health_info: dict = None, user_language: str = 'zh-TW') -> dict:
     """使用AI分析症狀 (保持向後兼容性)"""
     return analyze_symptoms_with_context(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language, "")
 
-def analyze_symptoms_with_context(age: int, gender: str, symptoms: str, chronic_conditions: str = '', detailed_health_info: dict = None, user_language: str = 'zh-TW', medical_evidence: str = '') -> dict:
-    """使用AI分析症狀並可選擇性包含醫學證據"""
+# 診斷提示詞版本 - 修改靜態前綴時請更新版本號，避免新舊前綴混用提供商快取
+# Diagnosis prompt layout version - bump whenever the static prefix text changes
+DIAGNOSIS_PROMPT_VERSION = 'diagnosis-v3'
+
+def build_diagnosis_system_prompt(user_language: str, available_specialties: list, structured: bool = False, combined: bool = False) -> str:
+    """構建診斷提示詞的靜態前綴 - 同一語言下逐字節穩定，以便提供商前綴快取"""
+    t = lambda key: get_translation(key, user_language)
+    specialty_list = "、".join(available_specialties)
+    
+    if combined:
+        format_requirements = f"""**症狀驗證及JSON格式要求 (Validation and JSON Format Requirements):**
+    {t('combined_format')}"""
+    elif structured:
+        format_requirements = f"""**JSON格式要求 (JSON Format Requirements):**
+    {t('structured_format')}"""
+    else:
+        format_requirements = f"""**嚴格格式要求 (Strict Format Requirements):**
+    {t('diagnosis_format')}
+    {t('specialty_format')}
+    {t('severity_format')}
+    {t('emergency_format')}
+    {t('advice_format')}"""
+    
+    return f"""
+    {t('diagnosis_prompt_intro')}
+
+    **分析要求 (Analysis Requirements):**
+    如病人資料後附有醫學文獻證據，請參考這些證據進行診斷分析，確保診斷建議與現有醫學研究一致。請將文獻作為內部參考依據，但不需要在回應中明確引用或提及這些文獻來源，因為用戶會在其他地方看到完整的醫學證據。
+
+    {t('please_provide')}
+    1. {t('possible_diagnosis')}
+    2. {t('recommended_specialty')}
+    3. {t('severity_assessment')}
+    4. {t('emergency_needed')}
+    5. {t('general_advice')}
+
+    **{t('important_guidelines')}**
+    - {t('mental_health_guideline')}
+    - {t('trauma_guideline')}
+    - {t('emergency_guideline')}
+    - {t('specialty_guideline')}
+
+    **一致性要求 (Consistency Requirements):**
+    - 必須嚴格按照以下格式回答，不可偏離
+    - 嚴重程度只能是：輕微、中等、嚴重 (三選一)
+    - 緊急程度只能是：是、否 (二選一)
+    - 專科名稱必須從以下可用專科中選擇：{specialty_list}
+    - 不可推薦資料庫中不存在的專科
+    - 回答必須簡潔明確，避免模糊用詞
+
+    {t('response_language')}
+    
+    {format_requirements}
+    
+    {t('disclaimer')}
+    """
+
+def build_diagnosis_user_prompt(user_language: str, age: int, symptoms: str, health_info: str, medical_evidence: str = '') -> str:
+    """構建診斷提示詞的動態部分 - 病人資料和醫學文獻證據"""
+    t = lambda key: get_translation(key, user_language)
+    
+    return f"""
+    {t('patient_data')}
+    - {t('age_label')}{age}{t('years_old')}
+    - {t('main_symptoms')}{symptoms}
+    - {health_info}
+    {medical_evidence}
+    """
+
+def build_medical_evidence_prompt(evidence_items: list, compact: bool = True) -> str:
+    """文獻證據段落 - compact=True 時只含標題、來源及重點句（不含連結及相關性說明）"""
+    if not evidence_items:
+        return ""
+    medical_evidence = "\n\n**醫學文獻參考資料 (Medical Literature References):**\n"
+    medical_evidence += "以下文獻支持此診斷分析：\n\n"
+    
+    for i, evidence in enumerate(evidence_items, 1):
+        medical_evidence += f"{i}. **{evidence['title']}**\n"
+        medical_evidence += f"   📚 來源: {evidence['source']}\n"
+        if not compact:
+            medical_evidence += f"   🔍 相關性: {evidence.get('relevance', '')}\n"
+        medical_evidence += f"   📄 摘要: {evidence['excerpt']}\n"
+        if not compact and evidence.get('url'):
+            medical_evidence += f"   🔗 連結: {evidence['url']}\n"
+        medical_evidence += "\n"
+    
+    # Add instruction for AI to reference the evidence
+    medical_evidence += "**請在診斷分析中參考上述醫學文獻，並在相關部分引用這些研究支持您的診斷結論。**\n"
+    return medical_evidence
+
+def diagnosis_prompt_token_limit() -> int:
+    """診斷調用所用模型的提示詞token上限（Ollama未設 num_ctx 時按其預設上下文長度計算）"""
+    route = resolve_ai_route('diagnose')
+    context_window = 0
+    if route['provider'] == 'ollama':
+        context_window = AI_CONFIG['ollama'].get('num_ctx') or PROMPT_BUDGET_CONFIG['ollama_default_context']
+    return prompt_token_limit(route['model'], PROMPT_BUDGET_CONFIG['model_max_tokens'],
+                              PROMPT_BUDGET_CONFIG['default_max_tokens'], context_window,
+                              PROMPT_BUDGET_CONFIG['output_reserve_tokens'])
+
+def budget_diagnosis_prompt(system_prompt: str, build_user_prompt, evidence_results: list = None,
+                            evidence_keywords: list = None, medical_evidence: str = '') -> tuple:
+    """按模型的token上限組裝診斷提示詞：文獻先壓縮為重點句，仍超出上限時由排名最低的文獻開始刪除
+    
+    build_user_prompt(evidence_text) -> 動態提示詞；返回 (提示詞, 大小報告)
+    """
+    config = PROMPT_BUDGET_CONFIG
+    articles = (evidence_results or [])[:config['evidence_max_articles']]
+    # 未壓縮時原本會送出的文獻段落，用於比較
+    raw_evidence = build_medical_evidence_prompt(articles, compact=False) if articles else medical_evidence
+    system_tokens = estimate_tokens(system_prompt)
+    limit = diagnosis_prompt_token_limit()
+    
+    if not config['enabled']:
+        items, evidence_text = articles, raw_evidence
+        analysis_prompt = build_user_prompt(evidence_text)
+    else:
+        items = compact_evidence(articles, evidence_keywords or [], config['evidence_max_articles'],
+                                 config['evidence_max_sentences'], config['evidence_max_chars'])
+        while True:
+            evidence_text = build_medical_evidence_prompt(items) if articles else medical_evidence
+            analysis_prompt = build_user_prompt(evidence_text)
+            if not items or system_tokens + estimate_tokens(analysis_prompt) <= limit:
+                break
+            items = items[:-1]
+    
+    report = {
+        'prompt_tokens': system_tokens + estimate_tokens(analysis_prompt),
+        'system_tokens': system_tokens,
+        'limit': limit,
+        'evidence_tokens_raw': estimate_tokens(raw_evidence),
+        'evidence_tokens_sent': estimate_tokens(evidence_text),
+        'articles': len(items),
+        'articles_dropped': len(articles) - len(items)
+    }
+    report['over_budget'] = report['prompt_tokens'] > limit
+    prompt_budget_stats.record(report['prompt_tokens'], report['evidence_tokens_raw'], report['evidence_tokens_sent'],
+                               report['articles_dropped'], report['over_budget'])
+    return analysis_prompt, report
+
+def analyze_symptoms_with_context(age: int, gender: str, symptoms: str, chronic_conditions: str = '', detailed_health_info: dict = None, user_language: str = 'zh-TW', medical_evidence: str = '', combined: bool = False,
+                                  evidence_results: list = None, evidence_keywords: list = None) -> dict:
+    """使用AI分析症狀並可選擇性包含醫學證據
+    
+    combined=True 時同一次調用亦返回症狀有效性判斷及英文PubMed檢索詞 (需要結構化輸出)
+    evidence_results 為PubMed文獻列表，按提示詞預算壓縮後加入提示詞
+    """
     
     if detailed_health_info is None:
         detailed_health_info = {}
@@ -2626,65 +3638,83 @@ def analyze_symptoms_with_context(age: int, gender: str, symptoms: str, chronic_
         health_details.append(f"特殊情況：{'、'.join(special_conditions)}")
     
     # Get translations for the user's language
-    t = lambda key: get_translation(key, user_language)
-    
-    # Build health info with translated labels
-    health_info = "\n    - ".join(health_details) if health_details else t('no_special_health_info')
-    
-    # Get available specialties from database
-    available_specialties = get_available_specialties()
-    specialty_list = "、".join(available_specialties)
-    
-    # Build AI analysis prompt in user's language with consistency instructions
-    analysis_prompt = f"""
-    {t('diagnosis_prompt_intro')}
-
-    {t('patient_data')}
-    - {t('age_label')}{age}{t('years_old')}
-    - {t('main_symptoms')}{symptoms}
-    - {health_info}
-    {medical_evidence}
-    
-    **分析要求 (Analysis Requirements):**
-    請參考上述醫學文獻證據進行診斷分析，確保診斷建議與現有醫學研究一致。請將文獻作為內部參考依據，但不需要在回應中明確引用或提及這些文獻來源，因為用戶會在其他地方看到完整的醫學證據。
-
-    {t('please_provide')}
-    1. {t('possible_diagnosis')}
-    2. {t('recommended_specialty')}
-    3. {t('severity_assessment')}
-    4. {t('emergency_needed')}
-    5. {t('general_advice')}
-
-    **{t('important_guidelines')}**
-    - {t('mental_health_guideline')}
-    - {t('trauma_guideline')}
-    - {t('emergency_guideline')}
-    - {t('specialty_guideline')}
-
-    **一致性要求 (Consistency Requirements):**
-    - 必須嚴格按照以下格式回答，不可偏離
-    - 嚴重程度只能是：輕微、中等、嚴重 (三選一)
-    - 緊急程度只能是：是、否 (二選一)
-    - 專科名稱必須從以下可用專科中選擇：{specialty_list}
-    - 不可推薦資料庫中不存在的專科
-    - 回答必須簡潔明確，避免模糊用詞
-
-    {t('response_language')}
+    t = lambda key: get_translation(key, user_language)
     
-    **嚴格格式要求 (Strict Format Requirements):**
-    {t('diagnosis_format')}
-    {t('specialty_format')}
-    {t('severity_format')}
-    {t('emergency_format')}
-    {t('advice_format')}
+    # Build health info with translated labels
+    health_info = "\n    - ".join(health_details) if health_details else t('no_special_health_info')
     
-    {t('disclaimer')}
-    """
+    # Static system prefix first (identical for every request in this language), patient data last
+    structured = DIAGNOSIS_OUTPUT_CONFIG['structured_output'] or combined
+    available_specialties = get_available_specialties()
+    system_prompt = build_diagnosis_system_prompt(user_language, available_specialties, structured, combined)
+    analysis_prompt, prompt_report = budget_diagnosis_prompt(
+        system_prompt,
+        lambda evidence_text: build_diagnosis_user_prompt(user_language, age, symptoms, health_info, evidence_text),
+        evidence_results, evidence_keywords, medical_evidence
+    )
+    logger.info(f"Diagnosis prompt {DIAGNOSIS_PROMPT_VERSION}: ~{prompt_report['prompt_tokens']} tokens "
+                f"(static prefix ~{prompt_report['system_tokens']}, limit {prompt_report['limit']}); "
+                f"evidence {prompt_report['evidence_tokens_raw']} -> {prompt_report['evidence_tokens_sent']} tokens, "
+                f"{prompt_report['articles']} articles ({prompt_report['articles_dropped']} dropped)")
+    if prompt_report['over_budget']:
+        logger.warning(f"Diagnosis prompt exceeds token budget even without evidence: "
+                       f"~{prompt_report['prompt_tokens']} > {prompt_report['limit']}")
     
     # 獲取AI分析
-    analysis_response = call_ai_api(analysis_prompt)
+    response_schema = None
+    if combined:
+        response_schema = COMBINED_DIAGNOSIS_RESPONSE_SCHEMA
+    elif structured:
+        response_schema = DIAGNOSIS_RESPONSE_SCHEMA
+    with deadline_stage('diagnosis'):
+        analysis_response = call_ai_api(analysis_prompt, system_prompt, response_schema)
+    
+    # 結構化輸出：直接讀取欄位，無需掃描全文
+    structured_result = parse_structured_diagnosis(analysis_response, available_specialties) if structured else None
+    if structured_result and structured_result.get('valid') is False:
+        logger.info(f"Combined diagnosis rejected symptoms: {structured_result['validation_issues']}")
+        return {
+            'analysis': '',
+            'recommended_specialty': '無',
+            'recommended_specialties': [],
+            'severity_level': 'mild',
+            'emergency_needed': False,
+            'symptoms_valid': False,
+            'validation_issues': structured_result['validation_issues'],
+            'search_terms': []
+        }
+    if structured_result:
+        recommended_specialties = (structured_result['specialties']
+                                   or extract_specialties_from_analysis(structured_result['diagnosis']))
+        logger.info(f"Structured diagnosis parsed: specialties={recommended_specialties}, "
+                    f"severity={structured_result['severity']}, emergency={structured_result['emergency']}")
+        return {
+            # 渲染實際推薦的專科（JSON專科全被過濾時為從診斷文字推斷的專科）
+            'analysis': render_diagnosis_text(dict(structured_result, specialties=recommended_specialties), t),
+            'recommended_specialty': recommended_specialties[0],
+            'recommended_specialties': recommended_specialties,
+            'severity_level': structured_result['severity'],
+            'emergency_needed': structured_result['emergency'],
+            'symptoms_valid': True,
+            'search_terms': structured_result.get('search_terms', [])
+        }
+    if structured:
+        logger.warning("Structured diagnosis response could not be parsed, falling back to text extraction")
+    
+    # AI服務不可用：以本地分流模型推斷專科，避免一律回退至內科
+    if analysis_response.startswith(('AI分析服務暫時不可用', 'AI服務配置不完整')) and TRIAGE_MODEL_CONFIG['enabled']:
+        local_prediction = triage_predictor.predict(symptoms)
+        if local_prediction:
+            logger.info(f"AI unavailable, using triage model specialties: {local_prediction['specialties']}")
+            return {
+                'analysis': analysis_response,
+                'recommended_specialty': local_prediction['specialty'],
+                'recommended_specialties': local_prediction['specialties'],
+                'severity_level': 'mild',
+                'emergency_needed': False
+            }
     
-    # 解析分析結果
+    # 解析分析結果 (文本模式或結構化解析失敗時的回退)
     recommended_specialties = extract_specialties_from_analysis(analysis_response)
     recommended_specialty = recommended_specialties[0] if recommended_specialties else '內科'
     severity_level = extract_severity_from_analysis(analysis_response)
@@ -2719,39 +3749,8 @@ def analyze_symptoms_with_context(age: int, gender: str, symptoms: str, chronic_
         'emergency_needed': emergency_needed
     }
 
-def analyze_symptoms_and_match(age: int, gender: str, symptoms: str, chronic_conditions: str, language: str, location: str, detailed_health_info: dict = None, location_details: dict = None) -> dict:
-    """使用AI分析症狀並配對醫生"""
-    
-    if detailed_health_info is None:
-        detailed_health_info = {}
-    
-    # 生成用戶數據摘要
-    user_summary = generate_user_summary(age, gender, symptoms, chronic_conditions, detailed_health_info)
-    
-    # Get user's language from session or use the language parameter passed in
-    user_language = session.get('language', language if language else 'zh-TW')
-    
-    # 第一步：驗證症狀有效性
-    symptom_validation = validate_symptoms_with_llm(symptoms, user_language)
-    
-    if not symptom_validation.get('valid', True):
-        return {
-            'diagnosis': '症狀驗證失敗',
-            'recommended_specialty': '無',
-            'doctors': [],
-            'user_summary': user_summary,
-            'emergency_needed': False,
-            'severity_level': 'low',
-            'validation_error': True,
-            'validation_issues': symptom_validation.get('issues', []),
-            'validation_suggestions': symptom_validation.get('suggestions', []),
-            'validation_message': '您輸入的內容不是有效的醫療症狀。請重新輸入真實的身體不適症狀，例如頭痛、發燒、咳嗽等。',
-            'validation_confidence': symptom_validation.get('confidence', 0.5)
-        }
-    
-    # 第二步：AI分析結合醫學文獻證據 (pass user language)
-    diagnosis_result = analyze_symptoms_with_evidence(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language)
-    
+def match_doctors_for_diagnosis(diagnosis_result, age, language, location, symptoms, location_details=None, user_language='zh-TW'):
+    """根據診斷結果配對醫生（緊急分流、多專科去重、12歲以下加入兒科）"""
     # 第二步：檢查是否需要緊急醫療處理
     print(f"DEBUG - Emergency check: emergency_needed={diagnosis_result.get('emergency_needed', False)}, severity_level={diagnosis_result.get('severity_level')}")
     
@@ -2830,12 +3829,94 @@ def analyze_symptoms_and_match(age: int, gender: str, symptoms: str, chronic_con
                 unique_doctors.append(doctor)
         matched_doctors = unique_doctors[:15]  # 限制最多15位醫生以包含多個專科
     
+    return matched_doctors
+
+def analyze_symptoms_and_match(age: int, gender: str, symptoms: str, chronic_conditions: str, language: str, location: str, detailed_health_info: dict = None, location_details: dict = None) -> dict:
+    """使用AI分析症狀並配對醫生"""
+    
+    if detailed_health_info is None:
+        detailed_health_info = {}
+    
+    # 生成用戶數據摘要
+    user_summary = generate_user_summary(age, gender, symptoms, chronic_conditions, detailed_health_info)
+    
+    # Get user's language from session or use the language parameter passed in
+    user_language = session.get('language', language if language else 'zh-TW')
+    
+    # 合併模式：本地規則無法判斷的輸入不再單獨調用LLM驗證，由診斷調用一併判斷
+    combined = DIAGNOSIS_OUTPUT_CONFIG['combined_validation']
+    
+    # 第一步：驗證症狀有效性
+    with deadline_stage('validation'):
+        symptom_validation = validate_symptoms(symptoms, user_language, escalate=not combined)
+    
+    if not symptom_validation.get('valid', True):
+        return {
+            'diagnosis': '症狀驗證失敗',
+            'recommended_specialty': '無',
+            'doctors': [],
+            'user_summary': user_summary,
+            'emergency_needed': False,
+            'severity_level': 'low',
+            'validation_error': True,
+            'validation_issues': symptom_validation.get('issues', []),
+            'validation_suggestions': symptom_validation.get('suggestions', []),
+            'validation_message': '您輸入的內容不是有效的醫療症狀。請重新輸入真實的身體不適症狀，例如頭痛、發燒、咳嗽等。',
+            'validation_confidence': symptom_validation.get('confidence', 0.5)
+        }
+    
+    # 第二步：AI分析結合醫學文獻證據 (pass user language)
+    # 標準化鍵相同的查詢（字序、分隔符、簡繁、同義詞、年齡段不同）共用診斷結果
+    diagnosis_cache_key = None
+    cached_diagnosis = None
+    if SYMPTOM_CANONICAL_CONFIG['enabled']:
+        canonical = symptom_canonicalizer.canonicalize(symptoms, age, gender, chronic_conditions)
+        diagnosis_cache_key = make_fingerprint('diagnosis', canonical['key'], user_language, combined, detailed_health_info)
+        cached_diagnosis = diagnosis_cache.get(diagnosis_cache_key)
+        if cached_diagnosis is not None:
+            logger.info(f"Diagnosis cache hit for canonical symptoms: {canonical['text']}")
+    
+    if cached_diagnosis is not None:
+        diagnosis_result = cached_diagnosis
+    elif combined:
+        # 單次LLM調用：驗證 + 英文檢索詞 + 診斷；醫學文獻由前端稍後使用返回的檢索詞獲取
+        diagnosis_result = analyze_symptoms_with_context(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language, combined=True)
+        if symptom_validation.get('deferred') and diagnosis_result.get('symptoms_valid') is False:
+            return {
+                'diagnosis': '症狀驗證失敗',
+                'recommended_specialty': '無',
+                'doctors': [],
+                'user_summary': user_summary,
+                'emergency_needed': False,
+                'severity_level': 'low',
+                'validation_error': True,
+                'validation_issues': diagnosis_result.get('validation_issues', []),
+                'validation_suggestions': ['請描述具體的身體不適症狀，例如頭痛、發燒、咳嗽等'],
+                'validation_message': '您輸入的內容不是有效的醫療症狀。請重新輸入真實的身體不適症狀，例如頭痛、發燒、咳嗽等。',
+                'validation_confidence': 0.8
+            }
+        if not diagnosis_result.get('analysis'):
+            # 本地規則已確認有效但模型仍判為無效時，退回一般診斷流程
+            diagnosis_result = analyze_symptoms_with_evidence(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language)
+    else:
+        diagnosis_result = analyze_symptoms_with_evidence(age, gender, symptoms, chronic_conditions, detailed_health_info, user_language)
+    
+    # AI不可用時的回退結果不寫入快取
+    analysis_text = diagnosis_result.get('analysis') or ''
+    if diagnosis_cache_key and cached_diagnosis is None and analysis_text and not analysis_text.startswith(('AI分析服務暫時不可用', 'AI服務配置不完整')):
+        diagnosis_cache.put(diagnosis_cache_key, diagnosis_result)
+    
+    with deadline_stage('matching'):
+        matched_doctors = match_doctors_for_diagnosis(diagnosis_result, age, language, location, symptoms,
+                                                      location_details, user_language)
+    
     return {
         'user_summary': user_summary,
         'analysis': diagnosis_result['analysis'],
         'recommended_specialty': diagnosis_result['recommended_specialty'],
         'severity_level': diagnosis_result.get('severity_level', 'mild'),
         'emergency_needed': diagnosis_result.get('emergency_needed', False),
+        'search_terms': diagnosis_result.get('search_terms', []),
         'doctors': matched_doctors
     }
 
@@ -3667,6 +4748,9 @@ def check_severe_symptoms():
         # 檢測嚴重症狀和病史
         detection_result = detect_severe_symptoms_and_conditions(symptoms, chronic_conditions)
         
+        # 用戶通常緊接著提交 /find_doctor：先在背景開始與用戶無關的翻譯、文獻及專科推斷
+        prefetch_status = start_symptom_prefetch(symptoms)
+        
         if detection_result['is_severe']:
             # 構建警告消息
             warning_message = {
@@ -3687,18 +4771,28 @@ def check_severe_symptoms():
             
             return jsonify({
                 'is_severe': True,
-                'warning': warning_message
+                'warning': warning_message,
+                'prefetch': prefetch_status
             })
         else:
             return jsonify({
                 'is_severe': False,
-                'warning': None
+                'warning': None,
+                'prefetch': prefetch_status
             })
             
     except Exception as e:
         logger.error(f"Error checking severe symptoms: {e}")
         return jsonify({'error': '檢查過程中發生錯誤'}), 500
 
+@app.errorhandler(BulkheadFull)
+def handle_bulkhead_full(error):
+    """依賴服務併發已滿 - 快速返回503及Retry-After，而非佔用線程排隊"""
+    logger.warning(f"Rejected {request.path}: {error}")
+    response = jsonify({'error': '服務繁忙，請稍後再試', 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 @app.route('/find_doctor', methods=['POST'])
 def find_doctor():
     """處理醫生搜索請求"""
@@ -3743,67 +4837,53 @@ def find_doctor():
         # Set session language for diagnosis
         session['language'] = ui_language
         
-        # 使用AI分析症狀並配對醫生 (傳遞location_details)
-        # Handle backward compatibility - pass empty string if gender is None
-        gender_safe = gender or ''
-        result = analyze_symptoms_and_match(age, gender_safe, symptoms, chronic_conditions, language, location, detailed_health_info, location_details)
-        
-        # Log user query to database
         session_id = session.get('session_id', secrets.token_hex(16))
         session['session_id'] = session_id
         
-        try:
-            conn = sqlite3.connect('admin_data.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO user_queries 
-                (age, gender, symptoms, chronic_conditions, language, location, detailed_health_info, 
-                 ai_analysis, related_specialty, matched_doctors_count, user_ip, session_id, analysis_report, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (age, gender_safe, symptoms, chronic_conditions, language, location, 
-                  json.dumps(detailed_health_info), result['analysis'], 
-                  result['recommended_specialty'], len(result['doctors']), 
-                  get_real_ip(), session_id, 
-                  format_analysis_report_full({
-                      'age': age, 'gender': gender_safe, 'symptoms': symptoms, 
-                      'chronic_conditions': chronic_conditions, 'language': language, 
-                      'location': location, 'ai_analysis': result['analysis'], 
-                      'related_specialty': result['recommended_specialty']
-                  }, {}), 
-                  get_current_time().isoformat()))
-            query_id = cursor.lastrowid
-            session['last_query_id'] = query_id
-            conn.commit()
-            conn.close()
+        search_params = {
+            'age': age, 'gender': gender, 'symptoms': symptoms, 'chronic_conditions': chronic_conditions,
+            'language': language, 'location': location, 'location_details': location_details,
+            'detailed_health_info': detailed_health_info
+        }
+        
+        # 非同步模式：立即返回任務ID，分析在專用工作線程中進行
+        if data.get('async') and ANALYSIS_JOB_CONFIG['enabled']:
+            # 嚴重症狀快速通道：先返回急診指引及醫生，完整分析在背景完成後再附上
+            if EMERGENCY_FAST_PATH_CONFIG['enabled']:
+                detection = detect_severe_symptoms_and_conditions(symptoms, chronic_conditions)
+                if detection['severe_symptoms']:
+                    return jsonify(build_emergency_fast_response(search_params, detection, ui_language, session_id))
+            
+            # 漸進式回應：先以本地關鍵詞推斷專科返回醫生，AI分析完成後再更新
+            if data.get('progressive') and PROGRESSIVE_MATCH_CONFIG['enabled']:
+                return jsonify(build_progressive_response(search_params, ui_language, session_id))
             
-            # Check for severe symptoms and log if found
-            detection_result = detect_severe_symptoms_and_conditions(symptoms, chronic_conditions)
-            if detection_result['is_severe']:
-                severe_case_id = log_severe_case(
-                    query_id, age, gender_safe, symptoms, chronic_conditions,
-                    detection_result['severe_symptoms'], detection_result['severe_conditions'],
-                    get_real_ip(), session_id
+            try:
+                job_id = analysis_jobs.submit(
+                    copy_current_request_context(run_doctor_search),
+                    search_params, get_real_ip(), request.user_agent.string, session_id,
+                    owner=session_id
                 )
-                session['severe_case_id'] = severe_case_id
-                
-        except Exception as e:
-            print(f"Database logging error: {e}")
-        
-        # Log analytics
-        log_analytics('doctor_search', {
-            'age': age, 'symptoms': symptoms, 'language': language, 'location': location,
-            'doctors_found': len(result['doctors']), 'specialty': result['recommended_specialty']
-        }, get_real_ip(), request.user_agent.string, session_id)
-        
-        return jsonify({
-            'success': True,
-            'user_summary': result['user_summary'],
-            'analysis': result['analysis'],
-            'recommended_specialty': result['recommended_specialty'],
-            'doctors': result['doctors'],
-            'total': len(result['doctors'])
-        })
-        
+            except JobQueueFull as e:
+                logger.warning(f"Rejected find_doctor job: {e}")
+                response = jsonify({'error': '分析服務繁忙，請稍後再試', 'retry_after': ANALYSIS_JOB_CONFIG['retry_after_seconds']})
+                response.headers['Retry-After'] = str(ANALYSIS_JOB_CONFIG['retry_after_seconds'])
+                return response, 503
+            
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': AnalysisJobQueue.QUEUED,
+                'status_url': url_for('get_find_doctor_job', job_id=job_id),
+                'events_url': url_for('stream_find_doctor_job', job_id=job_id)
+            }), 202
+        
+        response_data, session_updates = run_doctor_search(search_params, get_real_ip(), request.user_agent.string, session_id)
+        session.update(session_updates)
+        return jsonify(response_data)
+        
+    except BulkheadFull:
+        raise  # handled by the BulkheadFull error handler (503 + Retry-After)
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -3813,33 +4893,427 @@ def find_doctor():
         print(f"錯誤詳情: {error_details}")
         return jsonify({'error': f'服務器內部錯誤: {str(e)}'}), 500
 
-@app.route('/health')
-def health_check():
-    """健康檢查"""
-    provider = AI_CONFIG['provider']
-    ai_status = 'unknown'
+def build_emergency_fast_response(search_params: dict, detection: dict, user_language: str, session_id: str) -> dict:
+    """嚴重症狀快速通道 - 跳過驗證、翻譯、文獻檢索及診斷，立即返回急診指引及急診科/內科醫生
+    
+    完整分析照常提交至分析任務隊列，前端以返回的 status_url 取得結果後再附上
+    """
+    start_time = time.time()
+    t = lambda key: get_translation(key, user_language)
+    
+    symptoms = search_params['symptoms']
+    doctors = filter_doctors('急診科', search_params['language'], search_params['location'], symptoms, '', search_params['location_details'])
+    if not doctors:
+        doctors = filter_doctors('內科', search_params['language'], search_params['location'], symptoms, '', search_params['location_details'])
+    for doctor in doctors:
+        doctor['is_emergency'] = True
+        doctor['emergency_message'] = t('emergency_care_needed')
+    
+    response_data = {
+        'success': True,
+        'emergency_fast_path': True,
+        'emergency_needed': True,
+        'emergency_guidance': {
+            'title': t('emergency_fast_path_title'),
+            'message': t('emergency_fast_path_desc'),
+            'notice': t('emergency_notice_desc'),
+            'severe_symptoms': detection['severe_symptoms']
+        },
+        'user_summary': generate_user_summary(search_params['age'], search_params['gender'] or '', symptoms,
+                                              search_params['chronic_conditions'], search_params['detailed_health_info']),
+        'analysis': '',
+        'recommended_specialty': '急診科',
+        'search_terms': [],
+        'doctors': doctors,
+        'total': len(doctors)
+    }
+    
+    # 完整分析（含記錄）在背景進行；隊列已滿時仍返回急診結果
+    try:
+        job_id = analysis_jobs.submit(
+            copy_current_request_context(run_doctor_search),
+            search_params, get_real_ip(), request.user_agent.string, session_id,
+            owner=session_id
+        )
+        response_data['analysis_job'] = {
+            'job_id': job_id,
+            'status': AnalysisJobQueue.QUEUED,
+            'status_url': url_for('get_find_doctor_job', job_id=job_id),
+            'events_url': url_for('stream_find_doctor_job', job_id=job_id)
+        }
+    except JobQueueFull as e:
+        logger.warning(f"Emergency fast path returned without full analysis: {e}")
+        response_data['analysis_job'] = None
+    
+    logger.info(f"Emergency fast path for {detection['severe_symptoms']}: {len(doctors)} doctors in {int((time.time() - start_time) * 1000)}ms")
+    log_analytics('emergency_fast_path', {
+        'severe_symptoms': detection['severe_symptoms'], 'doctors_found': len(doctors),
+        'analysis_queued': response_data['analysis_job'] is not None
+    }, get_real_ip(), request.user_agent.string, session_id)
+    return response_data
+
+def predict_local_specialty(symptoms: str) -> dict:
+    """本地專科推斷 - 優先使用訓練好的分流模型，無模型或信心不足時使用關鍵詞規則"""
+    if TRIAGE_MODEL_CONFIG['enabled']:
+        prediction = triage_predictor.predict(symptoms)
+        if prediction:
+            return dict(prediction, source='model')
+    return dict(specialty_heuristic.predict(symptoms), source='keywords')
+
+def build_progressive_response(search_params: dict, user_language: str, session_id: str) -> dict:
+    """漸進式回應第一階段 - 以本地關鍵詞推斷臨時專科並立即返回配對醫生
+    
+    第二階段（LLM分析及重新配對）提交至分析任務隊列，完成時標示專科是否有變。
+    本地規則判為無效的輸入直接返回驗證錯誤（欄位與 run_doctor_search 相同），不配對醫生亦不提交第二階段
+    """
+    start_time = time.time()
+    symptoms = search_params['symptoms']
+    user_summary = generate_user_summary(search_params['age'], search_params['gender'] or '', symptoms,
+                                         search_params['chronic_conditions'], search_params['detailed_health_info'])
+    
+    # 只用本地規則：模糊輸入不調用LLM，交由第二階段的完整驗證
+    symptom_validation = validate_symptoms(symptoms, user_language, escalate=False)
+    if not symptom_validation.get('valid', True):
+        log_analytics('symptom_validation_failed', {'symptoms': symptoms, 'language': search_params['language']},
+                      get_real_ip(), request.user_agent.string, session_id)
+        return {
+            'success': True,
+            'user_summary': user_summary,
+            'analysis': '',
+            'recommended_specialty': '無',
+            'search_terms': [],
+            'doctors': [],
+            'total': 0,
+            'validation_error': True,
+            'validation_issues': symptom_validation.get('issues', []),
+            'validation_suggestions': symptom_validation.get('suggestions', []),
+            'validation_message': '您輸入的內容不是有效的醫療症狀。請重新輸入真實的身體不適症狀，例如頭痛、發燒、咳嗽等。',
+            'validation_confidence': symptom_validation.get('confidence', 0.5)
+        }
+    
+    prefetched = get_prefetched_stages(symptoms)
+    prediction = prefetched['specialty'] if prefetched else predict_local_specialty(symptoms)
+    provisional_diagnosis = {
+        'analysis': '',
+        'recommended_specialty': prediction['specialty'],
+        'recommended_specialties': prediction['specialties'],
+        'severity_level': 'mild',
+        'emergency_needed': False
+    }
+    doctors = match_doctors_for_diagnosis(provisional_diagnosis, search_params['age'], search_params['language'],
+                                          search_params['location'], symptoms, search_params['location_details'],
+                                          user_language)
+    progressive_match_stats.record_provisional()
+    
+    response_data = {
+        'success': True,
+        'progressive': True,
+        'phase': 1,
+        'provisional': True,
+        'user_summary': user_summary,
+        'analysis': '',
+        'recommended_specialty': prediction['specialty'],
+        'recommended_specialties': prediction['specialties'],
+        'provisional_confidence': prediction['confidence'],
+        'provisional_source': prediction['source'],
+        'search_terms': [],
+        'doctors': doctors,
+        'total': len(doctors)
+    }
+    
+    # 隊列已滿時仍返回臨時配對結果
+    try:
+        job_id = analysis_jobs.submit(
+            copy_current_request_context(run_progressive_analysis),
+            prediction['specialty'], search_params, get_real_ip(), request.user_agent.string, session_id,
+            owner=session_id
+        )
+        response_data['analysis_job'] = {
+            'job_id': job_id,
+            'status': AnalysisJobQueue.QUEUED,
+            'status_url': url_for('get_find_doctor_job', job_id=job_id),
+            'events_url': url_for('stream_find_doctor_job', job_id=job_id)
+        }
+    except JobQueueFull as e:
+        logger.warning(f"Progressive response returned without full analysis: {e}")
+        response_data['analysis_job'] = None
+    
+    logger.info(f"Progressive phase 1 ({prediction['specialty']}, confidence {prediction['confidence']}): "
+                f"{len(doctors)} doctors in {int((time.time() - start_time) * 1000)}ms")
+    return response_data
+
+def run_progressive_analysis(provisional_specialty: str, search_params: dict, user_ip: str, user_agent: str, session_id: str) -> tuple:
+    """漸進式回應第二階段 - 執行完整分析並記錄臨時專科是否被更改"""
+    response_data, session_updates = run_doctor_search(search_params, user_ip, user_agent, session_id)
+    # 被拒絕的輸入沒有最終專科，不計入臨時專科準確度
+    specialty_changed = False if response_data.get('validation_error') else \
+        progressive_match_stats.record_final(provisional_specialty, response_data['recommended_specialty'])
+    response_data.update({
+        'progressive': True,
+        'phase': 2,
+        'provisional_specialty': provisional_specialty,
+        'specialty_changed': specialty_changed
+    })
+    return response_data, session_updates
+
+def run_doctor_search(search_params: dict, user_ip: str, user_agent: str, session_id: str) -> tuple:
+    """執行症狀分析、醫生配對及記錄 - 返回 (回應數據, 需寫入session的值)
+    
+    可在請求線程中直接執行，亦可由分析任務工作線程執行，因此不直接寫入session
+    """
+    age = search_params['age']
+    symptoms = search_params['symptoms']
+    chronic_conditions = search_params['chronic_conditions']
+    language = search_params['language']
+    location = search_params['location']
+    detailed_health_info = search_params['detailed_health_info']
+    session_updates = {}
+    
+    # 使用AI分析症狀並配對醫生 (傳遞location_details)
+    # Handle backward compatibility - pass empty string if gender is None
+    gender_safe = search_params['gender'] or ''
+    # 每個請求一個端到端期限，下游調用的超時由剩餘時間推導
+    deadline = None
+    if DEADLINE_CONFIG['enabled']:
+        deadline = Deadline(DEADLINE_CONFIG['total_seconds'], DEADLINE_CONFIG['stage_budgets'],
+                            DEADLINE_CONFIG['min_timeout_seconds'])
+    with deadline_scope(deadline):
+        result = analyze_symptoms_and_match(age, gender_safe, symptoms, chronic_conditions, language, location, detailed_health_info, search_params['location_details'])
+    if deadline is not None:
+        logger.info(f"Doctor search timing: {deadline.get_report()}")
+    
+    if result.get('validation_error'):
+        # 症狀驗證失敗：沒有分析可記錄，不寫入 user_queries，只把驗證錯誤交給前端顯示
+        log_analytics('symptom_validation_failed', {'symptoms': symptoms, 'language': language},
+                      user_ip, user_agent, session_id)
+        response_data = {
+            'success': True,
+            'user_summary': result['user_summary'],
+            'analysis': '',
+            'recommended_specialty': result['recommended_specialty'],
+            'search_terms': [],
+            'doctors': [],
+            'total': 0
+        }
+        response_data.update({key: result[key] for key in ('validation_error', 'validation_issues', 'validation_suggestions',
+                                                           'validation_message', 'validation_confidence') if key in result})
+        return response_data, session_updates
     
-    # 測試AI服務狀態
+    # Log user query to database
     try:
-        test_response = call_ai_api("Hello")
+        conn = sqlite3.connect('admin_data.db')
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO user_queries 
+            (age, gender, symptoms, chronic_conditions, language, location, detailed_health_info, 
+             ai_analysis, related_specialty, matched_doctors_count, user_ip, session_id, analysis_report, timestamp,
+             emergency_needed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (age, gender_safe, symptoms, chronic_conditions, language, location, 
+              json.dumps(detailed_health_info), result['analysis'], 
+              result['recommended_specialty'], len(result['doctors']), 
+              user_ip, session_id, 
+              format_analysis_report_full({
+                  'age': age, 'gender': gender_safe, 'symptoms': symptoms, 
+                  'chronic_conditions': chronic_conditions, 'language': language, 
+                  'location': location, 'ai_analysis': result['analysis'], 
+                  'related_specialty': result['recommended_specialty']
+              }, {}), 
+              get_current_time().isoformat(),
+              1 if result.get('emergency_needed') else 0))
+        query_id = cursor.lastrowid
+        session_updates['last_query_id'] = query_id
+        conn.commit()
+        conn.close()
+        
+        # Check for severe symptoms and log if found
+        detection_result = detect_severe_symptoms_and_conditions(symptoms, chronic_conditions)
+        if detection_result['is_severe']:
+            severe_case_id = log_severe_case(
+                query_id, age, gender_safe, symptoms, chronic_conditions,
+                detection_result['severe_symptoms'], detection_result['severe_conditions'],
+                user_ip, session_id
+            )
+            session_updates['severe_case_id'] = severe_case_id
+            
+    except Exception as e:
+        print(f"Database logging error: {e}")
+    
+    # Log analytics
+    log_analytics('doctor_search', {
+        'age': age, 'symptoms': symptoms, 'language': language, 'location': location,
+        'doctors_found': len(result['doctors']), 'specialty': result['recommended_specialty']
+    }, user_ip, user_agent, session_id)
+    
+    response_data = {
+        'success': True,
+        'user_summary': result['user_summary'],
+        'analysis': result['analysis'],
+        'recommended_specialty': result['recommended_specialty'],
+        'search_terms': result.get('search_terms', []),
+        'doctors': result['doctors'],
+        'total': len(result['doctors'])
+    }
+    return response_data, session_updates
+
+@app.route('/find_doctor/jobs/<job_id>')
+def get_find_doctor_job(job_id):
+    """查詢非同步分析任務狀態 - 完成時返回與同步 /find_doctor 相同的結果"""
+    job = analysis_jobs.get(job_id, owner=session.get('session_id'))
+    if job is None:
+        return jsonify({'error': '找不到分析任務'}), 404
+    
+    if job['status'] == AnalysisJobQueue.DONE:
+        response_data, session_updates = job['result']
+        session.update(session_updates)
+        return jsonify(dict(response_data, job_id=job_id, status=job['status']))
+    if job['status'] == AnalysisJobQueue.FAILED and job['retry_after']:
+        response = jsonify({'job_id': job_id, 'status': job['status'], 'error': '分析服務繁忙，請稍後再試', 'retry_after': job['retry_after']})
+        response.headers['Retry-After'] = str(job['retry_after'])
+        return response, 503
+    if job['status'] == AnalysisJobQueue.FAILED:
+        logger.error(f"Analysis job {job_id} failed: {job['error']}")
+        return jsonify({'job_id': job_id, 'status': job['status'], 'error': f"服務器內部錯誤: {job['error']}"}), 500
+    
+    return jsonify({'job_id': job_id, 'status': job['status'], 'queue_position': job['queue_position']})
+
+@app.route('/find_doctor/jobs/<job_id>/events')
+def stream_find_doctor_job(job_id):
+    """以Server-Sent Events推送分析任務狀態；完成後客戶端從 status_url 取得結果"""
+    from flask import Response
+    owner = session.get('session_id')
+    if analysis_jobs.get(job_id, owner=owner) is None:
+        return jsonify({'error': '找不到分析任務'}), 404
+    
+    def generate():
+        last_status = None
+        while True:
+            job = analysis_jobs.get(job_id, owner=owner)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'job expired'})}\n\n"
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: status\ndata: {json.dumps({'job_id': job_id, 'status': last_status, 'queue_position': job['queue_position']})}\n\n"
+            if last_status in (AnalysisJobQueue.DONE, AnalysisJobQueue.FAILED):
+                return
+            if not analysis_jobs.wait(job_id, timeout=15, owner=owner):
+                yield ": keepalive\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def probe_ai_health() -> str:
+    """調用AI提供商一次並將結果寫入 SYSTEM_HEALTH_STATUS['ai_provider']
+    
+    探測經 'health' 路由，記錄的是實際被探測的提供商及模型（未設路由時即主提供商）
+    """
+    route = resolve_ai_route('health')
+    start_time = time.time()
+    error = None
+    try:
+        test_response = call_ai_api("Hello", call_type='health')
         if "錯誤" not in test_response and "不可用" not in test_response:
             ai_status = 'healthy'
         else:
             ai_status = 'error'
-    except:
+            error = test_response
+    except BulkheadFull:
+        ai_status = 'saturated'
+    except Exception as e:
         ai_status = 'error'
+        error = str(e)
+    
+    previous = SYSTEM_HEALTH_STATUS.get('ai_provider', {}).get('status')
+    if previous != ai_status:
+        logger.info(f"AI provider health changed: {previous} -> {ai_status}")
+    SYSTEM_HEALTH_STATUS['ai_provider'] = {
+        'status': ai_status,
+        'last_check': get_current_time().isoformat(),
+        'checked_at': time.time(),
+        'error': error,
+        'provider': route['provider'],
+        'model': route['model'],
+        'response_time_ms': int((time.time() - start_time) * 1000)
+    }
+    return ai_status
+
+_health_prober_lock = threading.Lock()
+_health_prober_thread = None
+
+def start_health_prober():
+    """啟動背景AI健康探測線程（每個進程只啟動一次）"""
+    global _health_prober_thread
+    if not HEALTH_PROBE_CONFIG['enabled']:
+        return
+    with _health_prober_lock:
+        if _health_prober_thread is not None:
+            return
+        
+        def prober():
+            while True:
+                try:
+                    probe_ai_health()
+                except Exception as e:
+                    logger.error(f"AI health probe error: {e}")
+                time.sleep(HEALTH_PROBE_CONFIG['interval_seconds'])
+        
+        _health_prober_thread = threading.Thread(target=prober, name='ai-health-prober', daemon=True)
+        _health_prober_thread.start()
+        logger.info(f"AI health prober started (every {HEALTH_PROBE_CONFIG['interval_seconds']}s)")
+
+@app.route('/health')
+def health_check():
+    """健康檢查 - 返回背景探測的最近結果，不會同步調用AI服務"""
+    start_health_prober()
+    start_ollama_keep_warm()
+    provider = AI_CONFIG['provider']
+    probe = SYSTEM_HEALTH_STATUS.get('ai_provider', {})
+    # 提供商剛被切換時，舊的探測結果不適用
+    ai_status = probe.get('status', 'unknown') if probe.get('provider') == provider else 'unknown'
+    
+    # 探測結果過舊（例如探測線程卡在慢速提供商）時標記為 stale
+    checked_at = probe.get('checked_at')
+    stale = checked_at is None or time.time() - checked_at > HEALTH_PROBE_CONFIG['interval_seconds'] * 3
     
     return jsonify({
         'status': 'healthy',
         'doctors_loaded': len(DOCTORS_DATA),
         'ai_provider': provider,
         'ai_status': ai_status,
+        'ai_last_check': probe.get('last_check'),
+        'ai_response_time_ms': probe.get('response_time_ms'),
+        'ai_status_stale': stale,
         'ai_config': {
             'provider': provider,
             'model': AI_CONFIG[provider]['model'] if provider in AI_CONFIG else 'unknown'
         }
     })
 
+@app.route('/health/live')
+def health_live():
+    """存活檢查 - 進程能處理請求即可，不訪問任何外部服務"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready')
+def health_ready():
+    """就緒檢查 - 只檢查本地資源（醫生資料、SQLite），不訪問任何外部服務"""
+    checks = {'doctors_loaded': len(DOCTORS_DATA) > 0}
+    try:
+        conn = sqlite3.connect('admin_data.db', timeout=2)
+        conn.execute('SELECT 1')
+        conn.close()
+        checks['database'] = True
+    except Exception as e:
+        logger.error(f"Readiness check database error: {e}")
+        checks['database'] = False
+    
+    ready = all(checks.values())
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'checks': checks,
+        'ai_status': SYSTEM_HEALTH_STATUS.get('ai_provider', {}).get('status', 'unknown')
+    }), 200 if ready else 503
+
 @app.route('/ai-config')
 def get_ai_config():
     """獲取AI配置信息"""
@@ -5215,6 +6689,8 @@ def admin_config():
         
         # Get AI configuration
         ai_config = AI_CONFIG
+        ai_routing = {call_type: dict(route, effective=resolve_ai_route(call_type))
+                      for call_type, route in AI_ROUTING_CONFIG.items()}
         
         # Get timezone configuration
         timezone_config = TIMEZONE_CONFIG
@@ -5239,6 +6715,7 @@ def admin_config():
                              admin_user=admin_user,
                              all_admin_users=all_admin_users,
                              ai_config=ai_config,
+                             ai_routing=ai_routing,
                              timezone_config=timezone_config,
                              whatsapp_config=whatsapp_config,
                              admin_2fa_status=admin_2fa_status)
@@ -5672,6 +7149,163 @@ def test_ai_connection():
         logger.error(f"Test AI connection error: {e}")
         return jsonify({'success': False, 'message': f'測試失敗: {str(e)}'}), 500
 
+def benchmark_ai_call(provider: str, model: str, case: dict) -> tuple:
+    """基準測試的單次診斷調用 - 指定模型、文本輸出、不經斷路器及請求合併，返回 (回應文字, token用量)
+    
+    併發隔離名額由 provider_benchmark 在調用前取得（slot_fn）
+    """
+    config = AI_CONFIG[provider]
+    health_details = [f"性別：{case['gender']}"]
+    if case['chronic_conditions']:
+        health_details.append(f"長期病史：{case['chronic_conditions']}")
+    system_prompt = build_diagnosis_system_prompt(case['language'], get_available_specialties(), False, False)
+    prompt = build_diagnosis_user_prompt(case['language'], case['age'], case['symptoms'], "\n    - ".join(health_details), '')
+    
+    start_time = time.time()
+    try:
+        if provider == 'ollama':
+            data = {"model": model, "prompt": prompt, "system": system_prompt, "stream": False}
+            data.update(ollama_residency_options())
+            response = requests.post(config['base_url'], json=data, timeout=BENCHMARK_CONFIG['timeout_seconds'])
+        else:
+            headers = {"Authorization": f"Bearer {config['api_key']}", "Content-Type": "application/json"}
+            if provider == 'openrouter':
+                headers.update({"HTTP-Referer": "http://localhost:5000", "X-Title": "AI Doctor Matching System"})
+            data = {
+                "model": model,
+                "messages": build_chat_messages(prompt, system_prompt),
+                "max_tokens": config.get('max_tokens', 4000),
+                "temperature": 0.3
+            }
+            response = requests.post(config['base_url'], headers=headers, json=data, timeout=BENCHMARK_CONFIG['timeout_seconds'])
+        if response.status_code != 200:
+            record_llm_call(provider, model, 'benchmark', start_time, f"http_{response.status_code}")
+            raise RuntimeError(f"HTTP {response.status_code}")
+        result = response.json()
+    except requests.exceptions.RequestException as e:
+        record_llm_call(provider, model, 'benchmark', start_time, llm_error_outcome(e))
+        raise
+    
+    record_llm_call(provider, model, 'benchmark', start_time, result=result)
+    text = result.get('response', '') if provider == 'ollama' else result['choices'][0]['message']['content']
+    return text, extract_usage(result)
+
+def diagnosis_parse_succeeded(analysis_text: str) -> bool:
+    """回應是否包含可解析的專科欄位（與 extract_specialties_from_analysis 使用的格式一致）"""
+    if not analysis_text or analysis_text.startswith(('AI分析服務暫時不可用', 'AI服務配置不完整')):
+        return False
+    if not re.search(r'(相關專科|建议专科|建議專科|Recommended Specialty)\s*[：:]?', analysis_text, re.IGNORECASE):
+        return False
+    return bool(extract_specialties_from_analysis(analysis_text))
+
+def configured_benchmark_targets() -> list:
+    """已配置的提供商及其模型（有API密鑰者；Ollama僅在使用中或已設定服務地址時）"""
+    targets = []
+    for provider in ('openrouter', 'openai', 'volcengine'):
+        if AI_CONFIG[provider].get('api_key'):
+            targets.append({'provider': provider, 'model': AI_CONFIG[provider]['model']})
+    if AI_CONFIG['provider'] == 'ollama' or os.getenv('OLLAMA_BASE_URL'):
+        targets.append({'provider': 'ollama', 'model': AI_CONFIG['ollama']['model']})
+    return targets
+
+provider_benchmark = ProviderBenchmark(benchmark_ai_call, diagnosis_parse_succeeded,
+                                       max_workers=BENCHMARK_CONFIG['max_workers'],
+                                       max_per_provider=BENCHMARK_CONFIG['max_per_provider'],
+                                       slot_fn=bulkheads.get)
+# 基準測試可能持續數分鐘：在單一背景線程執行，管理頁面輪詢結果，不佔用網頁工作線程
+benchmark_jobs = AnalysisJobQueue(workers=1, max_pending=1, result_ttl_seconds=BENCHMARK_CONFIG['result_ttl_seconds'])
+
+@app.route('/admin/api/ai-benchmark', methods=['POST'])
+@require_admin
+def run_ai_benchmark():
+    """在背景並行測試所有已配置的提供商/模型：p50/p95延遲、tokens/秒、錯誤率及專科解析成功率
+    
+    返回 202 及 job_id，結果經 /admin/api/ai-benchmark/jobs/<job_id> 輪詢
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        repeats = max(1, min(int(data.get('repeats', 1)), BENCHMARK_CONFIG['max_repeats']))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': '重複次數必須是數字'}), 400
+    
+    targets = configured_benchmark_targets()
+    # 額外模型：{provider: "model-a, model-b"}，使用該提供商的現有配置
+    for provider, models in (data.get('extra_models') or {}).items():
+        if provider not in ('openrouter', 'openai', 'volcengine', 'ollama'):
+            continue
+        for model in str(models).split(','):
+            model = model.strip()
+            if model and {'provider': provider, 'model': model} not in targets:
+                targets.append({'provider': provider, 'model': model})
+    if not targets:
+        return jsonify({'success': False, 'error': '沒有已配置的AI提供商'}), 400
+    
+    # 同一時間只允許一個基準測試（排隊中或執行中）
+    stats = benchmark_jobs.get_stats()
+    if stats['queued'] or stats['running']:
+        return jsonify({'success': False, 'error': '基準測試正在進行中，請稍後再試'}), 409
+    try:
+        job_id = benchmark_jobs.submit(provider_benchmark.run, targets, AI_DIAGNOSIS_TEST_CASES, repeats,
+                                       owner=session.get('admin_username'))
+    except JobQueueFull:
+        return jsonify({'success': False, 'error': '基準測試正在進行中，請稍後再試'}), 409
+    
+    log_analytics('ai_benchmark', {'targets': targets, 'repeats': repeats, 'job_id': job_id},
+                  get_real_ip(), request.user_agent.string)
+    return jsonify({'success': True, 'job_id': job_id, 'status': AnalysisJobQueue.QUEUED}), 202
+
+@app.route('/admin/api/ai-benchmark/jobs/<job_id>')
+@require_admin
+def get_ai_benchmark_job(job_id):
+    """查詢背景基準測試狀態 - 完成時返回完整報告"""
+    job = benchmark_jobs.get(job_id, owner=session.get('admin_username'))
+    if job is None:
+        return jsonify({'success': False, 'error': '找不到基準測試任務'}), 404
+    if job['status'] == AnalysisJobQueue.DONE:
+        return jsonify(dict(job['result'], success=True, job_id=job_id, status=job['status']))
+    if job['status'] == AnalysisJobQueue.FAILED:
+        return jsonify({'success': False, 'job_id': job_id, 'status': job['status'], 'error': f"測試失敗: {job['error']}"})
+    return jsonify({'success': True, 'job_id': job_id, 'status': job['status']})
+
+@app.route('/admin/api/ai-benchmark/history')
+@require_admin
+def ai_benchmark_history():
+    """最近的基準測試結果，用於比較"""
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify({'success': True, 'runs': provider_benchmark.history(max(1, min(limit, 50)))})
+
+@app.route('/admin/update_ai_routing', methods=['POST'])
+@require_admin
+def update_ai_routing():
+    """更新各調用類型的提供商/模型路由並保存至 system_config"""
+    try:
+        for call_type in AI_ROUTING_CONFIG:
+            AI_ROUTING_CONFIG[call_type] = sanitize_ai_route({
+                field: request.form.get(f'route_{call_type}_{field}', '')
+                for field in ('provider', 'model', 'max_tokens', 'timeout')
+            })
+        
+        conn = sqlite3.connect('admin_data.db')
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO system_config (config_key, config_value)
+            VALUES ('ai_routing', ?)
+        ''', (json.dumps(AI_ROUTING_CONFIG),))
+        conn.commit()
+        conn.close()
+        
+        log_analytics('config_update', {'type': 'ai_routing', 'routes': AI_ROUTING_CONFIG},
+                     get_real_ip(), request.user_agent.string)
+        # 新路由到Ollama的模型立即預熱
+        request_ollama_rewarm(reload=False)
+        
+        flash('AI調用路由已更新', 'success')
+    except Exception as e:
+        logger.error(f"AI routing update error: {e}")
+        flash(f'更新AI調用路由時發生錯誤: {str(e)}', 'error')
+    
+    return redirect(url_for('admin_config'))
+
 @app.route('/admin/update_ai_config', methods=['POST'])
 @require_admin
 def update_ai_config():
@@ -5720,12 +7354,20 @@ def update_ai_config():
         elif provider == 'ollama':
             AI_CONFIG['ollama'].update({
                 'model': request.form.get('ollama_model', 'llama3.1:8b'),
-                'base_url': request.form.get('ollama_base_url', 'http://localhost:11434/api/generate')
+                'base_url': request.form.get('ollama_base_url', 'http://localhost:11434/api/generate'),
+                'keep_alive': request.form.get('ollama_keep_alive', '30m').strip(),
+                'num_ctx': int(request.form.get('ollama_num_ctx') or '0'),
+                'num_thread': int(request.form.get('ollama_num_thread') or '0')
             })
             # Update .env file
             update_env_file('AI_PROVIDER', 'ollama')
             update_env_file('OLLAMA_MODEL', AI_CONFIG['ollama']['model'])
             update_env_file('OLLAMA_BASE_URL', AI_CONFIG['ollama']['base_url'])
+            update_env_file('OLLAMA_KEEP_ALIVE', AI_CONFIG['ollama']['keep_alive'])
+            update_env_file('OLLAMA_NUM_CTX', str(AI_CONFIG['ollama']['num_ctx']))
+            update_env_file('OLLAMA_NUM_THREAD', str(AI_CONFIG['ollama']['num_thread']))
+            # 新模型或新的 num_ctx 需要重新載入：喚醒背景線程立即預熱
+            request_ollama_rewarm()
         
         # Save to database
         conn = sqlite3.connect('admin_data.db')
@@ -7316,7 +8958,7 @@ def get_user_reports(user_ip):
         cursor.execute('''
             SELECT id, timestamp, age, gender, symptoms, chronic_conditions, 
                    related_specialty, ai_analysis, language, location, 
-                   analysis_report
+                   analysis_report, emergency_needed
             FROM user_queries 
             WHERE user_ip = ?
             ORDER BY timestamp DESC
@@ -7327,6 +8969,8 @@ def get_user_reports(user_ip):
         
         reports = []
         for query in queries:
+            # Rows saved before the emergency flag was stored fall back to parsing the analysis text
+            emergency_needed = query[11] if query[11] is not None else check_emergency_needed(query[7])
             reports.append({
                 'id': query[0],
                 'timestamp': query[1],
@@ -7335,7 +8979,7 @@ def get_user_reports(user_ip):
                 'symptoms': query[4],
                 'chronic_conditions': query[5],
                 'specialty': query[6],
-                'emergency_level': 'Yes' if check_emergency_needed(query[7]) else 'No',  # Use emergency detection instead of severity
+                'emergency_level': 'Yes' if emergency_needed else 'No',  # Use emergency detection instead of severity
                 'language': query[8],
                 'location': query[9],
                 'analysis_report': query[10]
@@ -7899,6 +9543,23 @@ def get_system_health():
         
         return jsonify({
             'current_status': health_data,
+            'circuit_breakers': circuit_breakers.get_all_status(),
+            'request_coalescing': single_flight.get_stats(),
+            'prompt_cache': prompt_cache_stats.get_stats(),
+            'translation_memory': translation_memory.get_stats(),
+            'symptom_canonicalization': dict(symptom_canonicalizer.get_stats(), diagnosis_cache=diagnosis_cache.get_stats()),
+            'translation_batching': translation_batcher.get_stats(),
+            'progressive_matching': progressive_match_stats.get_stats(),
+            'speculative_prefetch': symptom_prefetcher.get_stats(),
+            'pubmed_rate_limit': pubmed_rate_limiter.get_stats(),
+            'pubmed_cache': dict(pubmed_cache.get_stats(), enabled=PUBMED_CACHE_CONFIG['enabled']),
+            'prompt_budget': dict(prompt_budget_stats.get_stats(), limit=diagnosis_prompt_token_limit()),
+            'triage_model': triage_predictor.get_stats(),
+            'symptom_validation': local_symptom_validator.get_stats(),
+            'analysis_jobs': analysis_jobs.get_stats(),
+            'bulkheads': bulkheads.get_all_status(),
+            'ollama_residency': get_ollama_residency_status(),
+            'llm_calls': llm_call_metrics.get_percentiles(),
             'history': history,
             'last_updated': get_current_time().isoformat()
         })
@@ -7907,6 +9568,22 @@ def get_system_health():
         logger.error(f"Error getting system health: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/api/llm-metrics')
+@login_required
+def get_llm_metrics():
+    """Get per-call LLM latency percentiles, recent calls and the hourly rollup"""
+    try:
+        hours = min(request.args.get('hours', 24, type=int), 24 * 30)
+        return jsonify({
+            'percentiles': llm_call_metrics.get_percentiles(),
+            'recent': llm_call_metrics.recent(request.args.get('limit', 50, type=int)),
+            'rollup': llm_call_metrics.get_rollup(hours),
+            'last_updated': get_current_time().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error getting LLM metrics: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/api/run-health-check', methods=['POST'])
 @require_admin
 def manual_health_check():
@@ -8344,7 +10021,9 @@ def submit_bug_report():
 SYSTEM_HEALTH_STATUS = {
     'ai_diagnosis': {'status': 'unknown', 'last_check': None, 'error': None},
     'database': {'status': 'unknown', 'last_check': None, 'error': None},
-    'whatsapp': {'status': 'unknown', 'last_check': None, 'error': None}
+    'whatsapp': {'status': 'unknown', 'last_check': None, 'error': None},
+    # Updated by the background prober behind /health
+    'ai_provider': {'status': 'unknown', 'last_check': None, 'error': None}
 }
 
 def log_health_check(check_type: str, status: str, details: dict = None, error: str = None):
@@ -8393,34 +10072,35 @@ def log_health_check(check_type: str, status: str, details: dict = None, error:
     except Exception as e:
         logger.error(f"Failed to log health check: {e}")
 
+# Test cases with different symptom combinations (daily health check and provider benchmark)
+AI_DIAGNOSIS_TEST_CASES = [
+    {
+        'symptoms': '頭痛、發燒、咳嗽三天',
+        'age': 30,
+        'gender': '男',
+        'chronic_conditions': '',
+        'language': 'zh-TW'
+    },
+    {
+        'symptoms': '胃痛、噁心、腹瀉兩天',
+        'age': 25,
+        'gender': '女',
+        'chronic_conditions': '',
+        'language': 'zh-TW'
+    },
+    {
+        'symptoms': '胸痛、呼吸困難、心跳加速',
+        'age': 45,
+        'gender': '男',
+        'chronic_conditions': '高血壓',
+        'language': 'zh-TW'
+    }
+]
+
 def test_ai_diagnosis():
     """Test AI diagnosis system with multiple test cases"""
     start_time = time.time()
-    
-    # Test cases with different symptom combinations
-    test_cases = [
-        {
-            'symptoms': '頭痛、發燒、咳嗽三天',
-            'age': 30,
-            'gender': '男',
-            'chronic_conditions': '',
-            'language': 'zh-TW'
-        },
-        {
-            'symptoms': '胃痛、噁心、腹瀉兩天',
-            'age': 25,
-            'gender': '女',
-            'chronic_conditions': '',
-            'language': 'zh-TW'
-        },
-        {
-            'symptoms': '胸痛、呼吸困難、心跳加速',
-            'age': 45,
-            'gender': '男',
-            'chronic_conditions': '高血壓',
-            'language': 'zh-TW'
-        }
-    ]
+    test_cases = AI_DIAGNOSIS_TEST_CASES
     
     try:
         logger.info("Starting AI diagnosis health check with multiple test cases...")
@@ -8653,6 +10333,9 @@ def run_scheduled_tasks():
         # Schedule daily health check at midnight (12:00 AM)
         schedule.every().day.at("00:00").do(run_daily_health_check)
         
+        # Drop PubMed cache entries too old to be served, even as stale
+        schedule.every().day.at("03:00").do(pubmed_cache.purge_expired)
+        
         while True:
             schedule.run_pending()
             time.sleep(3600)  # Check every hour
@@ -8660,9 +10343,12 @@ def run_scheduled_tasks():
     # Start scheduler in background thread
     scheduler = threading.Thread(target=scheduler_thread, daemon=True)
     scheduler.start()
+    start_health_prober()
+    start_ollama_keep_warm()
     logger.info("Scheduled tasks initialized:")
     logger.info("- Diagnosis reports cleanup: daily at 2 AM")
     logger.info("- System health check: daily at 12 AM")
+    logger.info("- PubMed cache purge: daily at 3 AM")
 
 # Multi-Device 2FA Routes
 @app.route('/admin/2fa/devices')
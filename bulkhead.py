@@ -0,0 +1,144 @@
+"""
+Bulkhead Admission Control
+Per-dependency concurrency limits (one per AI provider, one for PubMed) with a
+bounded wait queue. When a dependency is saturated, extra callers are rejected
+immediately with a Retry-After hint instead of piling up threads and blowing the
+provider's rate limits.
+"""
+
+import threading
+import time
+
+from request_deadline import request_timeout
+
+
+class BulkheadFull(Exception):
+    """Raised when a dependency has no free slot and its wait queue is full or timed out"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Dependency '{name}' is saturated, retry after {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Concurrency limiter with a bounded wait queue"""
+
+    def __init__(self, name, max_concurrent=8, max_queue=16, max_wait_seconds=5, retry_after_seconds=10):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._stats = {'admitted': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0, 'max_queue_depth': 0}
+
+    def acquire(self):
+        """Take a slot, waiting in the bounded queue if needed; raises BulkheadFull
+
+        The wait is max_wait_seconds, cut to the time left in the caller's request deadline.
+        """
+        with self._condition:
+            if self._active < self.max_concurrent and self._waiting == 0:
+                self._active += 1
+                self._stats['admitted'] += 1
+                return
+
+            if self._waiting >= self.max_queue:
+                self._stats['rejected_queue_full'] += 1
+                raise BulkheadFull(self.name, self.retry_after_seconds)
+
+            self._waiting += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._waiting)
+            deadline = time.monotonic() + request_timeout(self.max_wait_seconds)
+            try:
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['rejected_timeout'] += 1
+                        raise BulkheadFull(self.name, self.retry_after_seconds)
+                    self._condition.wait(remaining)
+                self._active += 1
+                self._stats['admitted'] += 1
+            finally:
+                self._waiting -= 1
+
+    def release(self):
+        """Give a slot back and wake one waiter"""
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn inside a slot"""
+        self.acquire()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.release()
+
+    def is_saturated(self):
+        """True when every slot is taken or callers are already queueing"""
+        with self._condition:
+            return self._active >= self.max_concurrent or self._waiting > 0
+
+    def get_status(self):
+        """Get limits, current load and rejection counters"""
+        with self._condition:
+            status = dict(self._stats)
+            status.update({
+                'name': self.name,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queue_depth': self._waiting
+            })
+        status['rejected'] = status['rejected_queue_full'] + status['rejected_timeout']
+        return status
+
+
+class BulkheadRegistry:
+    """Named bulkheads sharing a default configuration, with per-dependency overrides"""
+
+    def __init__(self, **default_settings):
+        self.default_settings = default_settings
+        self.dependency_settings = {}
+        self._bulkheads = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **settings):
+        """Update default settings used for bulkheads created from now on"""
+        self.default_settings.update(settings)
+
+    def configure_dependency(self, name, **settings):
+        """Override settings for one dependency (e.g. a lower limit for PubMed)"""
+        self.dependency_settings.setdefault(name, {}).update(settings)
+
+    def get(self, name):
+        """Get (or lazily create) the bulkhead for a dependency"""
+        with self._lock:
+            if name not in self._bulkheads:
+                settings = dict(self.default_settings, **self.dependency_settings.get(name, {}))
+                self._bulkheads[name] = Bulkhead(name, **settings)
+            return self._bulkheads[name]
+
+    def get_all_status(self):
+        """Get status for every bulkhead created so far"""
+        with self._lock:
+            bulkheads = list(self._bulkheads.values())
+        return {bulkhead.name: bulkhead.get_status() for bulkhead in bulkheads}
+
+
+# Global instance
+bulkheads = BulkheadRegistry()
@@ -0,0 +1,167 @@
+"""
+Circuit Breaker
+Fail-fast protection for external dependencies (AI providers, PubMed E-utilities).
+When a dependency keeps failing or responding too slowly, its breaker opens and
+callers skip the network call and go straight to their existing fallbacks.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """Circuit breaker with closed / open / half-open states"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_rate_threshold=0.5, slow_call_threshold_ms=20000,
+                 window_size=20, min_calls=5, open_seconds=30, half_open_max_calls=1):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold_ms = slow_call_threshold_ms
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window_size)  # (success, latency_ms)
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._half_open_in_flight = 0
+        self._rejected_count = 0
+        self._last_failure = None
+        self._last_failure_time = None
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        """Move from open to half-open once the open period has elapsed (lock held)"""
+        if self._state == self.OPEN and time.time() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._half_open_in_flight = 0
+
+    def _trip(self):
+        """Open the breaker (lock held)"""
+        self._state = self.OPEN
+        self._opened_at = time.time()
+        self._half_open_in_flight = 0
+
+    def _reset(self):
+        """Close the breaker and clear the rolling window (lock held)"""
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._half_open_in_flight = 0
+        self._calls.clear()
+
+    def allow_request(self):
+        """Return True if a call may proceed, False if it should fail fast"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self._rejected_count += 1
+            return False
+
+    def record_success(self, latency_seconds):
+        """Record a completed call; calls slower than the latency threshold count as failures"""
+        latency_ms = latency_seconds * 1000
+        if latency_ms > self.slow_call_threshold_ms:
+            self.record_failure(f"slow call ({int(latency_ms)}ms)", latency_seconds)
+            return
+
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._reset()
+            self._calls.append((True, latency_ms))
+
+    def record_failure(self, error=None, latency_seconds=None):
+        """Record a failed call and trip the breaker if the failure rate is too high"""
+        with self._lock:
+            self._last_failure = str(error) if error else 'request failed'
+            self._last_failure_time = time.time()
+
+            if self._state == self.HALF_OPEN:
+                self._trip()
+                return
+
+            latency_ms = latency_seconds * 1000 if latency_seconds is not None else None
+            self._calls.append((False, latency_ms))
+
+            if self._state == self.CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for success, _ in self._calls if not success)
+                if failures / len(self._calls) >= self.failure_rate_threshold:
+                    self._trip()
+
+    def record_ignored(self):
+        """Drop a call that reached no verdict, e.g. one cut short by the caller's own deadline
+
+        Nothing is added to the rolling window; a half-open probe slot is freed for the next caller.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+
+    def get_status(self):
+        """Get breaker state and rolling-window statistics"""
+        with self._lock:
+            self._refresh_state()
+            calls = list(self._calls)
+            failures = sum(1 for success, _ in calls if not success)
+            latencies = [latency for _, latency in calls if latency is not None]
+
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = max(0, int(self.open_seconds - (time.time() - self._opened_at)))
+
+            return {
+                'name': self.name,
+                'state': self._state,
+                'window_calls': len(calls),
+                'failure_rate': round(failures / len(calls), 3) if calls else 0.0,
+                'avg_latency_ms': int(sum(latencies) / len(latencies)) if latencies else None,
+                'rejected_count': self._rejected_count,
+                'retry_in_seconds': retry_in,
+                'last_failure': self._last_failure,
+                'last_failure_time': self._last_failure_time
+            }
+
+
+class CircuitBreakerRegistry:
+    """Named circuit breakers sharing a default configuration"""
+
+    def __init__(self, **default_settings):
+        self.default_settings = default_settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **settings):
+        """Update default settings used for breakers created from now on"""
+        self.default_settings.update(settings)
+
+    def get(self, name):
+        """Get (or lazily create) the breaker for a dependency"""
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, **self.default_settings)
+            return self._breakers[name]
+
+    def get_all_status(self):
+        """Get status for every breaker created so far"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.get_status() for breaker in breakers}
+
+
+# Global instance
+circuit_breakers = CircuitBreakerRegistry()
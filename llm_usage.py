@@ -0,0 +1,297 @@
+"""
+LLM Usage Accounting
+Parses provider `usage` blocks (OpenAI / OpenRouter / Volcano Engine / Ollama) and keeps
+running totals of prompt, completion and prefix-cached tokens per provider and model.
+Per-call latency/outcome metrics are kept in a ring buffer and rolled up hourly into SQLite.
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+def extract_usage(result):
+    """Extract token counts from a provider response body; missing fields are None"""
+    usage = {
+        'prompt_tokens': None,
+        'completion_tokens': None,
+        'cached_tokens': None
+    }
+    if not isinstance(result, dict):
+        return usage
+
+    block = result.get('usage')
+    if isinstance(block, dict):
+        # OpenAI-compatible chat completions (OpenAI, OpenRouter, Volcano Engine)
+        usage['prompt_tokens'] = block.get('prompt_tokens', block.get('input_tokens'))
+        usage['completion_tokens'] = block.get('completion_tokens', block.get('output_tokens'))
+
+        details = block.get('prompt_tokens_details') or block.get('input_tokens_details') or {}
+        cached = details.get('cached_tokens') if isinstance(details, dict) else None
+        if cached is None:
+            # Anthropic-style field names passed through by some gateways
+            cached = block.get('cache_read_input_tokens')
+        usage['cached_tokens'] = cached
+    elif 'prompt_eval_count' in result or 'eval_count' in result:
+        # Ollama /api/generate reports evaluated tokens only
+        usage['prompt_tokens'] = result.get('prompt_eval_count')
+        usage['completion_tokens'] = result.get('eval_count')
+
+    return usage
+
+
+class PromptCacheStats:
+    """Running token totals per provider/model, used to verify prefix-cache hit rates"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, provider, model, usage):
+        """Add one call's usage to the provider/model totals"""
+        key = f"{provider}:{model}"
+        with self._lock:
+            totals = self._totals.setdefault(key, {
+                'provider': provider,
+                'model': model,
+                'calls': 0,
+                'calls_with_usage': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'cached_tokens': 0
+            })
+            totals['calls'] += 1
+            if usage.get('prompt_tokens') is not None:
+                totals['calls_with_usage'] += 1
+                totals['prompt_tokens'] += usage['prompt_tokens'] or 0
+                totals['completion_tokens'] += usage.get('completion_tokens') or 0
+                totals['cached_tokens'] += usage.get('cached_tokens') or 0
+
+    def get_stats(self):
+        """Get totals and the cached/prompt token ratio per provider/model"""
+        with self._lock:
+            stats = {key: dict(totals) for key, totals in self._totals.items()}
+        for totals in stats.values():
+            prompt_tokens = totals['prompt_tokens']
+            totals['cache_hit_ratio'] = round(totals['cached_tokens'] / prompt_tokens, 3) if prompt_tokens else 0.0
+        return stats
+
+
+# Upper bounds (ms) of the latency histogram buckets stored in the hourly rollup
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000, 20000, 30000, 60000)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers; None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered), math.ceil(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+
+def histogram_percentile(histogram, pct):
+    """Estimate a percentile from bucket counts (returns the bucket's upper bound)"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = pct / 100 * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else None
+    return None
+
+
+class LLMCallMetrics:
+    """Per-call LLM latency/token metrics: recent calls in memory, hourly rollup in SQLite"""
+
+    def __init__(self, capacity=1000, db_path='admin_data.db', flush_interval_seconds=60):
+        self.db_path = db_path
+        self.flush_interval_seconds = flush_interval_seconds
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=capacity)
+        self._pending = {}
+        self._last_flush = time.time()
+
+    def record(self, provider, model, call_type, latency_ms, outcome, usage=None):
+        """Record one provider call; latency_ms is None when the request was never sent"""
+        usage = usage or {}
+        now = time.time()
+        call = {
+            'timestamp': now,
+            'provider': provider,
+            'model': model,
+            'call_type': call_type,
+            'latency_ms': round(latency_ms, 1) if latency_ms is not None else None,
+            'outcome': outcome,
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'cached_tokens': usage.get('cached_tokens')
+        }
+        bucket_start = int(now // 3600 * 3600)
+        key = (bucket_start, provider, model or '', call_type)
+        with self._lock:
+            self._calls.append(call)
+            rollup = self._pending.setdefault(key, {
+                'calls': 0, 'errors': 0, 'latency_ms_sum': 0.0, 'latency_ms_max': 0.0,
+                'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0,
+                'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            })
+            rollup['calls'] += 1
+            if outcome != 'success':
+                rollup['errors'] += 1
+            if latency_ms is not None:
+                rollup['latency_ms_sum'] += latency_ms
+                rollup['latency_ms_max'] = max(rollup['latency_ms_max'], latency_ms)
+                index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound),
+                             len(LATENCY_BUCKETS_MS))
+                rollup['histogram'][index] += 1
+            for field in ('prompt_tokens', 'completion_tokens', 'cached_tokens'):
+                rollup[field] += call[field] or 0
+            due = now - self._last_flush >= self.flush_interval_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Merge pending hourly aggregates into the llm_call_rollup table"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+        if not pending:
+            return 0
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_call_rollup (
+                    bucket_start INTEGER NOT NULL,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    call_type TEXT NOT NULL,
+                    calls INTEGER DEFAULT 0,
+                    errors INTEGER DEFAULT 0,
+                    latency_ms_sum REAL DEFAULT 0,
+                    latency_ms_max REAL DEFAULT 0,
+                    prompt_tokens INTEGER DEFAULT 0,
+                    completion_tokens INTEGER DEFAULT 0,
+                    cached_tokens INTEGER DEFAULT 0,
+                    latency_histogram TEXT,
+                    PRIMARY KEY (bucket_start, provider, model, call_type)
+                )
+            ''')
+            for key, rollup in pending.items():
+                cursor.execute('''
+                    SELECT calls, errors, latency_ms_sum, latency_ms_max, prompt_tokens,
+                           completion_tokens, cached_tokens, latency_histogram
+                    FROM llm_call_rollup
+                    WHERE bucket_start = ? AND provider = ? AND model = ? AND call_type = ?
+                ''', key)
+                row = cursor.fetchone()
+                histogram = rollup['histogram']
+                if row:
+                    previous = json.loads(row[7]) if row[7] else []
+                    histogram = [a + b for a, b in zip(histogram, previous + [0] * (len(histogram) - len(previous)))]
+                    values = (row[0] + rollup['calls'], row[1] + rollup['errors'],
+                              row[2] + rollup['latency_ms_sum'], max(row[3], rollup['latency_ms_max']),
+                              row[4] + rollup['prompt_tokens'], row[5] + rollup['completion_tokens'],
+                              row[6] + rollup['cached_tokens'])
+                else:
+                    values = (rollup['calls'], rollup['errors'], rollup['latency_ms_sum'], rollup['latency_ms_max'],
+                              rollup['prompt_tokens'], rollup['completion_tokens'], rollup['cached_tokens'])
+                cursor.execute('''
+                    INSERT OR REPLACE INTO llm_call_rollup
+                    (bucket_start, provider, model, call_type, calls, errors, latency_ms_sum, latency_ms_max,
+                     prompt_tokens, completion_tokens, cached_tokens, latency_histogram)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', key + values + (json.dumps(histogram),))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error flushing LLM call rollup: {e}")
+        return len(pending)
+
+    def recent(self, limit=50):
+        """Get the most recent calls, newest first"""
+        with self._lock:
+            calls = list(self._calls)[-limit:]
+        return list(reversed(calls))
+
+    def get_percentiles(self):
+        """Get p50/p90/p99 latency, error rate and average tokens per provider/call type"""
+        with self._lock:
+            calls = list(self._calls)
+        groups = {}
+        for call in calls:
+            groups.setdefault(f"{call['provider']}:{call['call_type']}", []).append(call)
+
+        stats = {}
+        for key, group in groups.items():
+            latencies = [call['latency_ms'] for call in group if call['latency_ms'] is not None]
+            prompt_tokens = [call['prompt_tokens'] for call in group if call['prompt_tokens'] is not None]
+            completion_tokens = [call['completion_tokens'] for call in group if call['completion_tokens'] is not None]
+            errors = sum(1 for call in group if call['outcome'] != 'success')
+            stats[key] = {
+                'provider': group[0]['provider'],
+                'call_type': group[0]['call_type'],
+                'calls': len(group),
+                'errors': errors,
+                'error_rate': round(errors / len(group), 3),
+                'p50_ms': percentile(latencies, 50),
+                'p90_ms': percentile(latencies, 90),
+                'p99_ms': percentile(latencies, 99),
+                'avg_prompt_tokens': round(sum(prompt_tokens) / len(prompt_tokens)) if prompt_tokens else None,
+                'avg_completion_tokens': round(sum(completion_tokens) / len(completion_tokens)) if completion_tokens else None,
+                'outcomes': {outcome: sum(1 for call in group if call['outcome'] == outcome)
+                             for outcome in {call['outcome'] for call in group}}
+            }
+        return stats
+
+    def get_rollup(self, hours=24):
+        """Get hourly rollup rows for the last N hours with histogram-estimated percentiles"""
+        self.flush()
+        cutoff = int((time.time() - hours * 3600) // 3600 * 3600)
+        rows = []
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT bucket_start, provider, model, call_type, calls, errors, latency_ms_sum, latency_ms_max,
+                       prompt_tokens, completion_tokens, cached_tokens, latency_histogram
+                FROM llm_call_rollup
+                WHERE bucket_start >= ?
+                ORDER BY bucket_start
+            ''', (cutoff,))
+            for row in cursor.fetchall():
+                histogram = json.loads(row[11]) if row[11] else []
+                timed_calls = sum(histogram)
+                rows.append({
+                    'bucket_start': row[0],
+                    'provider': row[1],
+                    'model': row[2],
+                    'call_type': row[3],
+                    'calls': row[4],
+                    'errors': row[5],
+                    'avg_latency_ms': round(row[6] / timed_calls, 1) if timed_calls else None,
+                    'max_latency_ms': row[7],
+                    # Calls beyond the last bucket bound report the observed maximum
+                    'p50_ms': histogram_percentile(histogram, 50) or (row[7] if timed_calls else None),
+                    'p90_ms': histogram_percentile(histogram, 90) or (row[7] if timed_calls else None),
+                    'p99_ms': histogram_percentile(histogram, 99) or (row[7] if timed_calls else None),
+                    'prompt_tokens': row[8],
+                    'completion_tokens': row[9],
+                    'cached_tokens': row[10]
+                })
+            conn.close()
+        except Exception as e:
+            print(f"Error reading LLM call rollup: {e}")
+        return rows
+
+
+# Global instances
+prompt_cache_stats = PromptCacheStats()
+llm_call_metrics = LLMCallMetrics()
@@ -0,0 +1,111 @@
+"""
+Micro-Batcher
+Collects items submitted by concurrent callers during a short window and processes
+them with one batch call, then fans the per-item results back out. Used to merge the
+small translation prompts sent by simultaneous /find_doctor requests into one LLM call.
+"""
+
+import threading
+import time
+
+
+class _Batch:
+    """Items collected during one window and the shared outcome"""
+
+    def __init__(self):
+        self.items = []
+        self.callers = 0
+        self.closed = False
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Leader/follower micro-batching: the first caller in a window runs the batch for everyone"""
+
+    def __init__(self, batch_fn, window_ms=50, max_batch_size=40, wait_timeout_seconds=90):
+        # batch_fn(items) -> {item: result}; items missing from the dict have no result
+        self.batch_fn = batch_fn
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self._condition = threading.Condition()
+        self._current = None
+        self._stats = {'batches': 0, 'items': 0, 'callers': 0, 'calls_saved': 0, 'errors': 0}
+
+    def configure(self, window_ms=None, max_batch_size=None):
+        """Update the batching window and size limit"""
+        with self._condition:
+            if window_ms is not None:
+                self.window_ms = window_ms
+            if max_batch_size is not None:
+                self.max_batch_size = max_batch_size
+
+    def submit(self, items, wait_timeout=None):
+        """Add items to the open batch and block until it is processed; returns {item: result}"""
+        items = list(dict.fromkeys(items))
+        if not items:
+            return {}
+
+        with self._condition:
+            batch = self._current
+            if batch is not None and (batch.closed or len(set(batch.items) | set(items)) > self.max_batch_size):
+                # Full (or already closing): let its leader run now and start a new batch
+                batch.closed = True
+                self._condition.notify_all()
+                batch = None
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._current = batch
+            batch.items.extend(item for item in items if item not in batch.items)
+            batch.callers += 1
+            if len(batch.items) >= self.max_batch_size:
+                batch.closed = True
+                self._condition.notify_all()
+
+            if leader:
+                deadline = time.monotonic() + self.window_ms / 1000
+                while not batch.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch.closed = True
+                if self._current is batch:
+                    self._current = None
+
+        if leader:
+            self._run(batch)
+        elif not batch.done.wait(wait_timeout if wait_timeout is not None else self.wait_timeout_seconds):
+            raise TimeoutError('Micro-batch did not complete in time')
+
+        if batch.error is not None:
+            raise batch.error
+        return {item: batch.result[item] for item in items if item in batch.result}
+
+    def _run(self, batch):
+        """Process a closed batch and wake its followers"""
+        try:
+            batch.result = self.batch_fn(list(batch.items)) or {}
+        except Exception as e:
+            batch.error = e
+        finally:
+            with self._condition:
+                self._stats['batches'] += 1
+                self._stats['items'] += len(batch.items)
+                self._stats['callers'] += batch.callers
+                self._stats['calls_saved'] += batch.callers - 1
+                if batch.error is not None:
+                    self._stats['errors'] += 1
+            batch.done.set()
+
+    def get_stats(self):
+        """Get batch counters and the average number of callers per batch"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['window_ms'] = self.window_ms
+            stats['max_batch_size'] = self.max_batch_size
+        stats['avg_callers_per_batch'] = round(stats['callers'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Mock LLM and PubMed Server
+Local stand-in for the external services used by the symptom analysis pipeline,
+so the real HTTP code paths can be load-tested offline without provider credits.
+
+Emulates:
+- OpenAI / OpenRouter / Volcano Engine chat completions  POST /v1/chat/completions
+- Ollama generate                                         POST /api/generate
+- NCBI E-utilities esearch / efetch (XML)                 GET  /entrez/eutils/esearch.fcgi, efetch.fcgi
+
+Diagnosis replies follow the format translations.py asks for (labelled text, or a
+JSON object when structured output is requested), with a usage block including
+simulated prefix-cache hits.
+
+USAGE:
+    python mock_ai_server.py
+
+    # then start the app against it
+    AI_PROVIDER=openai OPENAI_API_KEY=mock \\
+    OPENAI_BASE_URL=http://localhost:8765/v1/chat/completions \\
+    OPENROUTER_BASE_URL=http://localhost:8765/v1/chat/completions \\
+    VOLCENGINE_BASE_URL=http://localhost:8765/v1/chat/completions \\
+    OLLAMA_BASE_URL=http://localhost:8765/api/generate \\
+    PUBMED_BASE_URL=http://localhost:8765/entrez/eutils \\
+    python app.py
+
+CONFIGURATION (environment, or POST JSON to /mock/config at runtime):
+    MOCK_AI_PORT        port to listen on (default 8765)
+    MOCK_LATENCY_MS     base latency added to every LLM response (default 800)
+    MOCK_JITTER_MS      random extra latency, 0..jitter (default 400)
+    MOCK_PUBMED_LATENCY_MS  base latency for E-utilities (default 150)
+    MOCK_ERROR_RATE     fraction of requests answered with an error (default 0)
+    MOCK_ERROR_STATUS   HTTP status used for injected errors (default 503)
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from xml.sax.saxutils import escape
+
+from flask import Flask, Response, jsonify, request
+
+from translations import get_translation, TRANSLATIONS
+
+app = Flask(__name__)
+
+MOCK_CONFIG = {
+    'latency_ms': int(os.getenv('MOCK_LATENCY_MS', '800')),
+    'jitter_ms': int(os.getenv('MOCK_JITTER_MS', '400')),
+    'pubmed_latency_ms': int(os.getenv('MOCK_PUBMED_LATENCY_MS', '150')),
+    'error_rate': float(os.getenv('MOCK_ERROR_RATE', '0')),
+    'error_status': int(os.getenv('MOCK_ERROR_STATUS', '503'))
+}
+
+_lock = threading.Lock()
+_stats = {'chat': 0, 'generate': 0, 'esearch': 0, 'efetch': 0, 'errors': 0}
+_seen_prefixes = set()
+_pmid_terms = {}
+
+# Canned diagnoses keyed by symptom keywords: (diagnosis, specialties, severity, emergency, search terms)
+CANNED_DIAGNOSES = [
+    (('胸痛', '胸悶', 'chest pain'), '急性冠狀動脈綜合症可能，需排除心肌梗塞', ['急診科', '心臟科'], 'severe', True,
+     ['chest pain', 'acute coronary syndrome']),
+    (('頭痛', '偏頭痛', 'headache'), '偏頭痛或緊張性頭痛', ['神經科', '內科'], 'moderate', False,
+     ['headache', 'migraine']),
+    (('咳嗽', '喉嚨痛', 'cough'), '上呼吸道感染', ['內科', '耳鼻喉科'], 'mild', False,
+     ['cough', 'upper respiratory tract infection']),
+    (('腹痛', '肚痛', '腹瀉', 'abdominal pain'), '急性腸胃炎', ['內科'], 'moderate', False,
+     ['abdominal pain', 'gastroenteritis']),
+    (('皮疹', '痕癢', 'rash'), '接觸性皮炎', ['皮膚科'], 'mild', False,
+     ['rash', 'contact dermatitis'])
+]
+DEFAULT_DIAGNOSIS = ('一般不適，需進一步評估', ['內科'], 'mild', False, ['fatigue'])
+
+# Small term list for translation prompts
+MOCK_TRANSLATIONS = {
+    '頭痛': 'headache', '發燒': 'fever', '咳嗽': 'cough', '胸痛': 'chest pain', '腹痛': 'abdominal pain',
+    '頭暈': 'dizziness', '喉嚨痛': 'sore throat', '流鼻水': 'rhinorrhea', '皮疹': 'rash', '嘔吐': 'vomiting'
+}
+
+INVALID_SYMPTOMS = ('test', '測試', '123', '隨便')
+
+
+def inject_latency_and_errors(base_ms=None):
+    """Sleep for the configured latency; return an error response when one is injected"""
+    base_ms = MOCK_CONFIG['latency_ms'] if base_ms is None else base_ms
+    time.sleep(max(0, base_ms + random.uniform(0, MOCK_CONFIG['jitter_ms'])) / 1000)
+    if random.random() < MOCK_CONFIG['error_rate']:
+        with _lock:
+            _stats['errors'] += 1
+        return jsonify({'error': {'message': 'Injected mock error'}}), MOCK_CONFIG['error_status']
+    return None
+
+
+def detect_language(text):
+    """Find which language the prompt asks the model to answer in"""
+    for lang in ('en', 'zh-CN'):
+        if TRANSLATIONS[lang]['response_language'] in text:
+            return lang
+    return 'zh-TW'
+
+
+def pick_diagnosis(text):
+    for keywords, diagnosis, specialties, severity, emergency, terms in CANNED_DIAGNOSES:
+        if any(keyword in text for keyword in keywords):
+            return diagnosis, specialties, severity, emergency, terms
+    return DEFAULT_DIAGNOSIS
+
+
+def build_reply(system_prompt, prompt, wants_json):
+    """Build a canned reply for the kind of prompt the app sent"""
+    full_text = f"{system_prompt}\n{prompt}"
+
+    if '逐項翻譯' in prompt:
+        terms = re.findall(r'^\s*(\d+)\.\s*(.+?)\s*$', prompt, re.MULTILINE)
+        return '\n'.join(f"{number}. {MOCK_TRANSLATIONS.get(term, 'general symptom')}" for number, term in terms)
+
+    if '醫療症狀驗證' in full_text:
+        valid = not any(word in prompt.lower() for word in INVALID_SYMPTOMS)
+        return json.dumps({'valid': valid, 'confidence': 0.9, 'issues': [] if valid else ['輸入內容不是醫療症狀'],
+                           'suggestions': []}, ensure_ascii=False)
+
+    if prompt.strip().lower() in ('hello', 'hi', 'ping'):
+        return 'Hello! The mock AI service is running.'  # /health and connection tests
+
+    lang = detect_language(full_text)
+    t = lambda key: get_translation(key, lang)
+    diagnosis, specialties, severity, emergency, terms = pick_diagnosis(prompt)
+    advice = '多休息、補充水分，如症狀持續或惡化請盡快求醫。'
+
+    if wants_json or '"diagnosis"' in system_prompt:
+        reply = {'diagnosis': diagnosis, 'specialties': specialties, 'severity': severity,
+                 'emergency': emergency, 'advice': advice}
+        if '"valid"' in system_prompt:
+            invalid = any(word in prompt.lower() for word in INVALID_SYMPTOMS)
+            reply.update({'valid': not invalid, 'validation_issues': ['輸入內容不是醫療症狀'] if invalid else [],
+                          'search_terms': [] if invalid else terms})
+        return json.dumps(reply, ensure_ascii=False)
+
+    return '\n'.join([
+        f"{t('diagnosis_format')}{diagnosis}",
+        f"{t('specialty_format')}{'、'.join(specialties)}",
+        f"{t('severity_format')}{t('severity_' + severity)}",
+        f"{t('emergency_format')}{t('emergency_yes') if emergency else t('emergency_no')}",
+        f"{t('advice_format')}{advice}",
+        t('disclaimer')
+    ])
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 2)
+
+
+def usage_for(system_prompt, prompt, reply):
+    """Simulate provider usage, counting a repeated system prefix as cached"""
+    prefix_key = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest() if system_prompt else None
+    with _lock:
+        cached = prefix_key in _seen_prefixes
+        if prefix_key:
+            _seen_prefixes.add(prefix_key)
+    prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(prompt)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': estimate_tokens(reply),
+        'total_tokens': prompt_tokens + estimate_tokens(reply),
+        'prompt_tokens_details': {'cached_tokens': estimate_tokens(system_prompt) if cached else 0}
+    }
+
+
+def message_text(content):
+    """Chat content may be a string or a list of parts (cache_control breakpoints)"""
+    if isinstance(content, list):
+        return ''.join(part.get('text', '') for part in content if isinstance(part, dict))
+    return content or ''
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+@app.route('/api/v1/chat/completions', methods=['POST'])
+@app.route('/api/v3/chat/completions', methods=['POST'])
+def chat_completions():
+    """OpenAI / OpenRouter / Volcano Engine compatible chat completions"""
+    with _lock:
+        _stats['chat'] += 1
+    error = inject_latency_and_errors()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    messages = data.get('messages', [])
+    system_prompt = ''.join(message_text(m.get('content')) for m in messages if m.get('role') == 'system')
+    prompt = ''.join(message_text(m.get('content')) for m in messages if m.get('role') == 'user')
+    wants_json = bool(data.get('response_format'))
+
+    reply = build_reply(system_prompt, prompt, wants_json)
+    return jsonify({
+        'id': f"mock-{random.randint(0, 10**9)}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': data.get('model', 'mock-model'),
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+        'usage': usage_for(system_prompt, prompt, reply)
+    })
+
+
+@app.route('/v1/models')
+def list_models():
+    return jsonify({'data': [{'id': 'gpt-4o-mini'}, {'id': 'gpt-4'}]})
+
+
+@app.route('/api/generate', methods=['POST'])
+def ollama_generate():
+    """Ollama compatible generate endpoint"""
+    with _lock:
+        _stats['generate'] += 1
+    data = request.get_json(silent=True) or {}
+    if not data.get('prompt'):
+        # Empty prompt only loads the model (warm-up); answer immediately
+        return jsonify({'model': data.get('model', 'mock'), 'response': '', 'done': True})
+    error = inject_latency_and_errors()
+    if error:
+        return error
+
+    system_prompt = data.get('system', '') or ''
+    prompt = data.get('prompt', '')
+    reply = build_reply(system_prompt, prompt, bool(data.get('format')))
+    usage = usage_for(system_prompt, prompt, reply)
+    return jsonify({
+        'model': data.get('model', 'mock'),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'response': reply,
+        'done': True,
+        'prompt_eval_count': usage['prompt_tokens'],
+        'eval_count': usage['completion_tokens']
+    })
+
+
+@app.route('/api/tags')
+def ollama_tags():
+    return jsonify({'models': [{'name': 'llama3.1:8b'}]})
+
+
+@app.route('/entrez/eutils/esearch.fcgi')
+def esearch():
+    """NCBI esearch: deterministic PMIDs per search term"""
+    with _lock:
+        _stats['esearch'] += 1
+    error = inject_latency_and_errors(MOCK_CONFIG['pubmed_latency_ms'])
+    if error:
+        return error
+
+    query = request.args.get('term', '')
+    match = re.search(r'\(?([^\[\(]+)\[Title/Abstract\]', query)
+    term = match.group(1).strip() if match else query.strip() or 'symptom'
+    retmax = int(request.args.get('retmax', 3))
+    seed = int(hashlib.md5(term.lower().encode('utf-8')).hexdigest()[:6], 16)
+    pmids = [str(30000000 + seed + i) for i in range(retmax)]
+    with _lock:
+        for pmid in pmids:
+            _pmid_terms[pmid] = term
+
+    ids = ''.join(f"<Id>{pmid}</Id>" for pmid in pmids)
+    xml = (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<eSearchResult><Count>{retmax}</Count>"
+           f"<RetMax>{retmax}</RetMax><RetStart>0</RetStart><IdList>{ids}</IdList></eSearchResult>")
+    return Response(xml, mimetype='text/xml')
+
+
+@app.route('/entrez/eutils/efetch.fcgi')
+def efetch():
+    """NCBI efetch: PubmedArticleSet XML with clinically worded abstracts"""
+    with _lock:
+        _stats['efetch'] += 1
+    error = inject_latency_and_errors(MOCK_CONFIG['pubmed_latency_ms'])
+    if error:
+        return error
+
+    articles = []
+    for index, pmid in enumerate(request.args.get('id', '').split(',')):
+        if not pmid:
+            continue
+        with _lock:
+            term = _pmid_terms.get(pmid, 'symptom')
+        title = escape(f"Clinical diagnosis and management of {term} in primary care: a systematic review ({index + 1})")
+        abstract = escape(
+            f"Background. {term.capitalize()} is a common presenting symptom in primary care and emergency settings. "
+            f"Methods. We performed a systematic review and meta-analysis of randomized controlled trials on the "
+            f"diagnosis and treatment of patients presenting with {term}. "
+            f"Results. Evidence-based management and first-line therapy improved symptoms in most patients. "
+            f"Conclusions. Clinical guidelines support routine assessment of {term} with standard care pathways."
+        )
+        articles.append(
+            f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+            f"<Journal><Title>Mock Journal of Clinical Medicine</Title><JournalIssue><PubDate><Year>2024</Year>"
+            f"</PubDate></JournalIssue></Journal><ArticleTitle>{title}</ArticleTitle>"
+            f"<Abstract><AbstractText>{abstract}</AbstractText></Abstract></Article></MedlineCitation></PubmedArticle>"
+        )
+    xml = f"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<PubmedArticleSet>{''.join(articles)}</PubmedArticleSet>"
+    return Response(xml, mimetype='text/xml')
+
+
+@app.route('/mock/config', methods=['GET', 'POST'])
+def mock_config():
+    """Read or change latency / error injection at runtime"""
+    if request.method == 'POST':
+        updates = request.get_json(silent=True) or {}
+        for key, value in updates.items():
+            if key in MOCK_CONFIG:
+                MOCK_CONFIG[key] = type(MOCK_CONFIG[key])(value)
+    return jsonify(MOCK_CONFIG)
+
+
+@app.route('/mock/stats')
+def mock_stats():
+    with _lock:
+        return jsonify(dict(_stats))
+
+
+if __name__ == '__main__':
+    port = int(os.getenv('MOCK_AI_PORT', '8765'))
+    print(f"Mock LLM/PubMed server on http://localhost:{port} (config: {MOCK_CONFIG})")
+    app.run(host='127.0.0.1', port=port, threaded=True)
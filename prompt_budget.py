@@ -0,0 +1,130 @@
+"""
+Prompt Budgeting
+Estimates prompt size in tokens, compacts PubMed evidence down to its key sentences
+before it is pasted into the diagnosis prompt, and resolves a per-model cap on total
+prompt tokens. Without a tokenizer dependency the estimate is a heuristic: roughly one
+token per CJK character and one per four characters of other text, which is close
+enough to keep prompts inside a budget and to compare sizes before and after compaction.
+"""
+
+import math
+import re
+import threading
+
+CJK_CHARS = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+SENTENCE_END = re.compile(r'(?<=[.!?。！？])\s+|(?<=[。！？])')
+WORD = re.compile(r'[a-z][a-z\-]{2,}')
+# Sentences that state findings are worth more than background
+CONCLUSION_MARKERS = ('conclusion', 'we found', 'results', 'associated with', 'suggest', 'significant', 'diagnos')
+STOPWORDS = {'the', 'and', 'for', 'with', 'from', 'that', 'this', 'were', 'was', 'are', 'has', 'have',
+             'been', 'which', 'these', 'their', 'into', 'than', 'may', 'can', 'also', 'among', 'patients'}
+
+
+def estimate_tokens(text):
+    """Approximate token count: 1 per CJK character, 1 per 4 other characters"""
+    if not text:
+        return 0
+    cjk = len(CJK_CHARS.findall(text))
+    other = len(text) - cjk
+    return cjk + math.ceil(other / 4)
+
+
+def split_sentences(text):
+    """Split English or Chinese text into sentences"""
+    if not text:
+        return []
+    return [s.strip() for s in SENTENCE_END.split(re.sub(r'\s+', ' ', text)) if s and s.strip()]
+
+
+def key_sentences(text, keywords=(), max_sentences=2, max_chars=400):
+    """The sentences of text sharing the most words with keywords, kept in original order
+
+    Ties go to sentences that read like findings/conclusions, then to earlier sentences.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences and len(text or '') <= max_chars:
+        return (text or '').strip()
+    terms = {w for k in keywords for w in WORD.findall(str(k).lower())} - STOPWORDS
+
+    scored = []
+    for index, sentence in enumerate(sentences):
+        lowered = sentence.lower()
+        overlap = len(terms & set(WORD.findall(lowered)))
+        finding = any(marker in lowered for marker in CONCLUSION_MARKERS)
+        scored.append((overlap, finding, -index, index))
+    chosen = sorted(index for *_, index in sorted(scored, reverse=True)[:max_sentences])
+
+    compact = ' '.join(sentences[i] for i in chosen)
+    if len(compact) > max_chars:
+        compact = compact[:max_chars].rsplit(' ', 1)[0].rstrip(',;: ') + '…'
+    return compact
+
+
+def compact_evidence(evidence_results, keywords=(), max_articles=3, max_sentences=2, max_chars=400):
+    """Evidence reduced for the prompt: title, source and key sentences only (no URL or relevance blurb)"""
+    compacted = []
+    for evidence in (evidence_results or [])[:max_articles]:
+        title = evidence.get('title', '')
+        compacted.append({
+            'title': title,
+            'source': evidence.get('source', ''),
+            'excerpt': key_sentences(evidence.get('excerpt', ''), list(keywords) + [title], max_sentences, max_chars)
+        })
+    return compacted
+
+
+def parse_model_limits(spec):
+    """Parse "llama3.1=3000, gpt-3.5=3500" into {'llama3.1': 3000, 'gpt-3.5': 3500}"""
+    limits = {}
+    for item in (spec or '').split(','):
+        name, _, value = item.partition('=')
+        try:
+            if name.strip() and value.strip():
+                limits[name.strip().lower()] = int(value)
+        except ValueError:
+            continue
+    return limits
+
+
+def prompt_token_limit(model, model_limits, default_limit, context_window=0, output_reserve=0):
+    """Prompt token cap for a model: the longest matching prefix in model_limits, else
+    the context window minus the tokens kept for the answer, else default_limit"""
+    model = (model or '').lower()
+    matches = [name for name in model_limits if model.startswith(name)]
+    if matches:
+        return model_limits[max(matches, key=len)]
+    if context_window:
+        return max(0, context_window - output_reserve)
+    return default_limit
+
+
+class PromptBudgetStats:
+    """Prompt size counters: estimated tokens sent, tokens removed by compaction and prompts over budget"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'prompts': 0, 'prompt_tokens': 0, 'evidence_tokens_raw': 0, 'evidence_tokens_sent': 0,
+                       'articles_dropped': 0, 'over_budget': 0, 'max_prompt_tokens': 0}
+
+    def record(self, prompt_tokens, evidence_tokens_raw=0, evidence_tokens_sent=0, articles_dropped=0, over_budget=False):
+        with self._lock:
+            self._stats['prompts'] += 1
+            self._stats['prompt_tokens'] += prompt_tokens
+            self._stats['evidence_tokens_raw'] += evidence_tokens_raw
+            self._stats['evidence_tokens_sent'] += evidence_tokens_sent
+            self._stats['articles_dropped'] += articles_dropped
+            self._stats['over_budget'] += bool(over_budget)
+            self._stats['max_prompt_tokens'] = max(self._stats['max_prompt_tokens'], prompt_tokens)
+
+    def get_stats(self):
+        """Get totals plus average prompt size and the share of evidence tokens removed"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_prompt_tokens'] = round(stats['prompt_tokens'] / stats['prompts']) if stats['prompts'] else 0
+        raw = stats['evidence_tokens_raw']
+        stats['evidence_reduction'] = round(1 - stats['evidence_tokens_sent'] / raw, 3) if raw else 0.0
+        return stats
+
+
+# Global instance
+prompt_budget_stats = PromptBudgetStats()
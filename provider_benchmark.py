@@ -0,0 +1,161 @@
+"""
+AI Provider Benchmark
+Runs the same diagnosis prompts against several provider/model targets concurrently and
+reports latency percentiles, tokens/sec, error rate and how often the reply could be parsed.
+Each run is stored so providers and models can be compared over time.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from llm_usage import percentile
+
+
+class ProviderBenchmark:
+    """Concurrent benchmark runner with SQLite-backed result history"""
+
+    def __init__(self, call_fn, parse_fn, max_workers=8, db_path='admin_data.db', max_per_provider=2, slot_fn=None):
+        # call_fn(provider, model, case) -> (text, usage); raises on failure
+        # parse_fn(text) -> True if the reply could be parsed into a diagnosis
+        # slot_fn(provider) -> context manager held around each call, e.g. the provider's bulkhead
+        self.call_fn = call_fn
+        self.parse_fn = parse_fn
+        self.max_workers = max_workers
+        self.max_per_provider = max_per_provider
+        self.slot_fn = slot_fn
+        self._provider_slots = {}
+        self.db_path = db_path
+        self._run_lock = threading.Lock()
+        self._table_ready = False
+
+    def _ensure_table(self, conn):
+        if self._table_ready:
+            return
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ai_benchmark_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                metrics TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_benchmark_run ON ai_benchmark_results (run_id)')
+        self._table_ready = True
+
+    def _timed_call(self, target, case):
+        """One benchmark call: (target, latency_ms, text, usage, error)
+
+        At most max_per_provider calls per provider run at once, each inside slot_fn's
+        slot; time spent waiting for a slot is not counted as latency.
+        """
+        provider = target['provider']
+        try:
+            with self._provider_slots[provider], (self.slot_fn(provider) if self.slot_fn else nullcontext()):
+                started = time.perf_counter()
+                try:
+                    text, usage = self.call_fn(provider, target['model'], case)
+                    return target, (time.perf_counter() - started) * 1000, text, usage or {}, None
+                except Exception as e:
+                    return target, (time.perf_counter() - started) * 1000, None, {}, str(e)
+        except Exception as e:
+            # No slot (e.g. the provider's bulkhead is full of live traffic)
+            return target, 0.0, None, {}, str(e)
+
+    @staticmethod
+    def summarize(samples):
+        """Metrics for one target from [(latency_ms, text, usage, error, parsed)]"""
+        successes = [s for s in samples if s[3] is None]
+        latencies = [s[0] for s in successes]
+        completion_tokens = sum((s[2].get('completion_tokens') or 0) for s in successes)
+        busy_seconds = sum(latencies) / 1000
+        errors = [s[3] for s in samples if s[3] is not None]
+        return {
+            'runs': len(samples),
+            'errors': len(errors),
+            'error_rate': round(len(errors) / len(samples), 3) if samples else 0.0,
+            'p50_ms': round(percentile(latencies, 50)) if latencies else None,
+            'p95_ms': round(percentile(latencies, 95)) if latencies else None,
+            'avg_ms': round(sum(latencies) / len(latencies)) if latencies else None,
+            'completion_tokens': completion_tokens,
+            'tokens_per_second': round(completion_tokens / busy_seconds, 1) if busy_seconds and completion_tokens else None,
+            'parse_success_rate': round(sum(1 for s in successes if s[4]) / len(samples), 3) if samples else 0.0,
+            'sample_errors': sorted(set(errors))[:3]
+        }
+
+    def run(self, targets, cases, repeats=1):
+        """Benchmark every target on every case `repeats` times, all targets concurrently"""
+        if not targets or not cases:
+            raise ValueError('Benchmark needs at least one target and one case')
+        # 同一時間只允許一個基準測試，避免疊加負載
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError('A benchmark is already running')
+        try:
+            run_id = uuid.uuid4().hex[:12]
+            started = time.time()
+            jobs = [(target, case) for _ in range(repeats) for case in cases for target in targets]
+            self._provider_slots = {target['provider']: threading.BoundedSemaphore(max(1, self.max_per_provider))
+                                    for target in targets}
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)), thread_name_prefix='ai-benchmark') as pool:
+                outcomes = list(pool.map(lambda job: self._timed_call(*job), jobs))
+
+            samples = {}
+            for target, latency_ms, text, usage, error in outcomes:
+                parsed = error is None and bool(self.parse_fn(text))
+                samples.setdefault((target['provider'], target['model']), []).append((latency_ms, text, usage, error, parsed))
+
+            results = [dict(provider=provider, model=model, **self.summarize(target_samples))
+                       for (provider, model), target_samples in samples.items()]
+            report = {
+                'run_id': run_id,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+                'duration_ms': int((time.time() - started) * 1000),
+                'cases': len(cases),
+                'repeats': repeats,
+                'results': results
+            }
+            self._save(run_id, results)
+            return report
+        finally:
+            self._run_lock.release()
+
+    def _save(self, run_id, results):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            self._ensure_table(conn)
+            conn.executemany('''
+                INSERT INTO ai_benchmark_results (run_id, provider, model, metrics) VALUES (?, ?, ?, ?)
+            ''', [(run_id, r['provider'], r['model'], json.dumps(r, ensure_ascii=False)) for r in results])
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error saving benchmark results: {e}")
+
+    def history(self, limit=20):
+        """Most recent runs, newest first: [{run_id, created_at, results}]"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            self._ensure_table(conn)
+            rows = conn.execute('''
+                SELECT run_id, created_at, metrics FROM ai_benchmark_results
+                WHERE run_id IN (
+                    SELECT run_id FROM ai_benchmark_results GROUP BY run_id ORDER BY MAX(id) DESC LIMIT ?
+                )
+                ORDER BY id DESC
+            ''', (limit,)).fetchall()
+            conn.close()
+        except Exception as e:
+            print(f"Error loading benchmark history: {e}")
+            return []
+
+        runs = {}
+        for run_id, created_at, metrics in rows:
+            run = runs.setdefault(run_id, {'run_id': run_id, 'created_at': created_at, 'results': []})
+            run['results'].append(json.loads(metrics))
+        return list(runs.values())
@@ -0,0 +1,200 @@
+"""
+PubMed Cache
+Persistent SQLite cache for PubMed E-utilities. Common symptoms (headache, fever,
+cough) are searched over and over with identical queries, so esearch results are
+stored as PMID lists keyed by (normalized query, retmax, config hash) with a short
+TTL, and parsed articles are stored by PMID with a long TTL together with the excerpt
+and relevance score computed for the term they were fetched for. Expired searches can
+still be served while a background refresh runs (stale-while-revalidate).
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+def normalize_query(query):
+    """Normalize a search term so spacing and case variants share one cache entry"""
+    return re.sub(r'\s+', ' ', str(query or '')).strip().lower()
+
+
+def config_hash(*parts):
+    """Short hash of the settings that change what a search returns (db, sort, endpoint...)"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+class PubMedCache:
+    """SQLite-backed search (query -> PMIDs) and article (PMID -> parsed article) cache"""
+
+    def __init__(self, db_path='pubmed_cache.db', search_ttl_seconds=86400, article_ttl_seconds=30 * 86400,
+                 stale_seconds=7 * 86400):
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._revalidating = set()
+        self._stats = {'search_hits': 0, 'search_stale_hits': 0, 'search_misses': 0,
+                       'article_hits': 0, 'article_misses': 0, 'revalidations': 0, 'errors': 0}
+        self.configure(db_path, search_ttl_seconds, article_ttl_seconds, stale_seconds)
+
+    def configure(self, db_path=None, search_ttl_seconds=None, article_ttl_seconds=None, stale_seconds=None):
+        """Change the database file or TTLs; stale_seconds is how long past its TTL a search may still be served"""
+        with self._lock:
+            if db_path is not None:
+                self.db_path = db_path
+                self._initialized = False
+            if search_ttl_seconds is not None:
+                self.search_ttl_seconds = search_ttl_seconds
+            if article_ttl_seconds is not None:
+                self.article_ttl_seconds = article_ttl_seconds
+            if stale_seconds is not None:
+                self.stale_seconds = stale_seconds
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        if not self._initialized:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pubmed_search_cache (
+                    query TEXT NOT NULL,
+                    retmax INTEGER NOT NULL,
+                    config_hash TEXT NOT NULL,
+                    pmids TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (query, retmax, config_hash)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pubmed_article_cache (
+                    pmid TEXT PRIMARY KEY,
+                    article TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def get_search(self, query, retmax, config_hash, allow_stale=False):
+        """Cached PMID list as (pmids, stale), or None when missing or too old
+
+        An entry past its TTL is returned with stale=True only if allow_stale and it
+        is no more than stale_seconds past the TTL.
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute('SELECT pmids, fetched_at FROM pubmed_search_cache WHERE query = ? AND retmax = ? AND config_hash = ?',
+                               (normalize_query(query), int(retmax), config_hash)).fetchone()
+            conn.close()
+        except Exception as e:
+            print(f"Error reading PubMed search cache: {e}")
+            self._count('errors')
+            return None
+        if row is None:
+            self._count('search_misses')
+            return None
+        age = time.time() - row[1]
+        if age <= self.search_ttl_seconds:
+            self._count('search_hits')
+            return json.loads(row[0]), False
+        if allow_stale and age <= self.search_ttl_seconds + self.stale_seconds:
+            self._count('search_stale_hits')
+            return json.loads(row[0]), True
+        self._count('search_misses')
+        return None
+
+    def put_search(self, query, retmax, config_hash, pmids):
+        """Store a search result; an empty list is cached too so misses are not re-queried"""
+        try:
+            conn = self._connect()
+            conn.execute('INSERT OR REPLACE INTO pubmed_search_cache (query, retmax, config_hash, pmids, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                         (normalize_query(query), int(retmax), config_hash, json.dumps(list(pmids)), time.time()))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error writing PubMed search cache: {e}")
+            self._count('errors')
+
+    def get_articles(self, pmids):
+        """Cached, unexpired articles for the given PMIDs as {pmid: article}"""
+        pmids = [str(pmid) for pmid in pmids]
+        if not pmids:
+            return {}
+        try:
+            conn = self._connect()
+            rows = conn.execute(f"SELECT pmid, article, fetched_at FROM pubmed_article_cache WHERE pmid IN ({','.join('?' * len(pmids))})",
+                                pmids).fetchall()
+            conn.close()
+        except Exception as e:
+            print(f"Error reading PubMed article cache: {e}")
+            self._count('errors')
+            return {}
+        cutoff = time.time() - self.article_ttl_seconds
+        found = {pmid: json.loads(article) for pmid, article, fetched_at in rows if fetched_at >= cutoff}
+        self._count('article_hits', len(found))
+        self._count('article_misses', len(pmids) - len(found))
+        return found
+
+    def put_articles(self, articles):
+        """Store parsed articles (dicts with a 'pmid' key)"""
+        now = time.time()
+        rows = [(str(article['pmid']), json.dumps(article, ensure_ascii=False), now)
+                for article in articles if article.get('pmid')]
+        if not rows:
+            return
+        try:
+            conn = self._connect()
+            conn.executemany('INSERT OR REPLACE INTO pubmed_article_cache (pmid, article, fetched_at) VALUES (?, ?, ?)', rows)
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error writing PubMed article cache: {e}")
+            self._count('errors')
+
+    def begin_revalidation(self, key):
+        """Claim the background refresh of a stale entry; False if one is already running"""
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            self._stats['revalidations'] += 1
+            return True
+
+    def end_revalidation(self, key):
+        with self._lock:
+            self._revalidating.discard(key)
+
+    def purge_expired(self):
+        """Delete entries too old to be served even as stale; returns the number of rows removed"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            removed = conn.execute('DELETE FROM pubmed_search_cache WHERE fetched_at < ?',
+                                   (now - self.search_ttl_seconds - self.stale_seconds,)).rowcount
+            removed += conn.execute('DELETE FROM pubmed_article_cache WHERE fetched_at < ?',
+                                    (now - self.article_ttl_seconds,)).rowcount
+            conn.commit()
+            conn.close()
+            return removed
+        except Exception as e:
+            print(f"Error purging PubMed cache: {e}")
+            self._count('errors')
+            return 0
+
+    def get_stats(self):
+        """Get hit/miss counts for searches and articles plus the search hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['revalidating'] = len(self._revalidating)
+        lookups = stats['search_hits'] + stats['search_stale_hits'] + stats['search_misses']
+        stats['search_hit_rate'] = round((stats['search_hits'] + stats['search_stale_hits']) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+# Global instance
+pubmed_cache = PubMedCache()
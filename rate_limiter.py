@@ -0,0 +1,69 @@
+"""
+Rate Limiter
+Token bucket shared by every thread calling an external API with a published request
+rate limit, e.g. NCBI E-utilities (3 requests/second without an API key, 10 with one).
+Callers wait for a token up to a timeout instead of sending requests that would be
+rejected with HTTP 429.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate_per_second` sustained, up to `burst` at once"""
+
+    def __init__(self, rate_per_second=3.0, burst=None):
+        self._lock = threading.Lock()
+        self._stats = {'acquired': 0, 'waited': 0, 'rejected': 0, 'total_wait_ms': 0.0}
+        self.configure(rate_per_second, burst)
+
+    def configure(self, rate_per_second=None, burst=None):
+        """Change the rate and burst size; the bucket starts full"""
+        with self._lock:
+            if rate_per_second is not None:
+                self.rate_per_second = float(rate_per_second)
+            self.burst = max(1, int(burst if burst is not None else max(1, round(self.rate_per_second))))
+            self._tokens = float(self.burst)
+            self._updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting up to timeout seconds (None = wait as long as needed); False if none came"""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._stats['acquired'] += 1
+                    if waited:
+                        self._stats['waited'] += 1
+                        self._stats['total_wait_ms'] += (now - started) * 1000
+                    return True
+                wait_seconds = (1 - self._tokens) / self.rate_per_second if self.rate_per_second > 0 else 0.1
+                if deadline is not None and now + wait_seconds > deadline:
+                    self._stats['rejected'] += 1
+                    return False
+            waited = True
+            time.sleep(wait_seconds)
+
+    def get_stats(self):
+        """Get acquired/waited/rejected counts and the average wait for a token"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['rate_per_second'] = self.rate_per_second
+            stats['burst'] = self.burst
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['waited'], 1) if stats['waited'] else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 1)
+        return stats
+
+
+# Global instance - NCBI E-utilities without an API key
+pubmed_rate_limiter = RateLimiter(rate_per_second=3)
@@ -0,0 +1,129 @@
+"""
+Request Deadlines
+Per-request end-to-end deadline with per-stage time budgets. The deadline is bound to
+the thread handling the request, so downstream calls (LLM, PubMed) derive their
+timeouts from the time left instead of using fixed per-call timeouts, and optional
+stages such as evidence retrieval can be skipped when the budget is running out.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Deadline:
+    """End-to-end time budget for one request, split into named stages"""
+
+    def __init__(self, total_seconds, stage_budgets=None, min_timeout_seconds=1.0):
+        self.total_seconds = total_seconds
+        self.stage_budgets = dict(stage_budgets or {})
+        self.min_timeout_seconds = min_timeout_seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + total_seconds
+        self._stack = []
+        self._stages = {}
+        self._skipped = []
+
+    def remaining(self):
+        """Seconds left before the request deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """True once the request deadline has passed"""
+        return self.remaining() <= 0
+
+    def _stage_remaining(self):
+        """Seconds left in the innermost active stage, after its reserve for later stages"""
+        remaining = self.remaining()
+        if self._stack:
+            name, started_at, reserve_seconds = self._stack[-1]
+            remaining -= reserve_seconds
+            budget = self.stage_budgets.get(name)
+            if budget is not None:
+                remaining = min(remaining, budget - (time.monotonic() - started_at))
+        return max(0.0, remaining)
+
+    @contextmanager
+    def stage(self, name, reserve_seconds=0):
+        """Run a block as a named stage; reserve_seconds is kept back for later stages"""
+        started_at = time.monotonic()
+        self._stack.append((name, started_at, reserve_seconds))
+        try:
+            yield self
+        finally:
+            self._stack.pop()
+            self.add_stage_time(name, time.monotonic() - started_at)
+
+    def add_stage_time(self, name, seconds):
+        """Account time spent in a stage that was not run inside stage()"""
+        self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def timeout(self, default):
+        """Timeout for a downstream call: the smaller of default and the stage/request time left"""
+        return max(self.min_timeout_seconds, min(default, self._stage_remaining()))
+
+    def exhausted(self):
+        """True when the current stage has less than min_timeout_seconds left"""
+        return self._stage_remaining() < self.min_timeout_seconds
+
+    def has_time_for(self, min_seconds=None, reserve_seconds=0):
+        """True if an optional stage needing min_seconds can start and still leave the reserve"""
+        if min_seconds is None:
+            min_seconds = self.min_timeout_seconds
+        return self.remaining() - reserve_seconds >= min_seconds
+
+    def skip(self, name):
+        """Record an optional stage skipped for lack of time"""
+        self._skipped.append(name)
+
+    def get_report(self):
+        """Get elapsed time per stage, skipped stages and the time left (milliseconds)"""
+        return {
+            'budget_ms': int(self.total_seconds * 1000),
+            'elapsed_ms': int((time.monotonic() - self.started_at) * 1000),
+            'remaining_ms': int(self.remaining() * 1000),
+            'stages': {name: int(elapsed * 1000) for name, elapsed in self._stages.items()},
+            'skipped': list(self._skipped)
+        }
+
+
+_local = threading.local()
+
+
+def current_deadline():
+    """Get the deadline bound to this thread, or None"""
+    return getattr(_local, 'deadline', None)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Bind a deadline to the current thread for the duration of the block (None disables)"""
+    previous = current_deadline()
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+
+@contextmanager
+def deadline_stage(name, reserve_seconds=0):
+    """Run a block as a stage of the current deadline; no-op without one"""
+    deadline = current_deadline()
+    if deadline is None:
+        yield None
+        return
+    with deadline.stage(name, reserve_seconds):
+        yield deadline
+
+
+def request_timeout(default):
+    """Timeout for a downstream call under the current deadline (default without one)"""
+    deadline = current_deadline()
+    return deadline.timeout(default) if deadline is not None else default
+
+
+def deadline_exhausted():
+    """True if the current stage has run out of time"""
+    deadline = current_deadline()
+    return deadline is not None and deadline.exhausted()
@@ -0,0 +1,96 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same work (same request fingerprint) share one
+in-flight call instead of each hitting the LLM provider or PubMed separately.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+
+from request_deadline import request_timeout
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised to a waiter when the shared call does not finish within its wait limit"""
+
+
+def make_fingerprint(*parts):
+    """Build a stable fingerprint from JSON-serializable request parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _InFlightCall:
+    """A call that is currently running, plus its eventual outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into a single execution"""
+
+    def __init__(self, max_wait_seconds=120):
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {'executed': 0, 'coalesced': 0, 'wait_timeouts': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn once per key at a time; concurrent duplicates wait and share the result
+
+        Duplicates wait at most max_wait_seconds, cut to the time left in the caller's
+        request deadline, and then raise SingleFlightTimeout.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                is_leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._stats['executed'] += 1
+                is_leader = True
+
+        if not is_leader:
+            if not call.done.wait(request_timeout(self.max_wait_seconds)):
+                with self._lock:
+                    self._stats['wait_timeouts'] += 1
+                raise SingleFlightTimeout(f"Shared call {key[:12]} still running")
+            if call.error is not None:
+                raise call.error
+            # Followers get their own copy so one request cannot mutate another's data
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn(*args, **kwargs)
+            # Keep a pristine copy for followers; the leader may mutate its own result
+            call.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def get_stats(self):
+        """Get executed/coalesced counts and the number of calls in flight"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        total = stats['executed'] + stats['coalesced']
+        stats['coalesce_rate'] = round(stats['coalesced'] / total, 3) if total else 0.0
+        return stats
+
+
+# Global instance
+single_flight = SingleFlight()
@@ -0,0 +1,112 @@
+"""
+Local Specialty Heuristic
+Keyword rules that map free-text symptoms to a provisional specialty in microseconds,
+so doctors can be matched before the LLM diagnosis is available. Also tracks how often
+the LLM diagnosis ends up recommending a different specialty.
+"""
+
+import threading
+
+DEFAULT_SPECIALTY = '內科'
+
+# 專科關鍵詞 - specialty names match the Chinese names used by get_available_specialties()
+SPECIALTY_KEYWORDS = {
+    '心臟科': ['心悸', '心跳', '心律', '胸悶', '心絞痛', '高血壓', '血壓高', 'palpitation', 'arrhythmia',
+             'chest tightness', 'hypertension'],
+    '呼吸科': ['咳嗽', '咳痰', '氣喘', '哮喘', '呼吸', '氣促', '喘', '肺', '咳血', 'cough', 'asthma',
+             'wheez', 'shortness of breath', 'dyspnea', 'sputum'],
+    '腸胃肝臟科': ['胃痛', '胃脹', '腹痛', '肚痛', '腹瀉', '肚瀉', '便秘', '噁心', '嘔吐', '反胃', '胃酸',
+               '消化不良', '黑便', '血便', '黃疸', '肝', 'stomach', 'abdominal', 'diarrh', 'constipation',
+               'nausea', 'vomit', 'heartburn', 'reflux', 'indigestion', 'jaundice'],
+    '神經科': ['頭痛', '偏頭痛', '頭暈', '暈眩', '眩暈', '麻痺', '麻木', '抽搐', '癲癇', '手震', '記憶',
+            'headache', 'migraine', 'dizz', 'vertigo', 'numb', 'seizure', 'tremor'],
+    '耳鼻喉科': ['喉嚨痛', '喉痛', '咽喉', '聲沙', '鼻塞', '流鼻水', '鼻水', '鼻敏感', '耳鳴', '耳痛',
+              '耳朵', '扁桃', 'sore throat', 'hoarse', 'nasal', 'runny nose', 'sinus', 'tinnitus', 'ear pain', 'earache'],
+    '眼科': ['眼痛', '眼紅', '眼睛', '視力', '視物模糊', '眼乾', '眼癢', 'eye', 'vision', 'blurred'],
+    '皮膚科': ['皮疹', '紅疹', '濕疹', '痕癢', '皮膚', '暗瘡', '痤瘡', '脫髮', '蕁麻疹', '出疹',
+            'rash', 'eczema', 'itch', 'skin', 'acne', 'hair loss', 'hives'],
+    '骨科': ['關節', '腰痛', '背痛', '頸痛', '膝痛', '膝蓋', '肩痛', '骨折', '扭傷', '抽筋', '肌肉痛',
+           'joint', 'back pain', 'neck pain', 'knee', 'shoulder', 'fracture', 'sprain'],
+    '泌尿科': ['尿頻', '尿急', '尿痛', '小便', '排尿', '血尿', '腎結石', 'urine', 'urinat', 'bladder', 'kidney stone'],
+    '婦產科': ['月經', '經痛', '痛經', '經期', '白帶', '懷孕', '妊娠', '陰道', '停經', 'menstrua', 'period',
+            'pregnan', 'vaginal', 'menopause'],
+    '精神科': ['失眠', '焦慮', '抑鬱', '憂鬱', '情緒', '恐慌', '幻覺', '自殺', 'insomnia', 'anxiety',
+            'depress', 'panic', 'suicid'],
+    '內分泌科': ['口渴', '多尿', '糖尿', '血糖', '甲狀腺', '體重下降', '體重增加', 'thirst', 'diabet',
+              'blood sugar', 'thyroid', 'weight loss'],
+}
+
+
+class SpecialtyHeuristic:
+    """Keyword-scoring specialty predictor"""
+
+    def __init__(self, keywords=None, default_specialty=DEFAULT_SPECIALTY):
+        self.keywords = keywords or SPECIALTY_KEYWORDS
+        self.default_specialty = default_specialty
+
+    def predict(self, symptoms, max_specialties=3):
+        """Predict specialties for the symptom text; longer keyword matches weigh more"""
+        text = (symptoms or '').lower()
+        scores = {}
+        matched = {}
+        for specialty, keywords in self.keywords.items():
+            for keyword in keywords:
+                if keyword.lower() in text:
+                    scores[specialty] = scores.get(specialty, 0) + len(keyword)
+                    matched.setdefault(specialty, []).append(keyword)
+
+        if not scores:
+            return {
+                'specialty': self.default_specialty,
+                'specialties': [self.default_specialty],
+                'confidence': 0.0,
+                'matched': {}
+            }
+
+        ranked = sorted(scores, key=lambda specialty: scores[specialty], reverse=True)
+        total = sum(scores.values())
+        return {
+            'specialty': ranked[0],
+            'specialties': ranked[:max_specialties],
+            'confidence': round(scores[ranked[0]] / total, 2),
+            'matched': {specialty: matched[specialty] for specialty in ranked[:max_specialties]}
+        }
+
+
+class ProgressiveMatchStats:
+    """Counts how often the LLM diagnosis changes the provisional specialty"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'provisional': 0, 'completed': 0, 'specialty_changed': 0}
+        self._changes = {}
+
+    def record_provisional(self):
+        """Count a phase-1 (provisional) response"""
+        with self._lock:
+            self._stats['provisional'] += 1
+
+    def record_final(self, provisional_specialty, final_specialty):
+        """Record the phase-2 specialty; returns True if it differs from the provisional one"""
+        changed = bool(final_specialty) and final_specialty != provisional_specialty
+        with self._lock:
+            self._stats['completed'] += 1
+            if changed:
+                self._stats['specialty_changed'] += 1
+                key = f"{provisional_specialty} -> {final_specialty}"
+                self._changes[key] = self._changes.get(key, 0) + 1
+        return changed
+
+    def get_stats(self):
+        """Get counters, the change rate and the most common provisional -> final changes"""
+        with self._lock:
+            stats = dict(self._stats)
+            top_changes = sorted(self._changes.items(), key=lambda item: item[1], reverse=True)[:10]
+        stats['change_rate'] = round(stats['specialty_changed'] / stats['completed'], 3) if stats['completed'] else 0.0
+        stats['top_changes'] = dict(top_changes)
+        return stats
+
+
+# Global instances
+specialty_heuristic = SpecialtyHeuristic()
+progressive_match_stats = ProgressiveMatchStats()
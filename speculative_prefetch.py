@@ -0,0 +1,150 @@
+"""
+Speculative Prefetch
+Bounded background queue for work started before it is known to be needed, e.g. the
+translation and PubMed stages for symptoms the user has typed but not yet submitted.
+Results are kept by key for a short time; a request that needs them either finds them
+ready, waits briefly for the in-flight prefetch, or does the work itself. Under load new
+speculative work is dropped instead of queued.
+"""
+
+import queue
+import threading
+
+from symptom_canonicalizer import CanonicalResultCache
+
+
+class SpeculativePrefetcher:
+    """Drop-when-full prefetch queue with a small worker pool and a TTL result cache"""
+
+    QUEUED = 'queued'
+    DUPLICATE = 'duplicate'
+    CACHED = 'cached'
+    DROPPED = 'dropped'
+
+    def __init__(self, workers=2, max_pending=32, ttl_seconds=600, capacity=500, overloaded_fn=None):
+        # overloaded_fn() -> True when the system is busy enough that new speculative work should be dropped
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self.overloaded_fn = overloaded_fn
+        self._lock = threading.Lock()
+        self._queue = None
+        self._threads = []
+        self._results = None
+        self._inflight = {}
+        self._stats = {'submitted': 0, 'duplicates': 0, 'already_cached': 0, 'dropped': 0,
+                       'completed': 0, 'failed': 0, 'hits': 0, 'waited_hits': 0, 'misses': 0}
+
+    def configure(self, workers=None, max_pending=None, ttl_seconds=None, capacity=None, overloaded_fn=None):
+        """Update pool settings; takes effect before the workers are started"""
+        with self._lock:
+            if workers is not None:
+                self.workers = workers
+            if max_pending is not None:
+                self.max_pending = max_pending
+            if ttl_seconds is not None:
+                self.ttl_seconds = ttl_seconds
+            if capacity is not None:
+                self.capacity = capacity
+            if overloaded_fn is not None:
+                self.overloaded_fn = overloaded_fn
+
+    def _ensure_started(self):
+        """Start worker threads on first use (lock held)"""
+        if self._queue is not None:
+            return
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._results = CanonicalResultCache(self.ttl_seconds, self.capacity)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'prefetch-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _overloaded(self):
+        try:
+            return bool(self.overloaded_fn and self.overloaded_fn())
+        except Exception as e:
+            print(f"Error checking prefetch load: {e}")
+            return False
+
+    def submit(self, key, fn, *args):
+        """Queue fn(*args) under key unless it is cached, already in flight, or the system is busy"""
+        overloaded = self._overloaded()
+        with self._lock:
+            self._ensure_started()
+            if key in self._inflight:
+                self._stats['duplicates'] += 1
+                return self.DUPLICATE
+            if self._results.peek(key) is not None:
+                self._stats['already_cached'] += 1
+                return self.CACHED
+            if overloaded:
+                self._stats['dropped'] += 1
+                return self.DROPPED
+            try:
+                self._queue.put_nowait((key, fn, args))
+            except queue.Full:
+                self._stats['dropped'] += 1
+                return self.DROPPED
+            self._inflight[key] = threading.Event()
+            self._stats['submitted'] += 1
+            return self.QUEUED
+
+    def get(self, key, wait_seconds=0):
+        """Prefetched result, waiting up to wait_seconds for an in-flight prefetch; None if unavailable"""
+        with self._lock:
+            if self._results is None:
+                self._stats['misses'] += 1
+                return None
+            value = self._results.peek(key)
+            event = self._inflight.get(key)
+            if value is not None:
+                self._stats['hits'] += 1
+                return value
+
+        if event is not None and wait_seconds > 0 and event.wait(wait_seconds):
+            value = self._results.peek(key)
+            if value is not None:
+                with self._lock:
+                    self._stats['waited_hits'] += 1
+                return value
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def _worker(self):
+        while True:
+            key, fn, args = self._queue.get()
+            try:
+                result = fn(*args)
+                if result is not None:
+                    self._results.put(key, result)
+                with self._lock:
+                    self._stats['completed'] += 1
+            except Exception as e:
+                print(f"Speculative prefetch failed: {e}")
+                with self._lock:
+                    self._stats['failed'] += 1
+            finally:
+                with self._lock:
+                    event = self._inflight.pop(key, None)
+                if event is not None:
+                    event.set()
+                self._queue.task_done()
+
+    def get_stats(self):
+        """Get queue depth, drop/hit counters and the share of lookups served by a prefetch"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._queue.qsize() if self._queue is not None else 0
+            stats['in_flight'] = len(self._inflight)
+            stats['max_pending'] = self.max_pending
+            stats['cached'] = self._results.get_stats()['size'] if self._results is not None else 0
+        lookups = stats['hits'] + stats['waited_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['waited_hits']) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+# Global instance
+symptom_prefetcher = SpeculativePrefetcher()
@@ -57,6 +57,9 @@ class HealthCheckManager {
             }
         });
 
+        this.updateCircuitBreakerDisplay();
+        this.updateCanonicalizationDisplay();
+
         // Update last check timestamp
         const lastUpdateElement = document.getElementById('health-last-update');
         if (lastUpdateElement) {
@@ -65,6 +68,58 @@ class HealthCheckManager {
         }
     }
 
+    updateCircuitBreakerDisplay() {
+        const container = document.getElementById('circuit-breaker-status');
+        const breakers = this.healthData.circuit_breakers;
+        if (!container || !breakers) return;
+
+        const names = Object.keys(breakers);
+        if (names.length === 0) {
+            container.innerHTML = '<small class="text-muted">尚無外部服務呼叫記錄</small>';
+            return;
+        }
+
+        const badgeClass = {
+            closed: 'bg-success',
+            half_open: 'bg-warning',
+            open: 'bg-danger'
+        };
+
+        container.innerHTML = names.map(name => {
+            const breaker = breakers[name];
+            const failureRate = Math.round(breaker.failure_rate * 100);
+            const retry = breaker.retry_in_seconds !== null ? ` · ${breaker.retry_in_seconds}s` : '';
+            return `
+                <div class="d-flex justify-content-between align-items-center mb-1">
+                    <small>${name}</small>
+                    <span>
+                        <small class="text-muted me-2">${failureRate}% 失敗${retry}</small>
+                        <span class="badge ${badgeClass[breaker.state] || 'bg-secondary'}">${breaker.state}</span>
+                    </span>
+                </div>
+            `;
+        }).join('');
+    }
+
+    updateCanonicalizationDisplay() {
+        const container = document.getElementById('symptom-canonicalization-status');
+        const stats = this.healthData.symptom_canonicalization;
+        if (!container || !stats) return;
+
+        const cache = stats.diagnosis_cache || {};
+        const hitRate = Math.round((cache.hit_rate || 0) * 100);
+        container.innerHTML = `
+            <div class="d-flex justify-content-between align-items-center mb-1">
+                <small>合併比率 (原始輸入 / 標準化鍵)</small>
+                <small class="fw-bold">${stats.collapse_ratio.toFixed(2)}× <span class="text-muted fw-normal">(${stats.distinct_raw} / ${stats.distinct_canonical})</span></small>
+            </div>
+            <div class="d-flex justify-content-between align-items-center">
+                <small>診斷快取命中率</small>
+                <small class="fw-bold">${hitRate}% <span class="text-muted fw-normal">(${cache.hits || 0} / ${(cache.hits || 0) + (cache.misses || 0)})</span></small>
+            </div>
+        `;
+    }
+
     updateHealthCard(card, status) {
         const statusBadge = card.querySelector('.health-status-badge');
         const errorMessage = card.querySelector('.health-error-message');
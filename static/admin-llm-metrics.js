@@ -0,0 +1,109 @@
+// Admin LLM call latency charts
+class LLMMetricsCharts {
+    constructor() {
+        this.latencyChart = null;
+        this.trendChart = null;
+        this.init();
+    }
+
+    init() {
+        if (!document.getElementById('llmLatencyChart')) return;
+        this.loadMetrics();
+        // Refresh every minute
+        setInterval(() => this.loadMetrics(), 60000);
+    }
+
+    async loadMetrics() {
+        try {
+            const response = await fetch('/admin/api/llm-metrics?hours=24');
+            if (response.ok) {
+                const metrics = await response.json();
+                this.renderLatencyChart(metrics.percentiles || {});
+                this.renderTrendChart(metrics.rollup || []);
+                this.renderSummary(metrics.percentiles || {});
+            } else {
+                console.error('Failed to load LLM metrics:', response.statusText);
+            }
+        } catch (error) {
+            console.error('Error loading LLM metrics:', error);
+        }
+    }
+
+    renderSummary(percentiles) {
+        const summary = document.getElementById('llm-metrics-summary');
+        if (!summary) return;
+        const groups = Object.values(percentiles);
+        const calls = groups.reduce((total, group) => total + group.calls, 0);
+        const errors = groups.reduce((total, group) => total + group.errors, 0);
+        summary.textContent = calls ? `最近 ${calls} 次調用 · ${errors} 次失敗` : '尚無AI調用記錄';
+    }
+
+    renderLatencyChart(percentiles) {
+        const keys = Object.keys(percentiles).sort();
+        const data = {
+            labels: keys,
+            datasets: [
+                { label: 'p50', data: keys.map(key => percentiles[key].p50_ms), backgroundColor: 'rgba(40, 167, 69, 0.8)' },
+                { label: 'p90', data: keys.map(key => percentiles[key].p90_ms), backgroundColor: 'rgba(255, 193, 7, 0.8)' },
+                { label: 'p99', data: keys.map(key => percentiles[key].p99_ms), backgroundColor: 'rgba(220, 53, 69, 0.8)' }
+            ]
+        };
+
+        if (this.latencyChart) {
+            this.latencyChart.data = data;
+            this.latencyChart.update();
+            return;
+        }
+        this.latencyChart = new Chart(document.getElementById('llmLatencyChart').getContext('2d'), {
+            type: 'bar',
+            data: data,
+            options: {
+                responsive: true,
+                plugins: { title: { display: true, text: '最近調用 (提供商:類型)' } },
+                scales: { y: { beginAtZero: true, title: { display: true, text: 'ms' } } }
+            }
+        });
+    }
+
+    renderTrendChart(rollup) {
+        // Combine rows per hour, weighting each row's estimate by its call count
+        const hours = {};
+        rollup.forEach(row => {
+            const hour = hours[row.bucket_start] || (hours[row.bucket_start] = { calls: 0, p50: 0, p90: 0, p99: 0 });
+            if (row.p50_ms === null) return;
+            hour.calls += row.calls;
+            hour.p50 += row.p50_ms * row.calls;
+            hour.p90 += row.p90_ms * row.calls;
+            hour.p99 += row.p99_ms * row.calls;
+        });
+        const buckets = Object.keys(hours).sort();
+        const series = field => buckets.map(bucket => hours[bucket].calls ? Math.round(hours[bucket][field] / hours[bucket].calls) : null);
+        const data = {
+            labels: buckets.map(bucket => new Date(bucket * 1000).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })),
+            datasets: [
+                { label: 'p50', data: series('p50'), borderColor: 'rgb(40, 167, 69)', tension: 0.1 },
+                { label: 'p90', data: series('p90'), borderColor: 'rgb(255, 193, 7)', tension: 0.1 },
+                { label: 'p99', data: series('p99'), borderColor: 'rgb(220, 53, 69)', tension: 0.1 }
+            ]
+        };
+
+        if (this.trendChart) {
+            this.trendChart.data = data;
+            this.trendChart.update();
+            return;
+        }
+        this.trendChart = new Chart(document.getElementById('llmLatencyTrendChart').getContext('2d'), {
+            type: 'line',
+            data: data,
+            options: {
+                responsive: true,
+                plugins: { title: { display: true, text: '過去24小時 (每小時)' } },
+                scales: { y: { beginAtZero: true, title: { display: true, text: 'ms' } } }
+            }
+        });
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    window.llmMetricsCharts = new LLMMetricsCharts();
+});
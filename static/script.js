@@ -674,13 +674,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error('地區是必填項目');
             }
             
-            // 發送請求到後端
+            // 發送請求到後端 (非同步任務模式：伺服器立即返回任務ID)
             const response = await fetch('/find_doctor', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify(formData)
+                body: JSON.stringify({ ...formData, async: true, progressive: true })
             });
 
             if (!response.ok) {
@@ -701,7 +701,19 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(errorMessage);
             }
 
-            const data = await response.json();
+            let data = await response.json();
+            if (data.emergency_fast_path || data.progressive) {
+                // 嚴重症狀快速通道 / 漸進式回應：先顯示醫生，完整分析完成後再附上
+                loading.style.display = 'none';
+                displayResults(data, formData.symptoms);
+                if (data.analysis_job) {
+                    attachFullAnalysis(data.analysis_job, formData.symptoms);
+                }
+                return;
+            }
+            if (data.job_id) {
+                data = await waitForAnalysisJob(data);
+            }
             
             // 隱藏載入動畫
             loading.style.display = 'none';
@@ -735,6 +747,65 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Poll an analysis job until the result is ready
+    async function waitForAnalysisJob(job) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+            const response = await fetch(job.status_url);
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || `服務器錯誤 (${response.status})`);
+            }
+            if (data.status === 'done') {
+                return data;
+            }
+        }
+    }
+
+    // Replace the pending placeholder with the full analysis once the background job finishes
+    async function attachFullAnalysis(job, symptoms) {
+        try {
+            const data = await waitForAnalysisJob(job);
+            const placeholder = document.getElementById('pendingAnalysisCard');
+            if (!placeholder) return;
+            if (data.progressive && data.validation_error) {
+                showValidationError(data);
+                return;
+            }
+            if (data.specialty_changed) {
+                // AI分析推薦了不同專科：以完整結果重新顯示醫生
+                displayResults(data, symptoms);
+                return;
+            }
+            const provisionalNote = document.getElementById('provisionalMatchNote');
+            if (provisionalNote) provisionalNote.remove();
+            if (data.validation_error || !data.analysis ||
+                data.analysis.includes('AI分析服務暫時不可用') || data.analysis.includes('AI服務配置不完整')) {
+                placeholder.remove();
+                return;
+            }
+            placeholder.replaceWith(createAnalysisCard(data.analysis, data.recommended_specialty, symptoms, data.search_terms || []));
+        } catch (error) {
+            console.error('Full analysis failed:', error);
+            const placeholder = document.getElementById('pendingAnalysisCard');
+            if (placeholder) placeholder.remove();
+        }
+    }
+
+    function createEmergencyGuidanceCard(guidance) {
+        const card = document.createElement('div');
+        card.className = 'alert alert-danger';
+        card.style.cssText = 'padding: 20px; margin: 20px 0; border-radius: 10px; border: 2px solid #dc3545;';
+        const severeItems = (guidance.severe_symptoms || []).map(item => `<span class="badge bg-danger me-1">${item}</span>`).join('');
+        card.innerHTML = `
+            <h4 style="color: #842029; margin-bottom: 10px;">${guidance.title}</h4>
+            <p style="margin-bottom: 10px;">${guidance.message}</p>
+            ${severeItems ? `<div style="margin-bottom: 10px;">${severeItems}</div>` : ''}
+            <p style="font-size: 0.9rem; margin-bottom: 0;">${guidance.notice}</p>
+        `;
+        return card;
+    }
+
     // Make proceedWithAnalysis globally accessible for severe warning system
     window.proceedWithAnalysis = proceedWithAnalysis;
 
@@ -861,6 +932,31 @@ document.addEventListener('DOMContentLoaded', function() {
             doctorList.appendChild(summaryCard);
         }
         
+        // 嚴重症狀快速通道：急診指引及完整分析佔位
+        if (data.emergency_guidance) {
+            doctorList.appendChild(createEmergencyGuidanceCard(data.emergency_guidance));
+        }
+        if (data.provisional) {
+            const provisionalNote = document.createElement('div');
+            provisionalNote.id = 'provisionalMatchNote';
+            provisionalNote.className = 'alert alert-secondary';
+            provisionalNote.style.cssText = 'padding: 12px 15px; margin: 20px 0; border-radius: 10px;';
+            const noteTemplate = window.currentTranslations && window.currentTranslations['provisional_match_note']
+                ? window.currentTranslations['provisional_match_note'] : '以下醫生根據症狀關鍵詞初步配對（{specialty}），AI分析完成後會更新推薦。';
+            provisionalNote.textContent = noteTemplate.replace('{specialty}', data.recommended_specialty || '');
+            doctorList.appendChild(provisionalNote);
+        }
+        if (data.analysis_job) {
+            const pendingCard = document.createElement('div');
+            pendingCard.id = 'pendingAnalysisCard';
+            pendingCard.className = 'alert alert-info';
+            pendingCard.style.cssText = 'text-align: center; padding: 15px; margin: 20px 0; border-radius: 10px;';
+            const pendingText = window.currentTranslations && window.currentTranslations['full_analysis_pending']
+                ? window.currentTranslations['full_analysis_pending'] : '完整AI症狀分析進行中，完成後會自動顯示…';
+            pendingCard.innerHTML = `<i class="fas fa-spinner fa-spin me-2"></i>${pendingText}`;
+            doctorList.appendChild(pendingCard);
+        }
+        
         // 顯示AI症狀分析結果
         if (data.analysis) {
             // Check if analysis contains error messages
@@ -882,7 +978,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 `;
                 doctorList.appendChild(errorCard);
             } else {
-                const analysisCard = createAnalysisCard(data.analysis, data.recommended_specialty, symptoms);
+                const analysisCard = createAnalysisCard(data.analysis, data.recommended_specialty, symptoms, data.search_terms || []);
                 doctorList.appendChild(analysisCard);
             }
         }
@@ -1441,7 +1537,7 @@ document.addEventListener('DOMContentLoaded', function() {
         return card;
     }
 
-    function createAnalysisCard(analysis, recommendedSpecialty, symptoms = '') {
+    function createAnalysisCard(analysis, recommendedSpecialty, symptoms = '', searchTerms = []) {
         // Safety check for symptoms parameter
         if (symptoms === null || symptoms === undefined) {
             symptoms = '';
@@ -1509,7 +1605,11 @@ document.addEventListener('DOMContentLoaded', function() {
             // Store current symptoms globally for CHP reference
             window.currentSymptoms = analysisSymptoms;
             
-            window.medicalEvidenceSystem.generateEvidenceHTML(analysisSymptoms, recommendedSpecialty)
+            // English search terms returned by the combined diagnosis call need no server-side translation
+            const evidencePromise = searchTerms.length > 0
+                ? window.medicalEvidenceSystem.generateEvidenceHTML(searchTerms, '')
+                : window.medicalEvidenceSystem.generateEvidenceHTML(analysisSymptoms, recommendedSpecialty);
+            evidencePromise
                 .then(evidenceHTML => {
                     console.log('Got evidence HTML:', evidenceHTML ? 'success' : 'empty');
                     
@@ -13,6 +13,7 @@ class SevereWarningSystem {
         
         this.pendingFormData = null;
         this.onProceedCallback = null;
+        this.lastPrefetchedSymptoms = null;
         
         this.initEventListeners();
     }
@@ -86,6 +87,25 @@ class SevereWarningSystem {
         }
     }
     
+    // Fire-and-forget check while the user is still filling in the form, so the server
+    // can start translation and evidence lookup for these symptoms before submission
+    prefetchSymptoms(symptoms, chronicConditions) {
+        if (!symptoms || symptoms === this.lastPrefetchedSymptoms) {
+            return;
+        }
+        this.lastPrefetchedSymptoms = symptoms;
+        fetch('/check_severe_symptoms', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                symptoms: symptoms,
+                chronicConditions: chronicConditions || ''
+            })
+        }).catch(error => console.debug('Symptom prefetch skipped:', error));
+    }
+    
     showWarning(warningData, formData, onProceedCallback) {
         console.log('Severe warning: storing formData:', formData);
         // Deep copy the formData to avoid reference issues
@@ -193,6 +193,20 @@ class SymptomInput {
     
     updateHiddenInput() {
         this.hiddenTextarea.value = this.symptoms.join('、');
+        this.schedulePrefetch();
+    }
+    
+    // Once enough symptoms are entered, let the server start work for them after a short pause
+    schedulePrefetch() {
+        clearTimeout(this.prefetchTimer);
+        if (this.symptoms.length < 3) {
+            return;
+        }
+        this.prefetchTimer = setTimeout(() => {
+            if (window.severeWarningSystem) {
+                window.severeWarningSystem.prefetchSymptoms(this.hiddenTextarea.value);
+            }
+        }, 1500);
     }
     
     validateSymptomCount() {
@@ -0,0 +1,186 @@
+"""
+Structured Diagnosis Output
+JSON schema, provider response_format mapping and parser for diagnosis responses.
+The model returns {diagnosis, specialties[], severity, emergency, advice} in one
+object, so the specialty / severity / emergency fields no longer have to be scraped
+out of free text. Callers keep the regex extraction only as a fallback when a
+response cannot be parsed.
+
+The combined schema adds a symptom validity verdict and English PubMed search
+terms, so validation, translation and diagnosis share a single LLM round trip.
+"""
+
+import json
+import re
+
+SEVERITY_LEVELS = ('mild', 'moderate', 'severe')
+
+DIAGNOSIS_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'diagnosis': {'type': 'string'},
+        'specialties': {'type': 'array', 'items': {'type': 'string'}},
+        'severity': {'type': 'string', 'enum': list(SEVERITY_LEVELS)},
+        'emergency': {'type': 'boolean'},
+        'advice': {'type': 'string'}
+    },
+    'required': ['diagnosis', 'specialties', 'severity', 'emergency', 'advice'],
+    'additionalProperties': False
+}
+
+COMBINED_DIAGNOSIS_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': dict(
+        DIAGNOSIS_RESPONSE_SCHEMA['properties'],
+        valid={'type': 'boolean'},
+        validation_issues={'type': 'array', 'items': {'type': 'string'}},
+        search_terms={'type': 'array', 'items': {'type': 'string'}}
+    ),
+    'required': DIAGNOSIS_RESPONSE_SCHEMA['required'] + ['valid', 'validation_issues', 'search_terms'],
+    'additionalProperties': False
+}
+
+# Severity words the model may still use instead of the enum values
+SEVERITY_ALIASES = {
+    '輕微': 'mild', '轻微': 'mild', 'low': 'mild',
+    '中等': 'moderate', '中度': 'moderate', 'medium': 'moderate',
+    '嚴重': 'severe', '严重': 'severe', 'high': 'severe'
+}
+
+# OpenAI model families that accept json_schema / only json_object
+OPENAI_JSON_SCHEMA_MODELS = ('gpt-4o', 'gpt-4.1', 'gpt-5', 'o1', 'o3', 'o4')
+OPENAI_JSON_OBJECT_MODELS = ('gpt-4-turbo', 'gpt-3.5-turbo')
+
+JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+CJK_CHAR = re.compile(r'[\u4e00-\u9fff]')
+
+
+def build_response_format(provider, model, schema=DIAGNOSIS_RESPONSE_SCHEMA):
+    """Map the schema to the provider's structured-output request field.
+
+    Returns (field_name, value), or None when the provider/model has no
+    structured-output support and the prompt instruction has to suffice.
+    """
+    model = (model or '').lower()
+    json_schema = {
+        'type': 'json_schema',
+        'json_schema': {'name': 'diagnosis', 'strict': True, 'schema': schema}
+    }
+
+    if provider == 'openai':
+        if model.startswith(OPENAI_JSON_SCHEMA_MODELS):
+            return 'response_format', json_schema
+        if model.startswith(OPENAI_JSON_OBJECT_MODELS):
+            return 'response_format', {'type': 'json_object'}
+        return None
+    if provider == 'openrouter':
+        if model.startswith(('openai/', 'google/')):
+            return 'response_format', json_schema
+        return 'response_format', {'type': 'json_object'}
+    if provider == 'volcengine':
+        return 'response_format', {'type': 'json_object'}
+    if provider == 'ollama':
+        return 'format', 'json'
+    return None
+
+
+def normalize_severity(value):
+    """Normalize a severity value to mild / moderate / severe"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    if value in SEVERITY_LEVELS:
+        return value
+    return SEVERITY_ALIASES.get(value)
+
+
+def normalize_emergency(value):
+    """Normalize an emergency flag that may arrive as bool or text"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('true', 'yes', '是', 'y'):
+            return True
+        if value in ('false', 'no', '否', 'n'):
+            return False
+    return None
+
+
+def parse_structured_diagnosis(content, available_specialties=None):
+    """Parse a JSON diagnosis response.
+
+    Returns a dict with diagnosis, specialties, severity, emergency and advice,
+    or None when the content is not a usable diagnosis object. Specialties not
+    in available_specialties are dropped. Combined responses also carry valid,
+    validation_issues and search_terms; an invalid verdict is returned even
+    without diagnosis fields.
+    """
+    if not content or not isinstance(content, str):
+        return None
+
+    match = JSON_OBJECT.search(content)  # tolerate ```json fences and leading text
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except (json.JSONDecodeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    combined = {}
+    if 'valid' in data:
+        issues = data.get('validation_issues') or []
+        terms = data.get('search_terms') or []
+        combined = {
+            'valid': normalize_emergency(data.get('valid')) is not False,
+            'validation_issues': [i for i in issues if isinstance(i, str)] if isinstance(issues, list) else [],
+            # Search terms go to PubMed as-is, so keep only English terms
+            'search_terms': [term.strip() for term in terms if isinstance(term, str)
+                             and term.strip() and not CJK_CHAR.search(term)][:5] if isinstance(terms, list) else []
+        }
+        if not combined['valid']:
+            return dict(combined, diagnosis='', specialties=[], severity='mild', emergency=False, advice='')
+
+    severity = normalize_severity(data.get('severity'))
+    emergency = normalize_emergency(data.get('emergency'))
+    diagnosis = data.get('diagnosis')
+    if severity is None or emergency is None or not isinstance(diagnosis, str) or not diagnosis.strip():
+        return None
+
+    specialties = data.get('specialties') or []
+    if isinstance(specialties, str):
+        specialties = re.split(r'[、,，/]', specialties)
+    specialties = [s.strip() for s in specialties if isinstance(s, str) and s.strip()]
+    if available_specialties:
+        specialties = [s for s in specialties if s in available_specialties]
+
+    advice = data.get('advice')
+    return dict(
+        combined,
+        diagnosis=diagnosis.strip(),
+        specialties=list(dict.fromkeys(specialties))[:3],
+        severity=severity,
+        emergency=emergency,
+        advice=advice.strip() if isinstance(advice, str) else ''
+    )
+
+
+def render_diagnosis_text(diagnosis, t):
+    """Render a parsed diagnosis in the same labelled text layout as the free-text mode.
+
+    t is a translation lookup (key -> text) for the user's language. Keeping the
+    labelled layout means stored reports and the regex fallbacks still read it.
+    """
+    def label(key):
+        text = t(key)
+        return text + ' ' if text.endswith(':') else text  # "Severity: Mild", "嚴重程度：輕微"
+
+    return '\n'.join([
+        f"{label('diagnosis_format')}{diagnosis['diagnosis']}",
+        f"{label('specialty_format')}{'、'.join(diagnosis['specialties'])}",
+        f"{label('severity_format')}{t('severity_' + diagnosis['severity'])}",
+        f"{label('emergency_format')}{t('emergency_yes') if diagnosis['emergency'] else t('emergency_no')}",
+        f"{label('advice_format')}{diagnosis['advice']}"
+    ])
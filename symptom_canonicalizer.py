@@ -0,0 +1,215 @@
+"""
+Symptom Canonicalization
+Reduces free-text symptom input to a canonical form before caching: simplified Chinese is
+folded to traditional, separators are normalized, synonyms are mapped through the
+translation memory, terms are sorted, and age/gender are bucketed into coarse bands.
+"頭痛, 發燒", "发烧、头痛" and "headache and fever" all produce the same canonical key.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from translation_memory import normalize_term, translation_memory, DURATION_SUFFIX
+
+# 常見醫療用字的簡體 -> 繁體對照（一簡多繁時取醫療用語中最常見的寫法，如 发 -> 發）
+SIMPLIFIED_CHARS = '头发烧热泻呕晕咙闷气痒肤鸣压肿关节颈肠肾脏脑经虑忧郁颤痹视听声哑干湿体减轻饭虚难黄绿胀疮过红伤两个时间续严剧复频数阵紧张无觉记忆说话动还与并总会变边侧后从开这几点脚损疗药医欲盗应恶'
+TRADITIONAL_CHARS = '頭發燒熱瀉嘔暈嚨悶氣癢膚鳴壓腫關節頸腸腎臟腦經慮憂鬱顫痺視聽聲啞乾濕體減輕飯虛難黃綠脹瘡過紅傷兩個時間續嚴劇復頻數陣緊張無覺記憶說話動還與並總會變邊側後從開這幾點腳損療藥醫慾盜應噁'
+SCRIPT_FOLDING = str.maketrans(SIMPLIFIED_CHARS, TRADITIONAL_CHARS)
+
+# 症狀分隔：標點、換行及連接詞
+TERM_SEPARATORS = re.compile(r'[，,、；;。.！!？?/\n\r\t]+|\s+(?:and|with|plus)\s+|和|及|與|以及|還有|并且|並且')
+
+AGE_BANDS = ((2, '0-2'), (12, '3-12'), (17, '13-17'), (39, '18-39'), (64, '40-64'))
+GENDER_BANDS = {'男': 'M', 'male': 'M', 'm': 'M', '女': 'F', 'female': 'F', 'f': 'F'}
+
+
+def fold_script(text):
+    """Fold simplified Chinese medical characters to traditional"""
+    return text.translate(SCRIPT_FOLDING) if isinstance(text, str) else ''
+
+
+def split_symptom_terms(text):
+    """Split symptom text on punctuation and conjunctions into trimmed, lowercased terms"""
+    if not isinstance(text, str):
+        return []
+    terms = []
+    for part in TERM_SEPARATORS.split(fold_script(text).lower()):
+        part = re.sub(r'\s+', ' ', part).strip()
+        if part:
+            terms.append(part)
+    return terms
+
+
+def age_band(age):
+    """Coarse age band; the 3-12 band keeps the pediatric (<= 12) routing boundary intact"""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return 'unknown'
+    for upper, band in AGE_BANDS:
+        if age <= upper:
+            return band
+    return '65+'
+
+
+def gender_band(gender):
+    """M / F / U"""
+    return GENDER_BANDS.get((gender or '').strip().lower(), 'U')
+
+
+class SymptomCanonicalizer:
+    """Canonical symptom forms and keys, with counters for how many raw inputs collapse per key"""
+
+    def __init__(self, synonyms_fn=None, refresh_seconds=60, tracking_capacity=10000):
+        # synonyms_fn() -> {normalized_chinese_term: english_term}, e.g. translation_memory.entries
+        self.synonyms_fn = synonyms_fn
+        self.refresh_seconds = refresh_seconds
+        self.tracking_capacity = tracking_capacity
+        self._lock = threading.Lock()
+        self._synonyms = {}
+        self._english_terms = set()
+        self._next_refresh = 0.0
+        self._raw_inputs = set()
+        self._canonical_keys = set()
+        self._stats = {'canonicalized': 0, 'synonym_hits': 0}
+
+    def _synonym_index(self):
+        """Folded {chinese: english} index and the set of known English terms, refreshed periodically"""
+        now = time.monotonic()
+        if self.synonyms_fn is None or now < self._next_refresh:
+            return self._synonyms, self._english_terms
+        with self._lock:
+            if now >= self._next_refresh:
+                self._next_refresh = now + self.refresh_seconds
+                try:
+                    entries = self.synonyms_fn() or {}
+                    self._synonyms = {fold_script(source): english.lower() for source, english in entries.items()}
+                    self._english_terms = set(self._synonyms.values())
+                except Exception as e:
+                    print(f"Error loading canonicalization synonyms: {e}")
+        return self._synonyms, self._english_terms
+
+    def canonical_term(self, term):
+        """Map one term to its canonical form: English synonym if known, keeping any duration suffix"""
+        synonyms, english_terms = self._synonym_index()
+        if term in english_terms:
+            return term, True
+        key = normalize_term(term)
+        if key in synonyms:
+            duration = DURATION_SUFFIX.search(term)
+            return (f"{synonyms[key]} {duration.group(0)}" if duration else synonyms[key]), True
+        return term, False
+
+    def canonical_terms(self, text):
+        """Sorted, de-duplicated canonical terms of a symptom text"""
+        terms = set()
+        hits = 0
+        for term in split_symptom_terms(text):
+            canonical, matched = self.canonical_term(term)
+            terms.add(canonical)
+            hits += matched
+        with self._lock:
+            self._stats['synonym_hits'] += hits
+        return sorted(terms)
+
+    def canonicalize(self, symptoms, age=None, gender=None, chronic_conditions='', track=True):
+        """Canonical form of a query: terms, text, age/gender bands and a stable key
+
+        track=False leaves the collapse-ratio counters untouched (e.g. for speculative lookups)
+        """
+        terms = self.canonical_terms(symptoms)
+        chronic_terms = self.canonical_terms(chronic_conditions)
+        canonical = {
+            'terms': terms,
+            'text': ', '.join(terms),
+            'chronic_terms': chronic_terms,
+            'age_band': age_band(age),
+            'gender': gender_band(gender)
+        }
+        payload = json.dumps([terms, chronic_terms, canonical['age_band'], canonical['gender']], ensure_ascii=False)
+        canonical['key'] = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+        if not track:
+            return canonical
+        raw = json.dumps([symptoms, chronic_conditions, age, gender], ensure_ascii=False, default=str)
+        with self._lock:
+            self._stats['canonicalized'] += 1
+            if len(self._raw_inputs) >= self.tracking_capacity:
+                # 追蹤窗口已滿：重新開始統計，避免無限增長
+                self._raw_inputs.clear()
+                self._canonical_keys.clear()
+            self._raw_inputs.add(raw)
+            self._canonical_keys.add(canonical['key'])
+        return canonical
+
+    def get_stats(self):
+        """Distinct raw inputs vs distinct canonical keys; collapse_ratio = raw / canonical"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['distinct_raw'] = len(self._raw_inputs)
+            stats['distinct_canonical'] = len(self._canonical_keys)
+            stats['synonyms'] = len(self._synonyms)
+        stats['collapse_ratio'] = round(stats['distinct_raw'] / stats['distinct_canonical'], 3) if stats['distinct_canonical'] else 1.0
+        return stats
+
+
+class CanonicalResultCache:
+    """In-process TTL + LRU cache for results keyed by canonical query keys"""
+
+    def __init__(self, ttl_seconds=3600, capacity=500):
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Cached value or None when missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def peek(self, key):
+        """Cached value or None, without touching LRU order or hit/miss counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None and entry[0] >= time.monotonic() else None
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Get size and hit/miss counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+# Global instance
+symptom_canonicalizer = SymptomCanonicalizer(translation_memory.entries)
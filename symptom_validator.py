@@ -0,0 +1,175 @@
+"""
+Local Symptom Validator
+Rule-based fast path in front of the LLM symptom validation. Accepts input that
+clearly mentions known symptoms, rejects obvious garbage ("test", "123", keyboard
+mashing) without any network call, and marks everything else as ambiguous so only
+those inputs are escalated to the LLM.
+"""
+
+import json
+import re
+import threading
+
+SEPARATORS = re.compile(r'[,，、;；。.!！?？\s/]+')
+PUNCTUATION = re.compile(r'[\W_]+', re.UNICODE)
+CJK_CHAR = re.compile(r'[\u4e00-\u9fff]')
+LATIN_WORD = re.compile(r'^[a-z]+$')
+
+# Inputs that are never symptom descriptions on their own
+JUNK_WORDS = {
+    'test', 'testing', 'tests', 'asdf', 'qwerty', 'abc', 'abcd', 'xxx', 'hello', 'hi', 'ok',
+    'none', 'null', 'na', 'n/a', 'nothing', 'whatever', 'random',
+    '測試', '测试', '試試', '试试', '隨便', '随便', '亂寫', '乱写', '你好', '哈囉', '哈啰',
+    '沒有', '没有', '無', '无', '開心', '开心', '工作', '吃飯', '吃饭', '睡覺', '睡觉'
+}
+
+# Characters that almost only appear in symptom descriptions
+SYMPTOM_MORPHEMES = set('痛疼癢痒腫肿咳燒烧暈晕吐瀉泻麻喘悶闷脹胀疹熱热汗抖痰鼻喉燥抽瘀')
+
+# CHP topic names that denote a disease or condition (other topics cover smoking, diet, exercise...)
+CONDITION_MARKERS = re.compile(r'病|症|炎|感染|熱|疾|瘡|痢|疹|痘|癌|疽|瘧|傷寒|中毒|鼠疫|霍亂|破傷風|白喉|炭疽|百日咳|禽流感|流行性感冒|高血壓|肥胖')
+
+# Specialty names ('內科', '心臟科') and "<specialty> doctor" forms
+SPECIALTY_NAME = re.compile(r'科(?:醫生|醫師|医生|医师)?$')
+
+ENGLISH_SYMPTOM_WORDS = {
+    'pain', 'ache', 'aches', 'aching', 'headache', 'fever', 'cough', 'coughing', 'itch', 'itchy',
+    'swelling', 'swollen', 'nausea', 'vomit', 'vomiting', 'dizzy', 'dizziness', 'rash', 'bleeding',
+    'sore', 'tired', 'fatigue', 'diarrhea', 'diarrhoea', 'constipation', 'numb', 'numbness',
+    'breathless', 'wheezing', 'chills', 'sweating', 'insomnia', 'anxiety', 'cramps', 'cramp'
+}
+
+
+def load_chp_topic_titles(path='assets/content.json'):
+    """Load CHP health-topic names (e.g. '登革熱') from the scraped content file"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            topics = json.load(f)
+    except Exception as e:
+        print(f"Error loading CHP topics for symptom lexicon: {e}")
+        return []
+
+    titles = []
+    for topic in topics:
+        title = topic.get('title', '') if isinstance(topic, dict) else ''
+        # Titles look like "衞生防護中心 - 登革熱" or "衞生防護中心 - 新型甲型流行性感冒 - 禽流感"
+        names = [part.strip() for part in title.split(' - ')[1:]]
+        titles.extend(name for name in names if name)
+    return titles
+
+
+def is_condition_topic(name):
+    """Whether a CHP topic name is a disease/condition ('登革熱') rather than a health topic ('吸煙', '飲食與營養')"""
+    return bool(CONDITION_MARKERS.search(name or ''))
+
+
+def is_specialty_name(term):
+    """Whether a term names a specialty or doctor ('外科', '普通科醫生') rather than a symptom"""
+    return bool(SPECIALTY_NAME.search((term or '').strip()))
+
+
+class LocalSymptomValidator:
+    """Classify symptom text as valid / invalid / ambiguous without network calls"""
+
+    VALID = 'valid'
+    INVALID = 'invalid'
+    AMBIGUOUS = 'ambiguous'
+
+    def __init__(self, lexicon_terms, topic_terms=()):
+        # topic_terms: health topics that are not symptoms (e.g. '吸煙'); input matching only these stays ambiguous
+        self.cjk_terms, self.english_pattern = self._compile_terms(lexicon_terms)
+        self.topic_cjk_terms, self.topic_english_pattern = self._compile_terms(topic_terms)
+
+        self._lock = threading.Lock()
+        self._counts = {self.VALID: 0, self.INVALID: 0, self.AMBIGUOUS: 0}
+
+    @staticmethod
+    def _compile_terms(terms):
+        """Split terms into CJK substrings (longest first) and one word-boundary pattern for the rest"""
+        cjk_terms = set()
+        english_terms = set()
+        for term in terms:
+            if not isinstance(term, str):
+                continue
+            term = term.strip().lower()
+            if len(term) < 2:
+                continue
+            if CJK_CHAR.search(term):
+                cjk_terms.add(term)
+            else:
+                english_terms.add(term)
+
+        english_pattern = None
+        if english_terms:
+            alternatives = '|'.join(re.escape(term) for term in sorted(english_terms, key=len, reverse=True))
+            english_pattern = re.compile(rf'\b(?:{alternatives})\b')
+        # Longest first so matched_terms reports the most specific term
+        return sorted(cjk_terms, key=len, reverse=True), english_pattern
+
+    @staticmethod
+    def _match_terms(text, cjk_terms, english_pattern):
+        matched_terms = [term for term in cjk_terms if term in text]
+        if english_pattern:
+            matched_terms.extend(dict.fromkeys(english_pattern.findall(text)))
+        return matched_terms
+
+    def _is_junk_segment(self, segment):
+        """Check whether one comma-separated segment is obviously not a symptom"""
+        compact = PUNCTUATION.sub('', segment)
+        if not compact:
+            return True
+        if compact.isdigit() or compact in JUNK_WORDS:
+            return True
+        if len(compact) >= 3 and len(set(compact)) <= 2:
+            return True  # "aaaa", "哈哈哈", "121212"
+        if LATIN_WORD.match(compact) and len(compact) >= 4 and not re.search(r'[aeiouy]', compact):
+            return True  # keyboard mashing such as "sdfg"
+        return False
+
+    def _result(self, verdict, confidence, reason, issues=None, matched_terms=None):
+        with self._lock:
+            self._counts[verdict] += 1
+        return {
+            'verdict': verdict,
+            'confidence': confidence,
+            'reason': reason,
+            'issues': issues or [],
+            'matched_terms': matched_terms or []
+        }
+
+    def validate(self, symptoms):
+        """Validate symptom text; returns verdict, confidence, reason, issues and matched terms"""
+        text = (symptoms or '').strip().lower()
+        if not PUNCTUATION.sub('', text):
+            return self._result(self.INVALID, 0.95, 'empty', ['未提供症狀描述'])
+
+        if not CJK_CHAR.search(text) and not re.search(r'[a-z]', text):
+            return self._result(self.INVALID, 0.95, 'no_letters', ['症狀描述只包含數字或符號'])
+
+        segments = [segment for segment in SEPARATORS.split(text) if segment]
+        if all(self._is_junk_segment(segment) for segment in segments):
+            return self._result(self.INVALID, 0.9, 'junk', ['輸入內容不是醫療症狀描述'])
+
+        matched_terms = self._match_terms(text, self.cjk_terms, self.english_pattern)
+        if matched_terms:
+            return self._result(self.VALID, 0.9, 'lexicon', matched_terms=matched_terms[:5])
+
+        words = set(re.findall(r'[a-z]+', text))
+        if SYMPTOM_MORPHEMES.intersection(text) or ENGLISH_SYMPTOM_WORDS.intersection(words):
+            return self._result(self.VALID, 0.75, 'symptom_morpheme')
+
+        # A health topic such as smoking or diet alone is not a symptom; let the LLM decide
+        topic_terms = self._match_terms(text, self.topic_cjk_terms, self.topic_english_pattern)
+        if topic_terms:
+            return self._result(self.AMBIGUOUS, 0.5, 'topic_only', matched_terms=topic_terms[:5])
+
+        return self._result(self.AMBIGUOUS, 0.5, 'no_known_terms')
+
+    def get_stats(self):
+        """Get verdict counts and the share of inputs escalated to the LLM"""
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        counts['total'] = total
+        counts['escalation_rate'] = round(counts[self.AMBIGUOUS] / total, 3) if total else 0.0
+        return counts
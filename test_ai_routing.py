@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test per-call-type AI routing and per-model circuit breakers
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+import app
+
+def with_routes(main_provider, routes, openai_key=''):
+    """Swap in a main provider, routing table and OpenAI key; returns a function restoring them"""
+    saved = (app.AI_CONFIG['provider'], dict(app.AI_ROUTING_CONFIG), app.AI_CONFIG['openai'].get('api_key'))
+    app.AI_CONFIG['provider'] = main_provider
+    app.AI_ROUTING_CONFIG.clear()
+    app.AI_ROUTING_CONFIG.update(routes)
+    app.AI_CONFIG['openai']['api_key'] = openai_key
+
+    def restore():
+        app.AI_CONFIG['provider'] = saved[0]
+        app.AI_ROUTING_CONFIG.clear()
+        app.AI_ROUTING_CONFIG.update(saved[1])
+        app.AI_CONFIG['openai']['api_key'] = saved[2]
+    return restore
+
+def test_unconfigured_provider_falls_back():
+    """A route to a provider without an API key uses the main provider and its own model"""
+    restore = with_routes('ollama', {'validate': {'provider': 'openai', 'model': 'gpt-3.5-turbo', 'max_tokens': 500, 'timeout': 15}})
+    try:
+        route = app.resolve_ai_route('validate')
+        assert route['provider'] == 'ollama'
+        assert route['model'] == app.AI_CONFIG['ollama']['model']
+        assert route['max_tokens'] == 500 and route['timeout'] == 15
+
+        app.AI_CONFIG['openai']['api_key'] = 'sk-test'
+        assert app.resolve_ai_route('validate')['provider'] == 'openai'
+        assert app.resolve_ai_route('validate')['model'] == 'gpt-3.5-turbo'
+    finally:
+        restore()
+    print("✓ Unconfigured routed provider falls back to the main provider")
+
+def test_blank_provider_keeps_model():
+    """A route with only a model set runs that model on the main provider"""
+    restore = with_routes('ollama', {'translate': {'provider': '', 'model': 'qwen2.5:3b', 'max_tokens': 0, 'timeout': 0}})
+    try:
+        assert app.resolve_ai_route('translate') == {'provider': 'ollama', 'model': 'qwen2.5:3b',
+                                                     'max_tokens': None, 'timeout': None}
+    finally:
+        restore()
+    print("✓ Blank provider keeps the routed model")
+
+def test_zero_limits_use_provider_defaults():
+    """max_tokens / timeout of 0 (or a missing route) mean the provider's own defaults"""
+    restore = with_routes('ollama', {'health': {'provider': 'ollama', 'model': '', 'max_tokens': 0, 'timeout': 0}})
+    try:
+        route = app.resolve_ai_route('health')
+        assert route['max_tokens'] is None and route['timeout'] is None
+        assert route['model'] == app.AI_CONFIG['ollama']['model']
+        assert app.resolve_ai_route('unknown_type') == route
+    finally:
+        restore()
+    print("✓ Zero limits use provider defaults")
+
+def test_sanitize_route():
+    """Unknown providers become blank and limits are clamped to non-negative integers"""
+    assert app.sanitize_ai_route({'provider': ' OpenAI ', 'model': ' gpt-4o ', 'max_tokens': '800', 'timeout': 20}) == \
+        {'provider': 'openai', 'model': 'gpt-4o', 'max_tokens': 800, 'timeout': 20}
+    assert app.sanitize_ai_route({'provider': 'anthropic', 'max_tokens': -5, 'timeout': 'soon'}) == \
+        {'provider': '', 'model': '', 'max_tokens': 0, 'timeout': 0}
+    assert app.sanitize_ai_route({}) == {'provider': '', 'model': '', 'max_tokens': 0, 'timeout': 0}
+    print("✓ Routes sanitized")
+
+def test_ollama_warm_targets():
+    """Every route that resolves to Ollama is kept warm, not just the main provider's model"""
+    restore = with_routes('openrouter', {'diagnose': {'provider': '', 'model': '', 'max_tokens': 0, 'timeout': 0},
+                                         'translate': {'provider': 'ollama', 'model': 'qwen2.5:3b', 'max_tokens': 0, 'timeout': 0},
+                                         'health': {'provider': 'ollama', 'model': 'qwen2.5:3b', 'max_tokens': 0, 'timeout': 0}})
+    try:
+        assert app.ollama_warm_targets() == ['qwen2.5:3b']
+        app.AI_CONFIG['provider'] = 'ollama'
+        assert app.ollama_warm_targets() == [app.AI_CONFIG['ollama']['model'], 'qwen2.5:3b']
+    finally:
+        restore()
+    print("✓ Routed Ollama models are warm-up targets")
+
+def test_ollama_prompt_limit_without_num_ctx():
+    """Diagnosis routed to Ollama without num_ctx is capped by Ollama's default context window"""
+    restore = with_routes('ollama', {'diagnose': {'provider': '', 'model': 'routing-test-model', 'max_tokens': 0, 'timeout': 0}})
+    saved_num_ctx = app.AI_CONFIG['ollama'].get('num_ctx')
+    try:
+        reserve = app.PROMPT_BUDGET_CONFIG['output_reserve_tokens']
+        app.AI_CONFIG['ollama']['num_ctx'] = 0
+        assert app.diagnosis_prompt_token_limit() == app.PROMPT_BUDGET_CONFIG['ollama_default_context'] - reserve
+        app.AI_CONFIG['ollama']['num_ctx'] = 8192
+        assert app.diagnosis_prompt_token_limit() == 8192 - reserve
+    finally:
+        app.AI_CONFIG['ollama']['num_ctx'] = saved_num_ctx
+        restore()
+    print("✓ Ollama prompt cap assumes the default context window")
+
+def test_breakers_are_per_model():
+    """A tripped breaker for one model does not fail fast calls to another model on the same provider"""
+    cheap = app.ai_circuit_breaker('ollama', 'routing-test-cheap')
+    cheap.min_calls = 1
+    cheap.record_failure('HTTP 500')
+    assert not cheap.allow_request()
+
+    assert app.call_ollama_api('Hello', call_type='validate', model='routing-test-cheap') == "AI分析服務暫時不可用，請稍後再試"
+    assert app.ai_circuit_breaker('ollama', 'routing-test-premium').allow_request()
+    assert 'ollama:routing-test-cheap' in app.circuit_breakers.get_all_status()
+    print("✓ Circuit breakers keyed by provider and model")
+
+def test_deadline_shortened_timeouts_not_counted():
+    """A timeout cut short by the request deadline does not count against the model's breaker"""
+    breaker = app.ai_circuit_breaker('ollama', 'routing-test-deadline')
+    breaker.min_calls = 1
+    timeout = requests.exceptions.ReadTimeout('read timed out')
+
+    app.record_breaker_error(breaker, timeout, call_timeout=2, configured_timeout=30)
+    assert breaker.allow_request() and breaker.get_status()['window_calls'] == 0
+
+    app.record_breaker_error(breaker, timeout, call_timeout=30, configured_timeout=30)
+    assert not breaker.allow_request()
+    print("✓ Deadline-shortened timeouts skip breaker accounting")
+
+if __name__ == "__main__":
+    test_unconfigured_provider_falls_back()
+    test_blank_provider_keeps_model()
+    test_zero_limits_use_provider_defaults()
+    test_sanitize_route()
+    test_ollama_warm_targets()
+    test_ollama_prompt_limit_without_num_ctx()
+    test_breakers_are_per_model()
+    test_deadline_shortened_timeouts_not_counted()
+    print("\nAll AI routing tests passed")
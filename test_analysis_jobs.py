@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the background analysis job queue
+"""
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_jobs import AnalysisJobQueue, JobQueueFull
+
+def test_job_runs_in_background():
+    """Submitting returns immediately and the result is available once done"""
+    jobs = AnalysisJobQueue(workers=2, max_pending=5)
+    release = threading.Event()
+
+    def slow_analysis(symptoms):
+        release.wait(5)
+        return {'analysis': f'分析：{symptoms}'}
+
+    job_id = jobs.submit(slow_analysis, '頭痛', owner='session-a')
+    assert jobs.get(job_id, owner='session-a')['status'] in (AnalysisJobQueue.QUEUED, AnalysisJobQueue.RUNNING)
+
+    release.set()
+    assert jobs.wait(job_id, timeout=5, owner='session-a')
+    job = jobs.get(job_id, owner='session-a')
+    assert job['status'] == AnalysisJobQueue.DONE
+    assert job['result'] == {'analysis': '分析：頭痛'}
+    print("✓ Job result delivered after background run")
+
+def test_jobs_are_private_and_failures_reported():
+    """Other sessions cannot see a job; exceptions mark the job failed"""
+    jobs = AnalysisJobQueue(workers=1, max_pending=5)
+
+    def broken():
+        raise ValueError('provider down')
+
+    job_id = jobs.submit(broken, owner='session-a')
+    assert jobs.get(job_id, owner='session-b') is None
+    jobs.wait(job_id, timeout=5, owner='session-a')
+    job = jobs.get(job_id, owner='session-a')
+    assert job['status'] == AnalysisJobQueue.FAILED
+    assert job['error'] == 'provider down'
+    print("✓ Jobs are private and failures are reported")
+
+def test_queue_is_bounded():
+    """Submissions beyond max_pending are rejected"""
+    jobs = AnalysisJobQueue(workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+
+    jobs.submit(blocking)          # taken by the worker
+    started.wait(5)
+    jobs.submit(blocking)          # fills the queue
+    try:
+        jobs.submit(blocking)
+        assert False, "Expected JobQueueFull"
+    except JobQueueFull:
+        pass
+    assert jobs.get_stats()['rejected'] == 1
+    release.set()
+    print("✓ Pending queue is bounded")
+
+if __name__ == "__main__":
+    test_job_runs_in_background()
+    test_jobs_are_private_and_failures_reported()
+    test_queue_is_bounded()
+    print("\nAll analysis job tests passed")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test per-dependency bulkhead admission control
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bulkhead import Bulkhead, BulkheadFull, BulkheadRegistry
+from request_deadline import Deadline, deadline_scope
+
+def test_queue_full_rejects_immediately():
+    """With all slots busy and the queue full, new callers are rejected at once"""
+    bulkhead = Bulkhead('openai', max_concurrent=1, max_queue=1, max_wait_seconds=2, retry_after_seconds=7)
+    release = threading.Event()
+    holder = threading.Thread(target=bulkhead.call, args=(release.wait, 5))
+    holder.start()
+    time.sleep(0.05)
+
+    waiter = threading.Thread(target=bulkhead.call, args=(lambda: None,))
+    waiter.start()
+    time.sleep(0.05)
+    assert bulkhead.get_status()['queue_depth'] == 1
+
+    start = time.time()
+    try:
+        bulkhead.acquire()
+        assert False, "Expected BulkheadFull"
+    except BulkheadFull as e:
+        assert e.retry_after == 7
+    assert time.time() - start < 0.5
+
+    release.set()
+    holder.join()
+    waiter.join()
+    status = bulkhead.get_status()
+    assert status['admitted'] == 2
+    assert status['rejected_queue_full'] == 1
+    assert status['active'] == 0
+    print("✓ Saturated bulkhead rejects fast with Retry-After")
+
+def test_wait_times_out():
+    """Queued callers give up after max_wait_seconds"""
+    bulkhead = Bulkhead('pubmed', max_concurrent=1, max_queue=5, max_wait_seconds=0.1)
+    bulkhead.acquire()
+    try:
+        bulkhead.acquire()
+        assert False, "Expected BulkheadFull"
+    except BulkheadFull:
+        pass
+    bulkhead.release()
+    assert bulkhead.get_status()['rejected_timeout'] == 1
+    print("✓ Queued callers time out")
+
+def test_wait_bounded_by_deadline():
+    """Queued callers wait no longer than their request deadline allows"""
+    bulkhead = Bulkhead('openai', max_concurrent=1, max_queue=5, max_wait_seconds=10)
+    bulkhead.acquire()
+    started = time.monotonic()
+    try:
+        with deadline_scope(Deadline(0.1, min_timeout_seconds=0.05)):
+            bulkhead.acquire()
+        assert False, "Expected BulkheadFull"
+    except BulkheadFull:
+        pass
+    assert time.monotonic() - started < 1
+    bulkhead.release()
+    print("✓ Queue wait cut to the request deadline")
+
+def test_registry_overrides():
+    """Per-dependency overrides apply on top of the defaults"""
+    registry = BulkheadRegistry(max_concurrent=8)
+    registry.configure_dependency('pubmed', max_concurrent=3)
+    assert registry.get('pubmed').max_concurrent == 3
+    assert registry.get('openrouter').max_concurrent == 8
+    assert set(registry.get_all_status()) == {'pubmed', 'openrouter'}
+    print("✓ Registry applies per-dependency limits")
+
+def test_saturation():
+    """A bulkhead is saturated once all slots are taken"""
+    bulkhead = Bulkhead('sat', max_concurrent=1, max_queue=1, max_wait_seconds=0.1)
+    assert not bulkhead.is_saturated()
+    bulkhead.acquire()
+    assert bulkhead.is_saturated()
+    bulkhead.release()
+    assert not bulkhead.is_saturated()
+    print("✓ Saturation reported")
+
+if __name__ == "__main__":
+    test_queue_full_rejects_immediately()
+    test_wait_times_out()
+    test_wait_bounded_by_deadline()
+    test_registry_overrides()
+    test_saturation()
+    print("\nAll bulkhead tests passed")
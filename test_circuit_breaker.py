@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test circuit breaker state transitions
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+
+def test_breaker_opens_on_failure_rate():
+    """Breaker should open once the failure rate crosses the threshold"""
+    breaker = CircuitBreaker('test', failure_rate_threshold=0.5, window_size=4, min_calls=4, open_seconds=60)
+
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure('timeout')
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure('timeout')
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.get_status()['rejected_count'] == 1
+    print("✓ Breaker opens at 50% failure rate")
+
+def test_slow_calls_count_as_failures():
+    """Calls slower than the latency threshold should trip the breaker"""
+    breaker = CircuitBreaker('slow', slow_call_threshold_ms=100, window_size=2, min_calls=2)
+
+    breaker.record_success(0.5)
+    breaker.record_success(0.5)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert 'slow call' in breaker.get_status()['last_failure']
+    print("✓ Slow calls trip the breaker")
+
+def test_half_open_recovery():
+    """After the open period, one trial call decides whether the breaker closes"""
+    breaker = CircuitBreaker('recovery', window_size=2, min_calls=2, open_seconds=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # only one trial call at a time
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success(0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+    print("✓ Half-open trial closes or re-opens the breaker")
+
+def test_ignored_calls_free_the_probe():
+    """A call with no verdict frees the half-open probe slot without counting as a failure"""
+    breaker = CircuitBreaker('ignored', window_size=2, min_calls=2, open_seconds=0.05)
+    breaker.record_ignored()
+    assert breaker.get_status()['window_calls'] == 0
+
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_ignored()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    print("✓ Ignored calls release the half-open probe")
+
+def test_registry_status():
+    """Registry should create breakers lazily and report all of them"""
+    registry = CircuitBreakerRegistry(min_calls=1, window_size=1)
+    assert registry.get('openrouter') is registry.get('openrouter')
+    registry.get('pubmed_esearch').record_failure('HTTP 503')
+
+    status = registry.get_all_status()
+    assert set(status.keys()) == {'openrouter', 'pubmed_esearch'}
+    assert status['openrouter']['state'] == 'closed'
+    assert status['pubmed_esearch']['state'] == 'open'
+    print("✓ Registry reports breaker states")
+
+if __name__ == "__main__":
+    test_breaker_opens_on_failure_rate()
+    test_slow_calls_count_as_failures()
+    test_half_open_recovery()
+    test_ignored_calls_free_the_probe()
+    test_registry_status()
+    print("\nAll circuit breaker tests passed")
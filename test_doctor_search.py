@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test the doctor search pipeline on input rejected by symptom validation
+"""
+import sys
+import os
+import sqlite3
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app
+
+SEARCH_PARAMS = {'age': 30, 'gender': '', 'symptoms': 'asdf', 'chronic_conditions': '', 'language': 'zh-TW',
+                 'location': '', 'detailed_health_info': {}, 'location_details': {}}
+
+def count_user_queries():
+    conn = sqlite3.connect('admin_data.db')
+    count = conn.execute('SELECT COUNT(*) FROM user_queries').fetchone()[0]
+    conn.close()
+    return count
+
+def test_rejected_input_returns_validation_error():
+    """Rejected symptoms come back as a validation error, are not logged, and do not count as a specialty change"""
+    before = count_user_queries()
+    with app.app.test_request_context():
+        response_data, _ = app.run_doctor_search(SEARCH_PARAMS, '127.0.0.1', 'test', 'test-session')
+        progressive_data, _ = app.run_progressive_analysis('內科', SEARCH_PARAMS, '127.0.0.1', 'test', 'test-session')
+
+    assert response_data['validation_error'] is True
+    assert response_data['validation_issues'] and response_data['validation_message']
+    assert response_data['analysis'] == '' and response_data['doctors'] == []
+    assert progressive_data['validation_error'] and progressive_data['specialty_changed'] is False
+    assert count_user_queries() == before
+    print("✓ Rejected input returns a validation error")
+
+def test_progressive_phase_one_rejects_invalid_input():
+    """Phase 1 validates locally first: rejected input gets no provisional doctors and no phase-2 job"""
+    with app.app.test_request_context():
+        response_data = app.build_progressive_response(SEARCH_PARAMS, 'zh-TW', 'test-session')
+
+    assert response_data['validation_error'] is True
+    assert response_data['validation_issues'] and response_data['validation_message']
+    assert response_data['doctors'] == [] and 'progressive' not in response_data
+    assert 'analysis_job' not in response_data
+    print("✓ Progressive phase 1 returns the validation error")
+
+if __name__ == "__main__":
+    test_rejected_input_returns_validation_error()
+    test_progressive_phase_one_rejects_invalid_input()
+    print("\nAll doctor search tests passed")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test provider usage parsing and prefix-cache token accounting
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from llm_usage import extract_usage, PromptCacheStats, LLMCallMetrics, percentile
+
+def test_openai_style_usage():
+    """OpenAI / OpenRouter / Volcano Engine report cached tokens under prompt_tokens_details"""
+    result = {
+        'choices': [{'message': {'content': '症狀分析：...'}}],
+        'usage': {
+            'prompt_tokens': 2048,
+            'completion_tokens': 300,
+            'prompt_tokens_details': {'cached_tokens': 1792}
+        }
+    }
+    usage = extract_usage(result)
+    assert usage == {'prompt_tokens': 2048, 'completion_tokens': 300, 'cached_tokens': 1792}
+    print("✓ OpenAI-style usage parsed")
+
+def test_anthropic_passthrough_and_ollama_usage():
+    """Gateway pass-through fields and Ollama eval counts are understood"""
+    anthropic = extract_usage({'usage': {'prompt_tokens': 1500, 'completion_tokens': 200, 'cache_read_input_tokens': 1200}})
+    assert anthropic['cached_tokens'] == 1200
+
+    ollama = extract_usage({'response': '...', 'prompt_eval_count': 900, 'eval_count': 150})
+    assert ollama == {'prompt_tokens': 900, 'completion_tokens': 150, 'cached_tokens': None}
+
+    missing = extract_usage({'choices': []})
+    assert missing['prompt_tokens'] is None
+    print("✓ Anthropic pass-through and Ollama usage parsed")
+
+def test_cache_hit_ratio():
+    """Totals should accumulate per provider/model and compute the cached ratio"""
+    stats = PromptCacheStats()
+    stats.record('openai', 'gpt-4o', {'prompt_tokens': 2000, 'completion_tokens': 100, 'cached_tokens': 0})
+    stats.record('openai', 'gpt-4o', {'prompt_tokens': 2000, 'completion_tokens': 100, 'cached_tokens': 1800})
+    stats.record('openai', 'gpt-4o', {'prompt_tokens': None, 'completion_tokens': None, 'cached_tokens': None})
+
+    totals = stats.get_stats()['openai:gpt-4o']
+    assert totals['calls'] == 3
+    assert totals['calls_with_usage'] == 2
+    assert totals['prompt_tokens'] == 4000
+    assert totals['cached_tokens'] == 1800
+    assert totals['cache_hit_ratio'] == 0.45
+    print(f"✓ Cache hit ratio computed ({totals['cache_hit_ratio']})")
+
+def test_call_latency_percentiles():
+    """Ring buffer yields per provider/call-type percentiles; short-circuited calls carry no latency"""
+    metrics = LLMCallMetrics(capacity=200, db_path=os.path.join(tempfile.mkdtemp(), 'metrics.db'))
+    for latency in range(1, 101):
+        metrics.record('openai', 'gpt-4o', 'diagnose', latency * 10, 'success',
+                       {'prompt_tokens': 1000, 'completion_tokens': 200, 'cached_tokens': 0})
+    metrics.record('openai', 'gpt-4o', 'translate', None, 'circuit_open')
+
+    stats = metrics.get_percentiles()
+    diagnose = stats['openai:diagnose']
+    assert diagnose['calls'] == 100
+    assert (diagnose['p50_ms'], diagnose['p90_ms'], diagnose['p99_ms']) == (500, 900, 990)
+    assert diagnose['avg_prompt_tokens'] == 1000
+
+    translate = stats['openai:translate']
+    assert translate['p50_ms'] is None
+    assert translate['error_rate'] == 1.0
+    assert len(metrics.recent(10)) == 10
+    assert percentile([], 50) is None
+    print(f"✓ Latency percentiles computed (p90 {diagnose['p90_ms']}ms)")
+
+def test_hourly_rollup_persists():
+    """Pending aggregates merge into the SQLite rollup table across flushes"""
+    metrics = LLMCallMetrics(db_path=os.path.join(tempfile.mkdtemp(), 'metrics.db'))
+    metrics.record('ollama', 'llama3.1:8b', 'diagnose', 800, 'success', {'prompt_tokens': 500, 'completion_tokens': 50})
+    metrics.flush()
+    metrics.record('ollama', 'llama3.1:8b', 'diagnose', 3000, 'timeout')
+
+    rows = metrics.get_rollup(hours=1)
+    assert len(rows) == 1
+    row = rows[0]
+    assert row['calls'] == 2 and row['errors'] == 1
+    assert row['prompt_tokens'] == 500
+    assert row['max_latency_ms'] == 3000
+    assert row['p50_ms'] == 1000 and row['p99_ms'] == 5000
+    print("✓ Hourly rollup persisted")
+
+if __name__ == "__main__":
+    test_openai_style_usage()
+    test_anthropic_passthrough_and_ollama_usage()
+    test_cache_hit_ratio()
+    test_call_latency_percentiles()
+    test_hourly_rollup_persists()
+    print("\nAll LLM usage tests passed")
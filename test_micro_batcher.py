@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test cross-request micro-batching
+"""
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from micro_batcher import MicroBatcher
+
+def test_concurrent_callers_share_one_batch():
+    """Terms submitted within the window go out in one call and fan back out per caller"""
+    calls = []
+    def translate(terms):
+        calls.append(list(terms))
+        return {term: f"en:{term}" for term in terms if term != '未知'}
+
+    batcher = MicroBatcher(translate, window_ms=200)
+    results = {}
+    def worker(name, terms):
+        results[name] = batcher.submit(terms)
+
+    threads = [
+        threading.Thread(target=worker, args=('a', ['頭痛', '發燒'])),
+        threading.Thread(target=worker, args=('b', ['發燒', '咳嗽'])),
+        threading.Thread(target=worker, args=('c', ['未知']))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(calls[0]) == sorted(['頭痛', '發燒', '咳嗽', '未知'])
+    assert results['a'] == {'頭痛': 'en:頭痛', '發燒': 'en:發燒'}
+    assert results['b'] == {'發燒': 'en:發燒', '咳嗽': 'en:咳嗽'}
+    assert results['c'] == {}
+    stats = batcher.get_stats()
+    assert stats['batches'] == 1 and stats['calls_saved'] == 2
+    print(f"✓ 3 callers served by 1 batch call ({stats['avg_callers_per_batch']} callers/batch)")
+
+def test_full_batch_runs_immediately():
+    """Reaching max_batch_size closes the batch without waiting out the window"""
+    batcher = MicroBatcher(lambda terms: {term: term.upper() for term in terms}, window_ms=5000, max_batch_size=2)
+    assert batcher.submit(['a', 'b', 'c']) == {'a': 'A', 'b': 'B', 'c': 'C'}
+    print("✓ Full batch runs without waiting for the window")
+
+def test_errors_reach_every_caller():
+    """A failing batch call raises in the leader and in all followers"""
+    def fail(terms):
+        raise RuntimeError('provider down')
+
+    batcher = MicroBatcher(fail, window_ms=100)
+    errors = []
+    def worker(terms):
+        try:
+            batcher.submit(terms)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker, args=([term],)) for term in ('胸痛', '腹痛')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ['provider down', 'provider down']
+    assert batcher.get_stats()['errors'] == 1
+    print("✓ Batch errors propagate to all callers")
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_batch()
+    test_full_batch_runs_immediately()
+    test_errors_reach_every_caller()
+    print("\nAll micro-batcher tests passed")
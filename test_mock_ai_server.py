@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the offline mock LLM / PubMed server
+"""
+import sys
+import os
+import xml.etree.ElementTree as ET
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ai_server import app, MOCK_CONFIG
+from structured_diagnosis import parse_structured_diagnosis
+from llm_usage import extract_usage
+from translations import get_translation
+
+MOCK_CONFIG.update({'latency_ms': 0, 'jitter_ms': 0, 'pubmed_latency_ms': 0, 'error_rate': 0})
+
+def test_chat_completion_formats():
+    """Text replies use the translations.py labels; JSON mode returns a parseable object"""
+    client = app.test_client()
+    system_prompt = get_translation('response_language', 'zh-TW')
+    text = client.post('/v1/chat/completions', json={
+        'model': 'gpt-4o-mini',
+        'messages': [{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': '主要症狀：胸痛'}]
+    }).get_json()
+    content = text['choices'][0]['message']['content']
+    assert '緊急程度：是' in content
+
+    structured = client.post('/v1/chat/completions', json={
+        'model': 'gpt-4o-mini',
+        'messages': [{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': '主要症狀：頭痛'}],
+        'response_format': {'type': 'json_object'}
+    }).get_json()
+    parsed = parse_structured_diagnosis(structured['choices'][0]['message']['content'])
+    assert parsed['specialties'][0] == '神經科'
+    assert extract_usage(structured)['prompt_tokens'] > 0
+    print("✓ Chat completions return text and JSON diagnoses")
+
+def test_ollama_generate():
+    """Ollama replies carry eval counts"""
+    result = app.test_client().post('/api/generate', json={'model': 'llama3.1:8b', 'prompt': '主要症狀：咳嗽'}).get_json()
+    assert '上呼吸道感染' in result['response']
+    assert result['eval_count'] > 0
+    print("✓ Ollama generate emulated")
+
+def test_pubmed_esearch_efetch():
+    """esearch returns PMIDs that efetch expands into PubmedArticle XML"""
+    client = app.test_client()
+    search = client.get('/entrez/eutils/esearch.fcgi', query_string={
+        'db': 'pubmed', 'term': '(headache[Title/Abstract] AND (clinical[Title/Abstract])) NOT (rare[Title/Abstract])', 'retmax': 2})
+    pmids = [e.text for e in ET.fromstring(search.data).findall('.//Id')]
+    assert len(pmids) == 2
+
+    fetch = client.get('/entrez/eutils/efetch.fcgi', query_string={'db': 'pubmed', 'id': ','.join(pmids)})
+    titles = [e.text for e in ET.fromstring(fetch.data).findall('.//PubmedArticle//ArticleTitle')]
+    assert len(titles) == 2 and 'headache' in titles[0]
+    print("✓ PubMed esearch/efetch emulated")
+
+def test_error_injection():
+    """Configured error rate produces the configured status"""
+    MOCK_CONFIG.update({'error_rate': 1.0, 'error_status': 429})
+    try:
+        response = app.test_client().post('/v1/chat/completions', json={'messages': []})
+        assert response.status_code == 429
+    finally:
+        MOCK_CONFIG['error_rate'] = 0
+    print("✓ Errors injected on demand")
+
+if __name__ == "__main__":
+    test_chat_completion_formats()
+    test_ollama_generate()
+    test_pubmed_esearch_efetch()
+    test_error_injection()
+    print("\nAll mock server tests passed")
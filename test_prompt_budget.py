@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test prompt token estimation, evidence compaction and per-model prompt caps
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_budget import (estimate_tokens, key_sentences, compact_evidence, parse_model_limits,
+                           prompt_token_limit, PromptBudgetStats)
+
+ABSTRACT = ('Headache is a common complaint in primary care. The study enrolled adults from twelve clinics. '
+            'We found that headache with fever was associated with bacterial meningitis in a minority of cases. '
+            'Funding was provided by a national grant. '
+            'Conclusion: persistent headache with fever warrants prompt evaluation.')
+
+def test_estimate_tokens():
+    """CJK characters count one token each, other text about four characters per token"""
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('頭痛發燒') == 4
+    assert estimate_tokens('abcdefgh') == 2
+    assert estimate_tokens('頭痛 fever') == 2 + 2
+    print("✓ Token estimation")
+
+def test_key_sentences():
+    """Sentences matching the search terms are kept in original order; short text is untouched"""
+    compact = key_sentences(ABSTRACT, ['headache', 'fever'], max_sentences=2)
+    assert compact.startswith('We found that headache with fever')
+    assert compact.endswith('warrants prompt evaluation.')
+    assert 'Funding' not in compact
+    assert key_sentences('Short abstract.', ['fever']) == 'Short abstract.'
+    assert len(key_sentences(ABSTRACT, ['headache'], max_sentences=5, max_chars=80)) <= 81
+    print("✓ Key sentence extraction")
+
+def test_compact_evidence():
+    """URLs and relevance blurbs are dropped and excerpts shortened"""
+    evidence = [{'title': 'Headache and fever', 'source': 'BMJ, 2024', 'excerpt': ABSTRACT,
+                 'relevance': 'Relevant to your symptoms', 'url': 'https://pubmed.ncbi.nlm.nih.gov/1/'}] * 4
+    compacted = compact_evidence(evidence, ['fever'], max_articles=3)
+    assert len(compacted) == 3
+    assert set(compacted[0]) == {'title', 'source', 'excerpt'}
+    assert estimate_tokens(compacted[0]['excerpt']) < estimate_tokens(ABSTRACT)
+    print("✓ Evidence compaction")
+
+def test_model_limits():
+    """Longest matching model prefix wins, then the context window, then the default"""
+    limits = parse_model_limits('llama3.1=3000, llama=2000, bad, gpt-4=x')
+    assert limits == {'llama3.1': 3000, 'llama': 2000}
+    assert prompt_token_limit('llama3.1:8b', limits, 6000) == 3000
+    assert prompt_token_limit('llama2:7b', limits, 6000) == 2000
+    assert prompt_token_limit('qwen2.5:7b', limits, 6000, context_window=4096, output_reserve=1024) == 3072
+    assert prompt_token_limit('gpt-4o', limits, 6000) == 6000
+    print("✓ Per-model prompt limits")
+
+def test_stats():
+    """Evidence reduction is the share of raw evidence tokens not sent"""
+    stats = PromptBudgetStats()
+    stats.record(1500, evidence_tokens_raw=1000, evidence_tokens_sent=250)
+    stats.record(2500, evidence_tokens_raw=1000, evidence_tokens_sent=250, articles_dropped=1, over_budget=True)
+    result = stats.get_stats()
+    assert result['avg_prompt_tokens'] == 2000 and result['max_prompt_tokens'] == 2500
+    assert result['evidence_reduction'] == 0.75
+    assert result['articles_dropped'] == 1 and result['over_budget'] == 1
+    print("✓ Prompt budget stats")
+
+if __name__ == "__main__":
+    test_estimate_tokens()
+    test_key_sentences()
+    test_compact_evidence()
+    test_model_limits()
+    test_stats()
+    print("\nAll prompt budget tests passed")
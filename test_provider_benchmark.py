@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the concurrent AI provider benchmark runner
+"""
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from provider_benchmark import ProviderBenchmark
+
+CASES = [{'symptoms': '頭痛'}, {'symptoms': '咳嗽'}]
+
+def fake_call(provider, model, case):
+    """fast: always parses; flaky: fails on 咳嗽; slow: unparseable reply"""
+    if model == 'flaky' and case['symptoms'] == '咳嗽':
+        raise RuntimeError('HTTP 429')
+    time.sleep(0.05 if model == 'slow' else 0.01)
+    reply = '相關專科：神經科' if model != 'slow' else '無法判斷'
+    return reply, {'completion_tokens': 20}
+
+def test_benchmark_metrics():
+    """Per-target latency, error rate, tokens/sec and parse rate"""
+    with tempfile.TemporaryDirectory() as tmp:
+        benchmark = ProviderBenchmark(fake_call, lambda text: '相關專科' in text, db_path=os.path.join(tmp, 'bench.db'))
+        targets = [{'provider': 'mock', 'model': m} for m in ('fast', 'flaky', 'slow')]
+        report = benchmark.run(targets, CASES, repeats=2)
+        results = {r['model']: r for r in report['results']}
+
+        assert results['fast']['runs'] == 4 and results['fast']['error_rate'] == 0.0
+        assert results['fast']['parse_success_rate'] == 1.0
+        assert results['flaky']['error_rate'] == 0.5 and results['flaky']['sample_errors'] == ['HTTP 429']
+        assert results['slow']['parse_success_rate'] == 0.0
+        assert results['slow']['p50_ms'] > results['fast']['p50_ms']
+        assert results['fast']['tokens_per_second'] > results['slow']['tokens_per_second']
+
+        history = benchmark.history()
+        assert history[0]['run_id'] == report['run_id'] and len(history[0]['results']) == 3
+    print("✓ Benchmark metrics computed and stored")
+
+def test_targets_run_concurrently():
+    """Calls to different targets overlap instead of running one after another"""
+    active = {'now': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def slow_call(provider, model, case):
+        with lock:
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+        time.sleep(0.05)
+        with lock:
+            active['now'] -= 1
+        return '相關專科：內科', {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        benchmark = ProviderBenchmark(slow_call, bool, max_workers=4, db_path=os.path.join(tmp, 'bench.db'))
+        benchmark.run([{'provider': 'a', 'model': 'x'}, {'provider': 'b', 'model': 'y'}], CASES)
+    assert active['peak'] > 1
+    print("✓ Targets benchmarked concurrently")
+
+def test_per_provider_cap_and_slots():
+    """Calls to one provider are capped, and a call without a provider slot counts as an error"""
+    active = {'now': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def slow_call(provider, model, case):
+        with lock:
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+        time.sleep(0.05)
+        with lock:
+            active['now'] -= 1
+        return '相關專科：內科', {}
+
+    def slot_fn(provider):
+        if provider == 'busy':
+            raise RuntimeError('bulkhead full')
+        return threading.Lock()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        benchmark = ProviderBenchmark(slow_call, bool, max_workers=8, max_per_provider=1, slot_fn=slot_fn,
+                                      db_path=os.path.join(tmp, 'bench.db'))
+        report = benchmark.run([{'provider': 'a', 'model': 'x'}, {'provider': 'a', 'model': 'y'},
+                                {'provider': 'busy', 'model': 'z'}], CASES, repeats=2)
+    assert active['peak'] == 1
+    results = {r['model']: r for r in report['results']}
+    assert results['x']['errors'] == 0 and results['z']['error_rate'] == 1.0
+    assert results['z']['sample_errors'] == ['bulkhead full']
+    print("✓ Per-provider cap and provider slots respected")
+
+if __name__ == "__main__":
+    test_benchmark_metrics()
+    test_targets_run_concurrently()
+    test_per_provider_cap_and_slots()
+    print("\nAll provider benchmark tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the persistent PubMed search/article cache
+"""
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pubmed_cache import PubMedCache, normalize_query, config_hash
+
+def make_cache(**kwargs):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    return PubMedCache(db_path=path, **kwargs), path
+
+def test_search_round_trip():
+    """PMID lists are keyed by normalized query, retmax and config hash"""
+    cache, path = make_cache()
+    try:
+        key = config_hash('pubmed', 'relevance')
+        assert cache.get_search('headache', 3, key) is None
+        cache.put_search('Headache ', 3, key, ['111', '222'])
+        assert cache.get_search('  headache', 3, key) == (['111', '222'], False)
+        assert cache.get_search('headache', 5, key) is None
+        assert cache.get_search('headache', 3, config_hash('pubmed', 'date')) is None
+        cache.put_search('rare term', 3, key, [])
+        assert cache.get_search('rare term', 3, key) == ([], False)
+        assert normalize_query(' Chest   Pain ') == 'chest pain'
+
+        stats = cache.get_stats()
+        assert stats['search_hits'] == 2 and stats['search_misses'] == 3
+        print("✓ Search cache round trip")
+    finally:
+        os.remove(path)
+
+def test_stale_while_revalidate():
+    """Expired searches are served as stale only when allowed and within the stale window"""
+    cache, path = make_cache(search_ttl_seconds=0.05, stale_seconds=60)
+    try:
+        cache.put_search('fever', 3, 'h', ['1'])
+        time.sleep(0.1)
+        assert cache.get_search('fever', 3, 'h') is None
+        assert cache.get_search('fever', 3, 'h', allow_stale=True) == (['1'], True)
+
+        assert cache.begin_revalidation('fever')
+        assert not cache.begin_revalidation('fever')
+        cache.end_revalidation('fever')
+        assert cache.begin_revalidation('fever')
+
+        cache.configure(stale_seconds=0)
+        assert cache.get_search('fever', 3, 'h', allow_stale=True) is None
+        assert cache.get_stats()['search_stale_hits'] == 1
+        print("✓ Stale-while-revalidate")
+    finally:
+        os.remove(path)
+
+def test_articles_persist():
+    """Parsed articles survive a new cache instance and expire after their TTL"""
+    cache, path = make_cache()
+    try:
+        record = {'pmid': '111', 'title': 'Cough in adults', 'journal': 'BMJ', 'year': '2024',
+                  'abstract': '咳嗽 abstract', 'search_term': 'cough', 'excerpt': 'abstract', 'relevance_score': 3.5}
+        cache.put_articles([record, {'title': 'no pmid'}])
+        reopened = PubMedCache(db_path=path)
+        assert reopened.get_articles(['111', '222']) == {'111': record}
+        assert reopened.get_stats()['article_hits'] == 1 and reopened.get_stats()['article_misses'] == 1
+
+        reopened.configure(article_ttl_seconds=0)
+        time.sleep(0.01)
+        assert reopened.get_articles(['111']) == {}
+        assert reopened.purge_expired() == 1
+        print("✓ Article cache persists and expires")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    test_search_round_trip()
+    test_stale_while_revalidate()
+    test_articles_persist()
+    print("\nAll PubMed cache tests passed")
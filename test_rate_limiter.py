@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test the token-bucket rate limiter used for NCBI E-utilities
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rate_limiter import RateLimiter
+
+def test_burst_then_paced():
+    """A full bucket allows a burst, after which tokens arrive at the configured rate"""
+    limiter = RateLimiter(rate_per_second=20, burst=2)
+    started = time.monotonic()
+    for _ in range(4):
+        assert limiter.acquire()
+    elapsed = time.monotonic() - started
+    assert 0.08 <= elapsed < 0.5  # two tokens refilled at 20/s ≈ 0.1s
+
+    stats = limiter.get_stats()
+    assert stats['acquired'] == 4 and stats['waited'] == 2
+    print("✓ Burst then paced")
+
+def test_timeout_rejects():
+    """Callers give up when no token arrives within their timeout"""
+    limiter = RateLimiter(rate_per_second=1, burst=1)
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0.1)
+    assert limiter.get_stats()['rejected'] == 1
+    print("✓ Timeout rejects")
+
+def test_shared_across_threads():
+    """Concurrent callers together stay within the rate"""
+    limiter = RateLimiter(rate_per_second=50, burst=1)
+    times = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(3):
+            limiter.acquire()
+            with lock:
+                times.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(times) == 12
+    assert max(times) - started >= 11 / 50 * 0.9
+    print("✓ Rate shared across threads")
+
+def test_rejection_keeps_half_open_probe():
+    """A PubMed call turned away by the rate limiter must not take the breaker's half-open probe"""
+    import app
+    breaker = app.circuit_breakers.get('pubmed_rate_limit_test')
+    breaker.min_calls, breaker.open_seconds = 1, 0
+    breaker.record_failure('HTTP 503')
+    assert breaker.state == breaker.HALF_OPEN
+
+    app.pubmed_rate_limiter.configure(rate_per_second=0.01, burst=1)
+    try:
+        assert app.pubmed_rate_limiter.acquire(timeout=0)
+        assert app.pubmed_get('http://127.0.0.1:9/esearch.fcgi', {}, 'pubmed_rate_limit_test', 0.1) is None
+    finally:
+        app.pubmed_rate_limiter.configure(rate_per_second=app.PUBMED_PARALLEL_CONFIG['rate_per_second'])
+    # The probe slot is still free for the next call
+    assert breaker.allow_request()
+    print("✓ Rate-limit rejection leaves the half-open probe free")
+
+if __name__ == "__main__":
+    test_burst_then_paced()
+    test_timeout_rejects()
+    test_shared_across_threads()
+    test_rejection_keeps_half_open_probe()
+    print("\nAll rate limiter tests passed")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test per-request deadlines and stage budgets
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from request_deadline import Deadline, deadline_scope, deadline_stage, request_timeout, deadline_exhausted, current_deadline
+
+def test_timeouts_derive_from_remaining_time():
+    """Downstream timeouts are capped by the stage budget, the reserve and the request deadline"""
+    deadline = Deadline(20, {'validation': 4, 'diagnosis': 18}, min_timeout_seconds=1)
+    with deadline_scope(deadline):
+        assert request_timeout(60) <= 20
+        with deadline_stage('validation'):
+            assert request_timeout(15) <= 4
+        with deadline_stage('evidence', reserve_seconds=8):
+            assert request_timeout(10) <= 10
+            assert 11 < request_timeout(60) <= 12
+    assert current_deadline() is None
+    assert request_timeout(60) == 60
+    print("✓ Timeouts derived from stage budgets and remaining time")
+
+def test_exhausted_deadline_uses_floor_and_skips():
+    """Past the deadline, required calls get the minimum timeout and optional stages are skipped"""
+    deadline = Deadline(0.05, min_timeout_seconds=1)
+    time.sleep(0.06)
+    with deadline_scope(deadline):
+        assert deadline.expired()
+        assert request_timeout(60) == 1
+        assert deadline_exhausted()
+        assert not deadline.has_time_for(2, reserve_seconds=8)
+        deadline.skip('evidence')
+    report = deadline.get_report()
+    assert report['skipped'] == ['evidence']
+    assert report['remaining_ms'] == 0
+    print("✓ Expired deadline floors timeouts and records skipped stages")
+
+def test_stage_report_and_thread_isolation():
+    """Stage times are accumulated and deadlines do not leak across threads"""
+    deadline = Deadline(20)
+    seen = []
+    with deadline_scope(deadline):
+        with deadline_stage('translation'):
+            time.sleep(0.02)
+        deadline.add_stage_time('matching', 0.01)
+        thread = threading.Thread(target=lambda: seen.append(current_deadline()))
+        thread.start()
+        thread.join()
+    report = deadline.get_report()
+    assert report['stages']['translation'] >= 20
+    assert report['stages']['matching'] == 10
+    assert seen == [None]
+    print(f"✓ Stage timings reported ({report['stages']})")
+
+if __name__ == "__main__":
+    test_timeouts_derive_from_remaining_time()
+    test_exhausted_deadline_uses_floor_and_skips()
+    test_stage_report_and_thread_isolation()
+    print("\nAll request deadline tests passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test single-flight request coalescing
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from single_flight import SingleFlight, SingleFlightTimeout, make_fingerprint
+from request_deadline import Deadline, deadline_scope
+
+def test_concurrent_duplicates_share_one_call():
+    """Identical concurrent calls should execute once and share the result"""
+    flight = SingleFlight()
+    executions = []
+    results = []
+
+    def slow_translate(terms):
+        executions.append(terms)
+        time.sleep(0.2)
+        return [{'term': t} for t in terms]
+
+    key = make_fingerprint('translate', ['頭痛', '發燒', '咳嗽'])
+
+    def worker():
+        results.append(flight.do(key, slow_translate, ['headache', 'fever', 'cough']))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert len(results) == 5
+    assert all(r == results[0] for r in results)
+    # Followers receive copies, not the leader's object
+    assert len({id(r) for r in results}) == 5
+
+    stats = flight.get_stats()
+    assert stats['executed'] == 1
+    assert stats['coalesced'] == 4
+    assert stats['in_flight'] == 0
+    print(f"✓ 5 concurrent requests -> 1 execution ({stats})")
+
+def test_errors_propagate_to_waiters():
+    """A failing call should raise for the leader and every waiter"""
+    flight = SingleFlight()
+    errors = []
+
+    def failing_call():
+        time.sleep(0.1)
+        raise RuntimeError('provider down')
+
+    def worker():
+        try:
+            flight.do('key', failing_call)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ['provider down'] * 3
+    print("✓ Errors propagate to all coalesced callers")
+
+def test_waiters_bounded_by_deadline():
+    """A duplicate caller stops waiting when its request deadline runs out"""
+    flight = SingleFlight(max_wait_seconds=10)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('key', release.wait))
+    leader.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    try:
+        with deadline_scope(Deadline(0.1, min_timeout_seconds=0.05)):
+            flight.do('key', release.wait)
+        assert False, "Expected SingleFlightTimeout"
+    except SingleFlightTimeout:
+        pass
+    assert time.monotonic() - started < 1
+    release.set()
+    leader.join()
+    assert flight.get_stats()['wait_timeouts'] == 1
+    print("✓ Coalesced waiters give up at the request deadline")
+
+def test_fingerprint_stability():
+    """Fingerprints should be stable and distinguish different inputs"""
+    assert make_fingerprint('ai', 'openai', {'b': 1, 'a': 2}) == make_fingerprint('ai', 'openai', {'a': 2, 'b': 1})
+    assert make_fingerprint('ai', '頭痛') != make_fingerprint('ai', '發燒')
+    print("✓ Fingerprints are stable")
+
+if __name__ == "__main__":
+    test_concurrent_duplicates_share_one_call()
+    test_errors_propagate_to_waiters()
+    test_waiters_bounded_by_deadline()
+    test_fingerprint_stability()
+    print("\nAll single-flight tests passed")
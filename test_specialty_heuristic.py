@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test the keyword specialty heuristic and progressive matching stats
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from specialty_heuristic import SpecialtyHeuristic, ProgressiveMatchStats
+
+def test_predict_specialty():
+    """Keyword matches pick the specialty; unmatched text falls back to 內科"""
+    heuristic = SpecialtyHeuristic()
+    assert heuristic.predict('持續頭痛及頭暈三天')['specialty'] == '神經科'
+    assert heuristic.predict('Persistent cough and wheezing at night')['specialty'] == '呼吸科'
+
+    fallback = heuristic.predict('覺得很累')
+    assert fallback['specialty'] == '內科' and fallback['confidence'] == 0.0
+    print("✓ Specialty predicted from keywords")
+
+def test_multiple_specialties_ranked():
+    """Several matching specialties are ranked by score"""
+    result = SpecialtyHeuristic().predict('胃痛、腹瀉、嘔吐，還有少少喉嚨痛', max_specialties=2)
+    assert result['specialties'] == ['腸胃肝臟科', '耳鼻喉科']
+    assert 0.5 < result['confidence'] < 1.0
+    assert '腹瀉' in result['matched']['腸胃肝臟科']
+    print("✓ Multiple specialties ranked")
+
+def test_progressive_stats():
+    """Change rate counts final specialties that differ from the provisional one"""
+    stats = ProgressiveMatchStats()
+    for _ in range(4):
+        stats.record_provisional()
+    assert stats.record_final('神經科', '神經科') is False
+    assert stats.record_final('內科', '呼吸科') is True
+    assert stats.record_final('內科', '呼吸科') is True
+    assert stats.record_final('內科', '') is False
+
+    result = stats.get_stats()
+    assert result['provisional'] == 4 and result['completed'] == 4
+    assert result['specialty_changed'] == 2 and result['change_rate'] == 0.5
+    assert result['top_changes'] == {'內科 -> 呼吸科': 2}
+    print("✓ Progressive matching stats tracked")
+
+if __name__ == "__main__":
+    test_predict_specialty()
+    test_multiple_specialties_ranked()
+    test_progressive_stats()
+    print("\nAll specialty heuristic tests passed")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the bounded speculative prefetch queue
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from speculative_prefetch import SpeculativePrefetcher
+
+def test_prefetch_then_hit():
+    """A finished prefetch is served without redoing the work; duplicates are not queued twice"""
+    calls = []
+
+    def work(symptoms):
+        calls.append(symptoms)
+        time.sleep(0.05)
+        return {'evidence': [], 'specialty': '內科'}
+
+    prefetcher = SpeculativePrefetcher(workers=1, max_pending=4)
+    assert prefetcher.submit('k1', work, '頭痛') == 'queued'
+    assert prefetcher.submit('k1', work, '頭痛') == 'duplicate'
+    assert prefetcher.get('k1', wait_seconds=1) == {'evidence': [], 'specialty': '內科'}
+    assert prefetcher.get('k1') is not None
+    assert prefetcher.submit('k1', work, '頭痛') == 'cached'
+    assert prefetcher.get('missing') is None
+    assert calls == ['頭痛']
+
+    stats = prefetcher.get_stats()
+    assert stats['waited_hits'] == 1 and stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['completed'] == 1 and stats['duplicates'] == 1
+    print("✓ Prefetched results reused")
+
+def test_full_queue_drops_work():
+    """Work beyond max_pending is dropped rather than queued"""
+    release = threading.Event()
+    prefetcher = SpeculativePrefetcher(workers=1, max_pending=1)
+    assert prefetcher.submit('busy', release.wait, 1) == 'queued'
+    time.sleep(0.05)  # the worker picks up 'busy', leaving the queue empty
+    assert prefetcher.submit('a', lambda: 'a') == 'queued'
+    assert prefetcher.submit('b', lambda: 'b') == 'dropped'
+    release.set()
+    assert prefetcher.get('a', wait_seconds=1) == 'a'
+    assert prefetcher.get('b', wait_seconds=0.1) is None
+    assert prefetcher.get_stats()['dropped'] == 1
+    print("✓ Full queue drops speculative work")
+
+def test_overload_and_failures():
+    """Nothing is queued while overloaded; a failing prefetch leaves no result"""
+    busy = {'value': True}
+    prefetcher = SpeculativePrefetcher(workers=1, overloaded_fn=lambda: busy['value'])
+    assert prefetcher.submit('k', lambda: 1) == 'dropped'
+
+    def fail():
+        raise RuntimeError('PubMed down')
+
+    busy['value'] = False
+    assert prefetcher.submit('k', fail) == 'queued'
+    assert prefetcher.get('k', wait_seconds=1) is None
+    assert prefetcher.get_stats()['failed'] == 1
+    print("✓ Overload and failures handled")
+
+if __name__ == "__main__":
+    test_prefetch_then_hit()
+    test_full_queue_drops_work()
+    test_overload_and_failures()
+    print("\nAll speculative prefetch tests passed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test structured JSON diagnosis parsing and rendering
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from structured_diagnosis import build_response_format, parse_structured_diagnosis, render_diagnosis_text
+from translations import get_translation
+
+SPECIALTIES = ['內科', '神經科', '急診科', '耳鼻喉科']
+
+def test_parse_json_diagnosis():
+    """A JSON response (even inside a code fence) should be parsed and normalized"""
+    content = '''```json
+{"diagnosis": "偏頭痛或緊張性頭痛", "specialties": ["神經科", "牙科", "內科"],
+ "severity": "中等", "emergency": "否", "advice": "多休息，避免強光"}
+```'''
+    result = parse_structured_diagnosis(content, SPECIALTIES)
+    assert result['specialties'] == ['神經科', '內科']  # unknown specialty dropped
+    assert result['severity'] == 'moderate'
+    assert result['emergency'] is False
+    print("✓ JSON diagnosis parsed and normalized")
+
+def test_unusable_response_falls_back():
+    """Free text or incomplete objects should return None so callers use regex extraction"""
+    assert parse_structured_diagnosis('症狀分析：感冒\n緊急程度：否', SPECIALTIES) is None
+    assert parse_structured_diagnosis('{"diagnosis": "感冒"}', SPECIALTIES) is None
+    assert parse_structured_diagnosis('AI分析服務暫時不可用，請稍後再試', SPECIALTIES) is None
+    print("✓ Unusable responses fall back to text parsing")
+
+def test_combined_validation_fields():
+    """Combined responses carry the validity verdict and English search terms"""
+    valid = parse_structured_diagnosis(
+        '{"valid": true, "validation_issues": [], "search_terms": ["headache", "頭痛", "migraine"], '
+        '"diagnosis": "偏頭痛", "specialties": ["神經科"], "severity": "mild", "emergency": false, "advice": "休息"}',
+        SPECIALTIES)
+    assert valid['valid'] is True
+    assert valid['search_terms'] == ['headache', 'migraine']  # Chinese terms are not sent to PubMed
+
+    invalid = parse_structured_diagnosis(
+        '{"valid": false, "validation_issues": ["輸入內容不是醫療症狀"], "search_terms": [], '
+        '"diagnosis": "", "specialties": [], "severity": "mild", "emergency": false, "advice": ""}',
+        SPECIALTIES)
+    assert invalid['valid'] is False
+    assert invalid['validation_issues'] == ['輸入內容不是醫療症狀']
+    print("✓ Combined validation fields parsed")
+
+def test_render_keeps_labelled_layout():
+    """Rendered text should keep the labels the legacy parsers look for"""
+    diagnosis = {'diagnosis': '急性心肌梗塞可能', 'specialties': ['急診科'], 'severity': 'severe',
+                 'emergency': True, 'advice': '立即前往急診'}
+    text = render_diagnosis_text(diagnosis, lambda key: get_translation(key, 'zh-TW'))
+    assert '嚴重程度：嚴重' in text
+    assert '緊急程度：是' in text
+
+    english = render_diagnosis_text(diagnosis, lambda key: get_translation(key, 'en'))
+    assert 'Severity: Severe' in english
+    print("✓ Rendered diagnosis keeps the labelled layout")
+
+def test_response_format_per_provider():
+    """Only providers/models with structured output support get a request field"""
+    assert build_response_format('openai', 'gpt-4o-mini')[1]['type'] == 'json_schema'
+    assert build_response_format('openai', 'gpt-4') is None
+    assert build_response_format('volcengine', 'doubao-pro-32k') == ('response_format', {'type': 'json_object'})
+    assert build_response_format('ollama', 'llama3.1:8b') == ('format', 'json')
+    print("✓ response_format mapped per provider")
+
+def test_rendered_specialties_match_recommendation():
+    """When every JSON specialty is unavailable, the text shows the specialty actually recommended"""
+    import app
+    saved = (app.call_ai_api, app.get_available_specialties, app.DIAGNOSIS_OUTPUT_CONFIG['structured_output'])
+    app.call_ai_api = lambda *args, **kwargs: ('{"diagnosis": "偏頭痛可能，建議神經科跟進", "specialties": ["頭痛專科"], '
+                                               '"severity": "mild", "emergency": false, "advice": "多休息"}')
+    app.get_available_specialties = lambda: ['神經科', '內科']
+    app.DIAGNOSIS_OUTPUT_CONFIG['structured_output'] = True
+    try:
+        result = app.analyze_symptoms_with_context(30, '', '頭痛', user_language='zh-TW')
+    finally:
+        app.call_ai_api, app.get_available_specialties, app.DIAGNOSIS_OUTPUT_CONFIG['structured_output'] = saved
+    assert result['recommended_specialty'] == '神經科'
+    assert get_translation('specialty_format', 'zh-TW') + '、'.join(result['recommended_specialties']) in result['analysis']
+    print("✓ Rendered specialty line matches the recommendation")
+
+if __name__ == "__main__":
+    test_parse_json_diagnosis()
+    test_unusable_response_falls_back()
+    test_combined_validation_fields()
+    test_render_keeps_labelled_layout()
+    test_response_format_per_provider()
+    test_rendered_specialties_match_recommendation()
+    print("\nAll structured diagnosis tests passed")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test symptom canonicalization and the canonical result cache
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from symptom_canonicalizer import (SymptomCanonicalizer, CanonicalResultCache, fold_script,
+                                   split_symptom_terms, age_band, gender_band)
+
+SYNONYMS = {'頭痛': 'headache', '發燒': 'fever', '發熱': 'fever', '咳嗽': 'cough'}
+
+def test_script_and_separators():
+    """Simplified characters fold to traditional; punctuation and conjunctions split terms"""
+    assert fold_script('发烧头痛') == '發燒頭痛'
+    assert split_symptom_terms('頭痛, 發燒；咳嗽') == ['頭痛', '發燒', '咳嗽']
+    assert split_symptom_terms('头痛和发烧') == ['頭痛', '發燒']
+    assert split_symptom_terms('Headache and  Fever') == ['headache', 'fever']
+    print("✓ Script folding and separator normalization")
+
+def test_equivalent_inputs_share_key():
+    """Order, separators, script, language and synonyms collapse to one key"""
+    canonicalizer = SymptomCanonicalizer(lambda: SYNONYMS)
+    keys = {canonicalizer.canonicalize(text, 30, '男')['key']
+            for text in ['頭痛, 發燒', '发烧、头痛', 'headache and fever', '發熱及頭痛']}
+    assert len(keys) == 1
+    assert canonicalizer.canonicalize('頭痛, 發燒', 30, '男')['terms'] == ['fever', 'headache']
+
+    stats = canonicalizer.get_stats()
+    assert stats['distinct_raw'] == 4 and stats['distinct_canonical'] == 1
+    assert stats['collapse_ratio'] == 4.0
+    print("✓ Equivalent inputs share one canonical key")
+
+def test_bands_and_durations_kept_apart():
+    """Age/gender bands and symptom durations still distinguish keys"""
+    canonicalizer = SymptomCanonicalizer(lambda: SYNONYMS)
+    assert canonicalizer.canonicalize('頭痛', 31, 'M')['key'] == canonicalizer.canonicalize('頭痛', 38, '男')['key']
+    assert canonicalizer.canonicalize('頭痛', 12)['key'] != canonicalizer.canonicalize('頭痛', 13)['key']
+    assert canonicalizer.canonicalize('頭痛三天')['terms'] == ['headache 三天']
+    assert age_band(70) == '65+' and age_band('x') == 'unknown' and gender_band('Female') == 'F'
+    print("✓ Bands and durations kept apart")
+
+def test_result_cache_ttl_and_lru():
+    """Cache expires entries and evicts the least recently used"""
+    cache = CanonicalResultCache(ttl_seconds=0.05, capacity=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('a') is None
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 2 and stats['misses'] == 2 and stats['evictions'] == 1
+    print("✓ Result cache TTL and LRU eviction")
+
+if __name__ == "__main__":
+    test_script_and_separators()
+    test_equivalent_inputs_share_key()
+    test_bands_and_durations_kept_apart()
+    test_result_cache_ttl_and_lru()
+    print("\nAll symptom canonicalizer tests passed")
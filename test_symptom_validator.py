@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the local rule-based symptom validator
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from symptom_validator import LocalSymptomValidator, load_chp_topic_titles, is_condition_topic, is_specialty_name
+
+LEXICON = ['頭痛', '發燒', '咳嗽', '胸痛', '呼吸困難', 'headache', 'fever', 'chest pain']
+
+def test_obvious_garbage_is_rejected():
+    """Garbage input should be rejected locally"""
+    validator = LocalSymptomValidator(LEXICON)
+    for text in ['test', '123', '測試', '哈哈哈哈', 'sdfg', '!!!', '', 'test, 123']:
+        result = validator.validate(text)
+        assert result['verdict'] == 'invalid', (text, result)
+    print("✓ Garbage rejected without LLM")
+
+def test_clear_symptoms_are_accepted():
+    """Lexicon terms and symptom morphemes should be accepted locally"""
+    validator = LocalSymptomValidator(LEXICON)
+    result = validator.validate('頭痛、發燒、咳嗽三天')
+    assert result['verdict'] == 'valid'
+    assert set(result['matched_terms']) == {'頭痛', '發燒', '咳嗽'}
+
+    assert validator.validate('I have had a headache since Monday')['verdict'] == 'valid'
+    assert validator.validate('膝蓋腫')['verdict'] == 'valid'
+    print("✓ Clear symptoms accepted without LLM")
+
+def test_ambiguous_input_is_escalated():
+    """Input without known terms or garbage markers should be escalated"""
+    validator = LocalSymptomValidator(LEXICON)
+    assert validator.validate('不舒服')['verdict'] == 'ambiguous'
+    assert validator.validate('feeling off lately')['verdict'] == 'ambiguous'
+
+    stats = validator.get_stats()
+    assert stats['total'] == 2
+    assert stats['escalation_rate'] == 1.0
+    print("✓ Ambiguous input escalated to LLM")
+
+def test_chp_titles_loaded():
+    """CHP topic names should be extracted from content.json titles"""
+    titles = load_chp_topic_titles(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'content.json'))
+    assert titles
+    assert all(' - ' not in title for title in titles)
+    print(f"✓ Loaded {len(titles)} CHP topic names")
+
+def test_health_topics_are_not_symptoms():
+    """Non-condition CHP topics stay out of the lexicon; matching only them is ambiguous"""
+    titles = ['登革熱', '水痘', '傷寒與副傷寒', '高血壓', '吸煙', '飲酒', '體能活動', '心理健康', '藥物安全', '飲食與營養']
+    conditions = [title for title in titles if is_condition_topic(title)]
+    assert conditions == ['登革熱', '水痘', '傷寒與副傷寒', '高血壓']
+
+    validator = LocalSymptomValidator(LEXICON + conditions,
+                                      topic_terms=[title for title in titles if title not in conditions])
+    result = validator.validate('吸煙')
+    assert result['verdict'] == 'ambiguous' and result['reason'] == 'topic_only'
+    assert result['matched_terms'] == ['吸煙']
+    assert validator.validate('飲食與營養')['verdict'] == 'ambiguous'
+    assert validator.validate('吸煙後咳嗽')['verdict'] == 'valid'
+    assert validator.validate('懷疑登革熱')['reason'] == 'lexicon'
+    print("✓ Health topics alone are escalated, not accepted")
+
+def test_specialty_names_are_not_symptoms():
+    """Asking for a specialty ('外科', 'surgery') is escalated, not accepted as a symptom"""
+    import app
+    assert is_specialty_name('心臟科') and is_specialty_name('普通科醫生') and not is_specialty_name('咳嗽')
+    for text in ['外科', '我想看外科醫生', 'surgery', 'internal medicine']:
+        assert app.local_symptom_validator.validate(text)['verdict'] == 'ambiguous', text
+    assert app.local_symptom_validator.validate('頭痛，想看神經科')['verdict'] == 'valid'
+    print("✓ Specialty names alone are escalated, not accepted")
+
+if __name__ == "__main__":
+    test_obvious_garbage_is_rejected()
+    test_clear_symptoms_are_accepted()
+    test_ambiguous_input_is_escalated()
+    test_chp_titles_loaded()
+    test_health_topics_are_not_symptoms()
+    test_specialty_names_are_not_symptoms()
+    print("\nAll symptom validator tests passed")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test the persistent medical translation memory
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from translation_memory import MedicalTranslationMemory, normalize_term
+
+def test_seed_lookup_and_learn():
+    """Seeded and learned terms should be found, and persist across instances"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'memory.db')
+        memory = MedicalTranslationMemory(db_path)
+        assert memory.seed({'頭痛': 'headache', '發燒': 'fever'}) == 2
+        assert memory.seed({'頭痛': 'cephalalgia'}) == 0  # seeds never overwrite
+
+        found = memory.lookup_many(['頭痛', '發燒三天', '鼻塞'])
+        assert found == {'頭痛': 'headache', '發燒三天': 'fever'}
+
+        assert memory.learn({'鼻塞': 'nasal congestion', '喉嚨痛': '喉嚨痛'}) == 1  # untranslated result rejected
+        assert memory.lookup('鼻塞') == 'nasal congestion'
+
+        reloaded = MedicalTranslationMemory(db_path)
+        assert reloaded.lookup('鼻塞') == 'nasal congestion'
+        assert reloaded.get_stats()['size'] == 3
+        print("✓ Seeded and learned translations persist")
+
+def test_learn_skips_durations_and_seeds():
+    """A translated duration must not be stored under the bare symptom, and seeds are never overwritten"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'memory.db')
+        memory = MedicalTranslationMemory(db_path)
+        memory.seed({'頭痛': 'headache'})
+
+        assert memory.learn({'喉嚨乾三天': 'dry throat for three days'}) == 0
+        assert memory.lookup_many(['喉嚨乾', '喉嚨乾兩週']) == {}
+
+        assert memory.learn({'頭痛': 'head pain', '喉嚨乾': 'dry throat'}) == 1
+        assert memory.lookup('頭痛') == 'headache'
+        assert MedicalTranslationMemory(db_path).lookup_many(['頭痛', '喉嚨乾兩週']) == \
+            {'頭痛': 'headache', '喉嚨乾兩週': 'dry throat'}
+        print("✓ Durations and seeds are protected from learned translations")
+
+def test_normalize_term():
+    """Durations and punctuation should not prevent a match"""
+    assert normalize_term(' 咳嗽兩週 ') == '咳嗽'
+    assert normalize_term('發燒3天') == '發燒'
+    assert normalize_term('Headache') == 'headache'
+    print("✓ Terms are normalized before lookup")
+
+if __name__ == "__main__":
+    test_seed_lookup_and_learn()
+    test_learn_skips_durations_and_seeds()
+    test_normalize_term()
+    print("\nAll translation memory tests passed")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the local triage model: training, artifact round trip, DB training and runtime predictor
+"""
+import sys
+import os
+import sqlite3
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from triage_model import TriageModel, TriagePredictor, evaluate, load_training_data, train_from_db
+
+SAMPLES = [
+    ('頭痛頭暈', '神經科'), ('持續頭痛三天', '神經科'), ('偏頭痛及頭暈', '神經科'), ('手腳麻痺頭痛', '神經科'),
+    ('咳嗽有痰', '呼吸科'), ('咳嗽氣喘', '呼吸科'), ('乾咳及氣促', '呼吸科'), ('夜間咳嗽氣喘', '呼吸科'),
+    ('胃痛腹瀉', '腸胃肝臟科'), ('腹痛嘔吐', '腸胃肝臟科'), ('胃痛及胃脹', '腸胃肝臟科'), ('腹瀉腹痛', '腸胃肝臟科'),
+]
+
+def test_fit_and_predict():
+    """Character-bigram NB separates the training specialties"""
+    model = TriageModel.fit([t for t, _ in SAMPLES], [l for _, l in SAMPLES], min_df=1)
+    assert model.predict('頭痛')['specialty'] == '神經科'
+    assert model.predict('咳嗽')['specialty'] == '呼吸科'
+    assert model.predict('嚴重腹瀉')['specialty'] == '腸胃肝臟科'
+    probabilities = model.predict_proba('胃痛')
+    assert abs(sum(p for _, p in probabilities) - 1.0) < 1e-5
+
+    report = evaluate(model, ['頭痛', '咳嗽'], ['神經科', '呼吸科'])
+    assert report['accuracy'] == 1.0 and report['per_specialty']['神經科']['recall'] == 1.0
+    print("✓ Model trained and predicts specialties")
+
+def test_save_load_roundtrip():
+    """Artifact round trip preserves predictions"""
+    model = TriageModel.fit([t for t, _ in SAMPLES], [l for _, l in SAMPLES], min_df=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'triage_model.npz')
+        model.save(path)
+        loaded = TriageModel.load(path)
+    assert loaded.classes == model.classes
+    assert loaded.predict('咳嗽氣促') == model.predict('咳嗽氣促')
+    assert loaded.metadata['samples'] == len(SAMPLES)
+    print("✓ Model artifact round trip")
+
+def test_train_from_db_and_predictor():
+    """Outage rows are excluded from training; predictor loads the artifact and applies min_confidence"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'admin_data.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE user_queries (symptoms TEXT, related_specialty TEXT, ai_analysis TEXT)')
+        rows = [(t, l, '分析') for t, l in SAMPLES * 3]
+        rows.append(('頭痛', '內科', 'AI分析服務暫時不可用，請稍後再試'))
+        conn.executemany('INSERT INTO user_queries VALUES (?, ?, ?)', rows)
+        conn.commit()
+        conn.close()
+
+        pairs = load_training_data(db_path, min_per_class=2)
+        assert len(pairs) == len(SAMPLES) and all(label != '內科' for _, label in pairs)
+
+        model_path = os.path.join(tmp, 'triage_model.npz')
+        report = train_from_db(db_path, model_path, holdout_percent=20, min_per_class=2, min_df=1)
+        assert report['train_samples'] + report['samples'] == len(SAMPLES)
+
+        predictor = TriagePredictor(model_path, min_confidence=0.5)
+        assert predictor.predict('頭痛頭暈')['specialty'] == '神經科'
+        predictor.configure(min_confidence=1.01)
+        assert predictor.predict('頭痛頭暈') is None
+        assert predictor.get_stats()['loaded'] is True
+
+    assert TriagePredictor(os.path.join(tmp, 'missing.npz')).predict('頭痛') is None
+    print("✓ Trained from user_queries and served by the predictor")
+
+if __name__ == "__main__":
+    test_fit_and_predict()
+    test_save_load_roundtrip()
+    test_train_from_db_and_predictor()
+    print("\nAll triage model tests passed")
@@ -0,0 +1,177 @@
+"""
+Medical Translation Memory
+Persistent Chinese -> English medical term store. Seeded from the built-in symptom
+mapping and grown from every successful LLM translation, so common symptoms are
+translated locally and only unknown terms are sent to the LLM.
+"""
+
+import re
+import sqlite3
+import threading
+
+# Durations such as "三天", "兩週", "3日" that users append to a symptom
+DURATION_SUFFIX = re.compile(r'[一二兩三四五六七八九十幾數多半\d]+\s*(?:天|日|週|周|星期|個月|个月|月|年|小時|小时)$')
+CJK_CHAR = re.compile(r'[\u4e00-\u9fff]')
+
+
+def _trim_term(term):
+    return term.strip().strip('，,。.；;、').lower() if isinstance(term, str) else ''
+
+
+def normalize_term(term):
+    """Normalize a symptom term for lookup: trim, lowercase, drop duration suffixes"""
+    return DURATION_SUFFIX.sub('', _trim_term(term)).strip()
+
+
+def has_duration_suffix(term):
+    """Check whether a term ends in a duration such as "三天" that normalize_term drops"""
+    return bool(DURATION_SUFFIX.search(_trim_term(term)))
+
+
+def contains_chinese(text):
+    """Check whether text contains CJK characters"""
+    return bool(text) and bool(CJK_CHAR.search(text))
+
+
+class MedicalTranslationMemory:
+    """SQLite-backed translation memory with an in-process lookup table"""
+
+    def __init__(self, db_path='admin_data.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._memory = None
+        self._seeded = set()
+        self._stats = {'hits': 0, 'misses': 0, 'learned': 0}
+
+    def _ensure_loaded(self):
+        """Create the table if needed and load all entries into memory (lock held)"""
+        if self._memory is not None:
+            return
+        self._memory = {}
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS medical_translation_memory (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source_term TEXT UNIQUE NOT NULL,
+                    english_term TEXT NOT NULL,
+                    origin TEXT DEFAULT 'llm',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+            cursor.execute('SELECT source_term, english_term, origin FROM medical_translation_memory')
+            for source_term, english_term, origin in cursor.fetchall():
+                self._memory[source_term] = english_term
+                if origin == 'seed':
+                    self._seeded.add(source_term)
+            conn.close()
+        except Exception as e:
+            print(f"Error loading medical translation memory: {e}")
+
+    def seed(self, mapping):
+        """Insert built-in translations without overwriting learned entries"""
+        with self._lock:
+            self._ensure_loaded()
+            new_entries = [(normalize_term(zh), en) for zh, en in mapping.items()
+                           if normalize_term(zh) and normalize_term(zh) not in self._memory]
+            if not new_entries:
+                return 0
+            try:
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO medical_translation_memory (source_term, english_term, origin)
+                    VALUES (?, ?, 'seed')
+                ''', new_entries)
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"Error seeding medical translation memory: {e}")
+            for source_term, english_term in new_entries:
+                self._memory[source_term] = english_term
+                self._seeded.add(source_term)
+            return len(new_entries)
+
+    def lookup(self, term):
+        """Look up a single term; returns the English term or None"""
+        return self.lookup_many([term]).get(term)
+
+    def lookup_many(self, terms):
+        """Look up several terms; returns {original_term: english_term} for known terms"""
+        found = {}
+        with self._lock:
+            self._ensure_loaded()
+            for term in terms:
+                key = normalize_term(term)
+                if key and key in self._memory:
+                    found[term] = self._memory[key]
+                    self._stats['hits'] += 1
+                else:
+                    self._stats['misses'] += 1
+        return found
+
+    def learn(self, translations):
+        """Store successful translations {chinese_term: english_term}
+
+        Terms with a duration suffix are skipped: their translation carries the
+        duration ("for three days") but would be stored under the bare symptom.
+        Seeded entries are never overwritten.
+        """
+        candidates = []
+        for source, english in translations.items():
+            key = normalize_term(source)
+            english = english.strip() if isinstance(english, str) else ''
+            # Only keep clean English results for bare Chinese source terms
+            if (key and contains_chinese(key) and not has_duration_suffix(source) and english
+                    and not contains_chinese(english) and len(english) < 80):
+                candidates.append((key, english))
+        if not candidates:
+            return 0
+
+        with self._lock:
+            self._ensure_loaded()
+            entries = [(key, english) for key, english in candidates if key not in self._seeded]
+            if not entries:
+                return 0
+            try:
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO medical_translation_memory (source_term, english_term, origin)
+                    VALUES (?, ?, 'llm')
+                    ON CONFLICT(source_term) DO UPDATE SET
+                        english_term = excluded.english_term,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE origin != 'seed'
+                ''', entries)
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"Error saving medical translation memory: {e}")
+            for key, english in entries:
+                self._memory[key] = english
+            self._stats['learned'] += len(entries)
+        return len(entries)
+
+    def entries(self):
+        """Get a snapshot of all {normalized_source_term: english_term} entries"""
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._memory)
+
+    def get_stats(self):
+        """Get memory size and hit/miss counters"""
+        with self._lock:
+            self._ensure_loaded()
+            stats = dict(self._stats)
+            stats['size'] = len(self._memory)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+# Global instance
+translation_memory = MedicalTranslationMemory()
@@ -269,6 +269,10 @@ TRANSLATIONS = {
         'doctor_matching_desc': '本系統協助您找到合適的醫療專業人員，但最終的醫療服務質量取決於個別醫生和診所。我們不對醫療結果承擔責任。',
         'emergency_notice_title': '🚨 緊急情況',
         'emergency_notice_desc': '如遇緊急醫療情況，請立即撥打999或前往最近的急診室，切勿依賴本系統進行緊急醫療決定。',
+        'emergency_fast_path_title': '🚨 您描述的症狀可能需要緊急處理',
+        'emergency_fast_path_desc': '我們已優先列出急診科及內科醫生。如症狀嚴重或持續惡化，請立即撥打999或前往最近的急診室。',
+        'full_analysis_pending': '完整AI症狀分析進行中，完成後會自動顯示…',
+        'provisional_match_note': '以下醫生根據症狀關鍵詞初步配對（{specialty}），AI分析完成後會更新推薦。',
         'disclaimer_agreement': '繼續使用本系統即表示您已理解並同意以上聲明。',
         'understand_continue': '我已理解，繼續使用',
         
@@ -343,6 +347,13 @@ TRANSLATIONS = {
         'severity_format': '嚴重程度：',
         'emergency_format': '緊急程度：',
         'advice_format': '資訊：',
+        'severity_mild': '輕微',
+        'severity_moderate': '中等',
+        'severity_severe': '嚴重',
+        'emergency_yes': '是',
+        'emergency_no': '否',
+        'structured_format': '請只回覆一個JSON物件，不要加入其他文字：{"diagnosis": "症狀分析（繁體中文）", "specialties": ["相關專科，最多3個，按相關性排序"], "severity": "mild/moderate/severe", "emergency": true/false, "advice": "一般資訊和注意事項（繁體中文）"}',
+        'combined_format': '請先判斷症狀描述是否為真實、具體的醫療症狀（測試文字、無意義字符、非醫療詞語或「不舒服」等過於籠統的描述均為無效）。請只回覆一個JSON物件，不要加入其他文字：{"valid": true/false, "validation_issues": ["無效時列出問題，有效時為空"], "search_terms": ["2至4個用於PubMed檢索的英文醫學術語"], "diagnosis": "症狀分析（繁體中文，無效時為空字串）", "specialties": ["相關專科，最多3個，按相關性排序"], "severity": "mild/moderate/severe", "emergency": true/false, "advice": "一般資訊和注意事項（繁體中文）"}',
         'disclaimer': '免責聲明：此分析僅供參考，不構成醫療建議或診斷，請務必諮詢合格醫生。'
     },
     
@@ -539,6 +550,10 @@ TRANSLATIONS = {
         'doctor_matching_desc': '本系统协助您找到合适的医疗专业人员，但最终的医疗服务质量取决于个别医生和诊所。我们不对医疗结果承担责任。',
         'emergency_notice_title': '🚨 紧急情况',
         'emergency_notice_desc': '如遇紧急医疗情况，请立即拨打999或前往最近的急诊室，切勿依赖本系统进行紧急医疗决定。',
+        'emergency_fast_path_title': '🚨 您描述的症状可能需要紧急处理',
+        'emergency_fast_path_desc': '我们已优先列出急诊科及内科医生。如症状严重或持续恶化，请立即拨打999或前往最近的急诊室。',
+        'full_analysis_pending': '完整AI症状分析进行中，完成后会自动显示…',
+        'provisional_match_note': '以下医生根据症状关键词初步配对（{specialty}），AI分析完成后会更新推荐。',
         'disclaimer_agreement': '继续使用本系统即表示您已理解并同意以上声明。',
         'understand_continue': '我已理解，继续使用',
         
@@ -613,6 +628,13 @@ TRANSLATIONS = {
         'severity_format': '严重程度：',
         'emergency_format': '紧急程度：',
         'advice_format': '建议：',
+        'severity_mild': '轻微',
+        'severity_moderate': '中等',
+        'severity_severe': '严重',
+        'emergency_yes': '是',
+        'emergency_no': '否',
+        'structured_format': '请只回复一个JSON对象，不要加入其他文字：{"diagnosis": "病征分析（简体中文）", "specialties": ["相关专科，最多3个，按相关性排序"], "severity": "mild/moderate/severe", "emergency": true/false, "advice": "一般建议和注意事项（简体中文）"}',
+        'combined_format': '请先判断病征描述是否为真实、具体的医疗病征（测试文字、无意义字符、非医疗词语或「不舒服」等过于笼统的描述均为无效）。请只回复一个JSON对象，不要加入其他文字：{"valid": true/false, "validation_issues": ["无效时列出问题，有效时为空"], "search_terms": ["2至4个用于PubMed检索的英文医学术语"], "diagnosis": "病征分析（简体中文，无效时为空字符串）", "specialties": ["相关专科，最多3个，按相关性排序"], "severity": "mild/moderate/severe", "emergency": true/false, "advice": "一般建议和注意事项（简体中文）"}',
         'disclaimer': '免责声明：此分析仅供参考，不能替代专业医疗病征分析，请务必咨询合格医生。'
     },
     
@@ -815,6 +837,10 @@ TRANSLATIONS = {
         'doctor_matching_desc': 'This system helps you find suitable healthcare professionals, but the quality of medical services ultimately depends on individual doctors and clinics. We are not responsible for medical outcomes.',
         'emergency_notice_title': '🚨 Emergency Situations',
         'emergency_notice_desc': 'In case of medical emergencies, please immediately call 999 or go to the nearest emergency room. Do not rely on this system for emergency medical decisions.',
+        'emergency_fast_path_title': '🚨 Your symptoms may need urgent care',
+        'emergency_fast_path_desc': 'Emergency medicine and internal medicine doctors are listed first. If your symptoms are severe or getting worse, call 999 or go to the nearest emergency room now.',
+        'full_analysis_pending': 'The full AI symptom analysis is still running and will appear here when ready…',
+        'provisional_match_note': 'These doctors are a preliminary match based on symptom keywords ({specialty}); recommendations will update when the AI analysis is ready.',
         'disclaimer_agreement': 'By continuing to use this system, you acknowledge that you have read and agree to the above disclaimer.',
         'understand_continue': 'I Understand, Continue',
         
@@ -889,6 +915,13 @@ TRANSLATIONS = {
         'severity_format': 'Severity:',
         'emergency_format': 'Emergency:',
         'advice_format': 'Recommendations:',
+        'severity_mild': 'Mild',
+        'severity_moderate': 'Moderate',
+        'severity_severe': 'Severe',
+        'emergency_yes': 'Yes',
+        'emergency_no': 'No',
+        'structured_format': 'Reply with a single JSON object and no other text: {"diagnosis": "symptom analysis (English)", "specialties": ["related specialties, at most 3, most relevant first"], "severity": "mild/moderate/severe", "emergency": true/false, "advice": "general information and precautions (English)"}',
+        'combined_format': 'First decide whether the description contains real, specific medical symptoms (test text, random characters, non-medical words or vague phrases such as "not feeling well" are invalid). Reply with a single JSON object and no other text: {"valid": true/false, "validation_issues": ["problems if invalid, empty if valid"], "search_terms": ["2-4 English medical terms for a PubMed search"], "diagnosis": "symptom analysis (English, empty string if invalid)", "specialties": ["related specialties, at most 3, most relevant first"], "severity": "mild/moderate/severe", "emergency": true/false, "advice": "general information and precautions (English)"}',
         'disclaimer': 'Disclaimer: This analysis is for reference only and cannot replace professional medical diagnosis. Please consult a qualified physician.'
     }
 }
@@ -0,0 +1,361 @@
+"""
+Local Triage Model
+Offline trainer and CPU predictor that maps free-text symptoms to specialty probabilities.
+Trained on historical user_queries rows (symptoms -> LLM-chosen related_specialty) with
+TF-IDF over character bigrams and multinomial naive Bayes, in pure NumPy. The artifact is a
+single .npz file; prediction only touches the columns of the bigrams present in the text.
+
+Train:  python triage_model.py --db admin_data.db --output triage_model.npz
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# 非文字字元（標點、空白）統一為單一空格，作為詞界標記
+NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+# AI不可用時記錄的專科是預設值而非LLM判斷，不作為訓練標籤
+UNAVAILABLE_ANALYSIS_PREFIXES = ('AI分析服務暫時不可用', 'AI服務配置不完整')
+EXCLUDED_LABELS = ('', '無', 'None')
+
+
+def normalize_text(text):
+    """Lowercase and collapse punctuation/whitespace runs into single spaces"""
+    if not isinstance(text, str):
+        return ''
+    return NON_WORD.sub(' ', text.lower()).strip()
+
+
+def char_bigrams(text):
+    """Character bigrams of the normalized text, padded so one-character input still yields a feature"""
+    normalized = f" {normalize_text(text)} "
+    if len(normalized.strip()) == 0:
+        return []
+    return [normalized[i:i + 2] for i in range(len(normalized) - 1)]
+
+
+def holdout_bucket(text):
+    """Stable 0-99 bucket for a symptom text, so identical texts never straddle the train/test split"""
+    return int(hashlib.md5(normalize_text(text).encode('utf-8')).hexdigest(), 16) % 100
+
+
+class TriageModel:
+    """TF-IDF (character bigrams) + multinomial naive Bayes specialty classifier"""
+
+    def __init__(self, vocabulary=None, idf=None, classes=None, log_prior=None, feature_log_prob=None, metadata=None):
+        self.vocabulary = vocabulary or {}
+        self.idf = idf
+        self.classes = list(classes or [])
+        self.log_prior = log_prior
+        self.feature_log_prob = feature_log_prob
+        self.metadata = metadata or {}
+
+    def _vectorize(self, text):
+        """Sparse TF-IDF vector as (column indices, L2-normalized weights)"""
+        counts = {}
+        for bigram in char_bigrams(text):
+            index = self.vocabulary.get(bigram)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            return None, None
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        weights = tf * self.idf[indices]
+        norm = np.linalg.norm(weights)
+        return indices, (weights / norm if norm > 0 else weights)
+
+    @classmethod
+    def fit(cls, texts, labels, min_df=2, max_features=5000, alpha=0.1):
+        """Train on parallel lists of symptom texts and specialty labels"""
+        if not texts or len(texts) != len(labels):
+            raise ValueError('texts and labels must be non-empty and the same length')
+
+        # 詞彙表：保留文檔頻率最高的雙字元組
+        doc_freq = {}
+        for text in texts:
+            for bigram in set(char_bigrams(text)):
+                doc_freq[bigram] = doc_freq.get(bigram, 0) + 1
+        kept = [bigram for bigram, df in doc_freq.items() if df >= min_df]
+        kept.sort(key=lambda bigram: (-doc_freq[bigram], bigram))
+        kept = kept[:max_features]
+        if not kept:
+            raise ValueError('No character bigram reaches min_df; not enough training data')
+        vocabulary = {bigram: i for i, bigram in enumerate(kept)}
+
+        n_docs = len(texts)
+        df_array = np.array([doc_freq[bigram] for bigram in kept], dtype=np.float32)
+        idf = (np.log((1 + n_docs) / (1 + df_array)) + 1.0).astype(np.float32)
+
+        classes = sorted(set(labels))
+        class_index = {label: i for i, label in enumerate(classes)}
+        model = cls(vocabulary, idf, classes)
+
+        # 逐文檔累加各專科的TF-IDF權重，毋須建立稠密文檔矩陣
+        feature_sums = np.zeros((len(classes), len(kept)), dtype=np.float64)
+        class_counts = np.zeros(len(classes), dtype=np.float64)
+        for text, label in zip(texts, labels):
+            row = class_index[label]
+            class_counts[row] += 1
+            indices, weights = model._vectorize(text)
+            if indices is not None:
+                np.add.at(feature_sums[row], indices, weights)
+
+        smoothed = feature_sums + alpha
+        model.feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True)).astype(np.float32)
+        model.log_prior = np.log(class_counts / class_counts.sum()).astype(np.float32)
+        model.metadata = {
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'samples': n_docs,
+            'features': len(kept),
+            'alpha': alpha,
+            'min_df': min_df,
+            'class_counts': {label: int(class_counts[i]) for i, label in enumerate(classes)}
+        }
+        return model
+
+    def predict_proba(self, text):
+        """Specialty probabilities for a symptom text, highest first"""
+        indices, weights = self._vectorize(text)
+        if indices is None:
+            joint = self.log_prior.astype(np.float64)
+        else:
+            joint = self.log_prior + self.feature_log_prob[:, indices] @ weights
+        joint = np.exp(joint - joint.max())
+        probabilities = joint / joint.sum()
+        order = np.argsort(-probabilities)
+        return [(self.classes[i], float(probabilities[i])) for i in order]
+
+    def predict(self, text, max_specialties=3):
+        """Same shape as SpecialtyHeuristic.predict: specialty, specialties, confidence, probabilities"""
+        ranked = self.predict_proba(text)
+        top = ranked[:max_specialties]
+        return {
+            'specialty': top[0][0],
+            'specialties': [label for label, _ in top],
+            'confidence': round(top[0][1], 2),
+            'probabilities': {label: round(probability, 4) for label, probability in top}
+        }
+
+    def save(self, path):
+        """Write the model artifact (.npz, no pickled objects)"""
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(
+            path,
+            vocabulary=np.array(vocabulary),
+            idf=self.idf,
+            classes=np.array(self.classes),
+            log_prior=self.log_prior,
+            feature_log_prob=self.feature_log_prob,
+            metadata=np.array(json.dumps(self.metadata, ensure_ascii=False))
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a model artifact written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            vocabulary = {bigram: i for i, bigram in enumerate(data['vocabulary'].tolist())}
+            return cls(vocabulary, data['idf'], data['classes'].tolist(), data['log_prior'],
+                       data['feature_log_prob'], json.loads(str(data['metadata'])))
+
+
+def evaluate(model, texts, labels, baseline=None):
+    """Accuracy report against held-out LLM labels; baseline is an optional predictor to compare"""
+    if not texts:
+        return {'samples': 0}
+    correct = top3_correct = baseline_correct = 0
+    per_class = {}
+    started = time.perf_counter()
+    for text, label in zip(texts, labels):
+        ranked = [specialty for specialty, _ in model.predict_proba(text)[:3]]
+        predicted = ranked[0]
+        correct += predicted == label
+        top3_correct += label in ranked
+        per_class.setdefault(label, {'support': 0, 'true_positive': 0, 'predicted': 0})['support'] += 1
+        per_class.setdefault(predicted, {'support': 0, 'true_positive': 0, 'predicted': 0})['predicted'] += 1
+        if predicted == label:
+            per_class[label]['true_positive'] += 1
+    avg_predict_us = (time.perf_counter() - started) / len(texts) * 1e6
+
+    if baseline is not None:
+        baseline_correct = sum(baseline.predict(text)['specialty'] == label for text, label in zip(texts, labels))
+
+    report = {
+        'samples': len(texts),
+        'accuracy': round(correct / len(texts), 4),
+        'top3_accuracy': round(top3_correct / len(texts), 4),
+        'avg_predict_us': round(avg_predict_us, 1),
+        'per_specialty': {
+            label: {
+                'support': counts['support'],
+                'precision': round(counts['true_positive'] / counts['predicted'], 4) if counts['predicted'] else 0.0,
+                'recall': round(counts['true_positive'] / counts['support'], 4) if counts['support'] else 0.0
+            }
+            for label, counts in sorted(per_class.items())
+        }
+    }
+    if baseline is not None:
+        report['baseline_accuracy'] = round(baseline_correct / len(texts), 4)
+    return report
+
+
+def load_training_data(db_path='admin_data.db', min_per_class=5):
+    """Read (symptoms, related_specialty) pairs from user_queries, skipping AI-outage rows and rare labels"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT symptoms, related_specialty, ai_analysis FROM user_queries
+            WHERE symptoms IS NOT NULL AND related_specialty IS NOT NULL
+        ''').fetchall()
+    finally:
+        conn.close()
+
+    pairs = []
+    seen = set()
+    for symptoms, specialty, analysis in rows:
+        specialty = (specialty or '').strip()
+        if not normalize_text(symptoms) or specialty in EXCLUDED_LABELS:
+            continue
+        if (analysis or '').startswith(UNAVAILABLE_ANALYSIS_PREFIXES):
+            continue
+        key = (normalize_text(symptoms), specialty)
+        if key in seen:
+            continue
+        seen.add(key)
+        pairs.append((symptoms, specialty))
+
+    label_counts = {}
+    for _, specialty in pairs:
+        label_counts[specialty] = label_counts.get(specialty, 0) + 1
+    return [(symptoms, specialty) for symptoms, specialty in pairs if label_counts[specialty] >= min_per_class]
+
+
+def train_from_db(db_path='admin_data.db', output_path='triage_model.npz', holdout_percent=20,
+                  min_per_class=5, min_df=2, max_features=5000, alpha=0.1):
+    """Train on user_queries, evaluate on a stable held-out split, then refit on all rows and save"""
+    from specialty_heuristic import specialty_heuristic
+
+    pairs = load_training_data(db_path, min_per_class)
+    if not pairs:
+        raise ValueError(f'No labelled user_queries rows in {db_path}')
+    train = [(text, label) for text, label in pairs if holdout_bucket(text) >= holdout_percent]
+    test = [(text, label) for text, label in pairs if holdout_bucket(text) < holdout_percent]
+
+    model = TriageModel.fit([t for t, _ in train], [l for _, l in train], min_df, max_features, alpha)
+    report = evaluate(model, [t for t, _ in test], [l for _, l in test], baseline=specialty_heuristic)
+    report['train_samples'] = len(train)
+
+    # 評估後以全部資料重新訓練，報告隨模型一併保存
+    final_model = TriageModel.fit([t for t, _ in pairs], [l for _, l in pairs], min_df, max_features, alpha)
+    final_model.metadata['evaluation'] = report
+    final_model.save(output_path)
+    return report
+
+
+class TriagePredictor:
+    """Thread-safe runtime holder: loads the artifact lazily and reloads it when the file changes"""
+
+    def __init__(self, model_path='triage_model.npz', min_confidence=0.5, reload_check_seconds=30):
+        self.model_path = model_path
+        self.min_confidence = min_confidence
+        self.reload_check_seconds = reload_check_seconds
+        self._lock = threading.Lock()
+        self._model = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._stats = {'predictions': 0, 'confident': 0, 'load_errors': 0}
+
+    def configure(self, model_path=None, min_confidence=None):
+        """Update the artifact path and confidence threshold; the next prediction reloads"""
+        with self._lock:
+            if model_path is not None and model_path != self.model_path:
+                self.model_path = model_path
+                self._model, self._mtime = None, None
+            if min_confidence is not None:
+                self.min_confidence = min_confidence
+            self._next_check = 0.0
+
+    def _current_model(self):
+        """Return the loaded model, (re)loading it if the artifact appeared or changed"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._model
+        with self._lock:
+            if now < self._next_check:
+                return self._model
+            self._next_check = now + self.reload_check_seconds
+            try:
+                mtime = os.path.getmtime(self.model_path)
+            except OSError:
+                self._model, self._mtime = None, None
+                return None
+            if mtime != self._mtime:
+                try:
+                    self._model = TriageModel.load(self.model_path)
+                    self._mtime = mtime
+                except Exception as e:
+                    print(f"Triage model load error: {e}")
+                    self._model = None
+                    self._stats['load_errors'] += 1
+            return self._model
+
+    def available(self):
+        """True if a model artifact is loaded"""
+        return self._current_model() is not None
+
+    def predict(self, symptoms, max_specialties=3):
+        """Model prediction, or None without a model or below min_confidence"""
+        model = self._current_model()
+        if model is None:
+            return None
+        prediction = model.predict(symptoms, max_specialties)
+        with self._lock:
+            self._stats['predictions'] += 1
+            if prediction['confidence'] >= self.min_confidence:
+                self._stats['confident'] += 1
+        return prediction if prediction['confidence'] >= self.min_confidence else None
+
+    def get_stats(self):
+        """Get prediction counters and the loaded model's metadata"""
+        model = self._current_model()
+        with self._lock:
+            stats = dict(self._stats)
+        stats['loaded'] = model is not None
+        stats['min_confidence'] = self.min_confidence
+        if model is not None:
+            evaluation = model.metadata.get('evaluation', {})
+            stats.update({
+                'trained_at': model.metadata.get('trained_at'),
+                'samples': model.metadata.get('samples'),
+                'specialties': len(model.classes),
+                'holdout_accuracy': evaluation.get('accuracy'),
+                'baseline_accuracy': evaluation.get('baseline_accuracy')
+            })
+        return stats
+
+
+# Global instance
+triage_predictor = TriagePredictor()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Train the local triage model from user_queries')
+    parser.add_argument('--db', default='admin_data.db')
+    parser.add_argument('--output', default='triage_model.npz')
+    parser.add_argument('--holdout', type=int, default=20, help='held-out percentage for the accuracy report')
+    parser.add_argument('--min-per-class', type=int, default=5)
+    parser.add_argument('--alpha', type=float, default=0.1)
+    args = parser.parse_args()
+
+    result = train_from_db(args.db, args.output, args.holdout, args.min_per_class, alpha=args.alpha)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"\nModel written to {args.output}")